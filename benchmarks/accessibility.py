@@ -0,0 +1,116 @@
+# Provider accessibility at scale (healthx/accessibility.py).
+#
+#   python benchmarks/accessibility.py                          # 100k, 1M and 3M patients
+#   python benchmarks/accessibility.py --patients 5000000 --providers-per 500
+#
+# Patients and providers are drawn in memory inside a Massachusetts-sized box, more
+# densely around a few centres, with one provider per --providers-per patients. Reported
+# per size: KD-tree build, the nearest-provider query for every patient, the
+# providers-within-radius count and the city / race / income aggregation. A random
+# sample of patients is checked against brute-force haversine distances to every
+# provider; the brute-force time, scaled to all patients, is what the
+# O(patients x providers) loop would take.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from healthx import accessibility, income, synthetic  # noqa: E402
+
+SAMPLE = 2_000
+CENTRES = np.array([[42.36, -71.06], [42.26, -71.80], [42.10, -72.59], [42.64, -71.31], [41.64, -70.93]])
+
+
+def _coordinates(rng, count):
+    # Half clustered around city centres, half spread over the state
+    centre = CENTRES[rng.integers(0, len(CENTRES), count)]
+    clustered = centre + rng.normal(0, 0.08, (count, 2))
+    spread = np.column_stack([41.5 + 1.3 * rng.random(count), -73.4 + 3.5 * rng.random(count)])
+    return np.where((rng.random(count) < 0.5)[:, None], clustered, spread)
+
+
+def _frames(patients, providers, seed=0):
+    rng = np.random.default_rng(seed)
+    patient_xy, provider_xy = _coordinates(rng, patients), _coordinates(rng, providers)
+    patient_frame = pd.DataFrame({
+        'CITY': pd.Categorical(rng.choice(synthetic.CITIES, patients)),
+        'RACE': pd.Categorical(rng.choice(synthetic.RACES, patients, p=synthetic.RACE_WEIGHTS)),
+        'LAT': patient_xy[:, 0].astype(np.float32),
+        'LON': patient_xy[:, 1].astype(np.float32),
+    })
+    patient_frame['Income Group'] = income.income_group(pd.Series(rng.lognormal(10.8, 0.6, patients)))
+    provider_frame = pd.DataFrame({
+        'Id': np.arange(providers).astype(str),
+        'NAME': np.char.add('Provider ', np.arange(providers).astype(str)),
+        'CITY': rng.choice(synthetic.CITIES, providers),
+        'LAT': provider_xy[:, 0],
+        'LON': provider_xy[:, 1],
+    })
+    return patient_frame, provider_frame
+
+
+def _haversine_km(lat, lon, lats, lons):
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * accessibility.EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def _check(engine, results_within, patients, providers, radius_km, seed=1):
+    # Brute force over every provider for a sample: (seconds, max km error, count mismatches)
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(engine.frame), min(SAMPLE, len(engine.frame)), replace=False)
+    lats, lons = providers['LAT'].to_numpy(), providers['LON'].to_numpy()
+    started = time.perf_counter()
+    errors, mismatches = [], 0
+    for row in sample:
+        distances = _haversine_km(float(patients['LAT'].iloc[row]), float(patients['LON'].iloc[row]), lats, lons)
+        errors.append(abs(distances.min() - engine.frame['NEAREST_KM'].iloc[row]))
+        # Counts may differ only for providers sitting on the radius within float error
+        mismatches += abs(int((distances <= radius_km).sum()) - int(results_within[row])) > \
+            int((np.abs(distances - radius_km) < 1e-6).sum())
+    return time.perf_counter() - started, len(sample), max(errors), mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time provider accessibility queries against brute force.')
+    parser.add_argument('--patients', type=int, nargs='+', default=[100_000, 1_000_000, 3_000_000])
+    parser.add_argument('--providers-per', type=int, default=1_000, help='patients per provider')
+    parser.add_argument('--radius', type=float, default=accessibility.DEFAULT_RADIUS_KM)
+    args = parser.parse_args(argv)
+
+    import scipy.spatial  # noqa: F401  imported outside the timings
+    print(f"{'patients':>10} {'providers':>9} {'index':>7} {'nearest':>8} {'within':>7} {'groupby':>8} "
+          f"{'brute force (est.)':>19} {'max err km':>11} {'mismatch':>9}")
+    for count in args.patients:
+        patients, providers = _frames(count, max(10, count // args.providers_per))
+        started = time.perf_counter()
+        index = accessibility.ProviderIndex(providers)
+        index_seconds = time.perf_counter() - started
+        points = accessibility.to_xyz(patients['LAT'], patients['LON'])
+        started = time.perf_counter()
+        index.nearest(points)
+        nearest_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        within = index.count_within(points, args.radius)
+        within_seconds = time.perf_counter() - started
+
+        engine = accessibility.AccessibilityEngine(patients, providers)
+        started = time.perf_counter()
+        engine.results(args.radius)
+        groupby_seconds = time.perf_counter() - started - within_seconds
+
+        brute, sampled, error, mismatches = _check(engine, within, patients, providers, args.radius)
+        print(f'{count:>10,} {len(providers):>9,} {index_seconds:>6.2f}s {nearest_seconds:>7.2f}s '
+              f'{within_seconds:>6.2f}s {groupby_seconds:>7.2f}s {brute / sampled * count:>18.1f}s '
+              f'{error:>11.2e} {mismatches:>9}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
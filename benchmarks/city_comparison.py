@@ -0,0 +1,78 @@
+# Comparing N cities: one city at a time vs one grouped pass (healthx/compare.py).
+#
+#   python benchmarks/city_comparison.py                         # 1M encounters
+#   python benchmarks/city_comparison.py --sizes 100000 1000000 --cities 5 20 40
+#
+# For each size, synthetic CSVs are generated into --work-dir (shared with the other
+# benchmarks). For N selected cities it times:
+#
+#   pandas  loop: filter the executive summary frame per city and aggregate it
+#           (what comparing by hand through the city selectbox costs without the cube)
+#           grouped: one cube build over the frame, then city_comparison (the dashboard
+#           keeps the cube cached, so there a comparison is only the lookups)
+#   duckdb  loop: city_summary per city, each a filtered scan of the Parquet cache
+#           grouped: city_comparison, two grouped scans for all N cities
+#   arima   loop: one statsmodels fit per city for one metric
+#           grouped: one batched_arima fit of all N series
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from healthx import batched_arima, compare, config, cube, forecast, ingest, query, synthetic  # noqa: E402
+
+
+def _seconds(function):
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def run(cities, frame, duckdb):
+    loop_pandas, _ = _seconds(lambda: [cube.build_city_cube(frame[frame['CITY_x'] == city]) for city in cities])
+    grouped_pandas, _ = _seconds(lambda: cube.comparison_frames(
+        [summary for city, summary in cube.build_city_cube(frame).items() if city in set(cities)]))
+
+    duckdb.city_summary.cache_clear()
+    loop_duckdb, _ = _seconds(lambda: [duckdb.city_summary(city) for city in cities])
+    grouped_duckdb, (_, yearly) = _seconds(lambda: duckdb.city_comparison(cities))
+
+    series = [s for s in compare.metric_series('claim_cost', yearly, None, cities).values() if len(s) > 2]
+    forecast.fit_arima(series[0])  # import statsmodels outside the timing
+    loop_arima, _ = _seconds(lambda: [forecast.fit_arima(s) for s in series])
+    grouped_arima, _ = _seconds(lambda: batched_arima.fit_series_many(series))
+    return {'pandas': (loop_pandas, grouped_pandas), 'duckdb': (loop_duckdb, grouped_duckdb),
+            'arima': (loop_arima, grouped_arima)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time per-city loops against the grouped city comparison.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--cities', type=int, nargs='+', default=[5, 20, 40])
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'healthx-benchmark'))
+    args = parser.parse_args(argv)
+
+    print(f"{'encounters':>10} {'cities':>6} {'step':>7} {'loop':>9} {'grouped':>9} {'speedup':>8}")
+    for size in args.sizes:
+        data_dir = os.path.join(args.work_dir, f'data-{size}')
+        if not os.path.exists(os.path.join(data_dir, config.SOURCE_FILES['executive_summary'])):
+            synthetic.generate(data_dir, size)
+        config.DATA_DIR = data_dir
+        config.CACHE_DIR = os.path.join(args.work_dir, f'cache-{size}')
+        frame = ingest.load_table('executive_summary')
+        duckdb = query.create_backend('duckdb')
+        all_cities = duckdb.cities()
+        for count in args.cities:
+            results = run(all_cities[:count], frame, duckdb)
+            for step, (loop, grouped) in results.items():
+                print(f'{size:>10,} {min(count, len(all_cities)):>6} {step:>7} {loop * 1000:>7.0f}ms '
+                      f'{grouped * 1000:>7.0f}ms {loop / grouped:>7.1f}x')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
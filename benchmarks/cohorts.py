@@ -0,0 +1,110 @@
+# Cohort filters: bitmap index vs pandas masks (healthx/cohort.py).
+#
+#   python benchmarks/cohorts.py                         # 1M and 3M patients
+#   python benchmarks/cohorts.py --patients 5000000 --queries 100
+#
+# Patients (with AGE, age group and income bracket as in the data context) and their
+# encounters (20 per patient) are drawn in memory. --queries random filter combinations
+# (1-5 dimensions, 1-3 values each) are answered both ways:
+#
+#   masks   isin() per filtered dimension over the patient frame, value_counts per
+#           dimension for the breakdowns, the encounter total from the fact table
+#   bitmap  CohortIndex.summary(): OR / AND of packed bitmaps and popcounts
+#
+# Every answer is compared; reported are the index build time and size, and the median
+# and p95 query time of each method.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from healthx import cohort, context, income, synthetic  # noqa: E402
+
+ENCOUNTERS_PER_PATIENT = 20
+
+
+def _frames(count, seed=0):
+    rng = np.random.default_rng(seed)
+    patients = pd.DataFrame({
+        'PATIENT_KEY': np.arange(count, dtype=np.int32),
+        'GENDER': pd.Categorical(rng.choice(synthetic.GENDERS, count)),
+        'RACE': pd.Categorical(rng.choice(synthetic.RACES, count, p=synthetic.RACE_WEIGHTS)),
+        'CITY': pd.Categorical(rng.choice(synthetic.CITIES, count)),
+        'AGE': rng.integers(0, 100, count),
+        'INCOME': rng.lognormal(10.8, 0.6, count).astype(np.float32),
+    })
+    patients['Age Group'] = context.age_group(patients['AGE'])
+    patients['Income Group'] = income.income_group(patients['INCOME'])
+    facts = pd.DataFrame({'PATIENT_KEY': rng.integers(0, count, count * ENCOUNTERS_PER_PATIENT).astype(np.int32)})
+    return patients, facts
+
+
+def _random_filters(index, rng):
+    columns = rng.choice(list(index.values), rng.integers(1, len(index.values) + 1), replace=False)
+    return {column: list(rng.choice(index.values[column], min(len(index.values[column]), rng.integers(1, 4)),
+                                    replace=False)) for column in columns}
+
+
+def _masks(patients, facts, filters):
+    mask = np.ones(len(patients), dtype=bool)
+    for column, selected in filters.items():
+        mask &= patients[column].isin(selected).to_numpy()
+    cohort_frame = patients[mask]
+    breakdowns = {label: cohort_frame[column].value_counts() for column, label in cohort.DIMENSIONS.items()}
+    encounters = int(facts['PATIENT_KEY'].isin(cohort_frame['PATIENT_KEY']).sum())
+    return int(mask.sum()), encounters, breakdowns
+
+
+def _same(summary, expected):
+    patients, encounters, breakdowns = expected
+    if (summary.patients, summary.encounters) != (patients, encounters):
+        return False
+    for label, frame in summary.breakdowns.items():
+        counts = breakdowns[label].reindex(frame[label]).fillna(0).to_numpy()
+        if not np.array_equal(counts, frame['Patients'].to_numpy()):
+            return False
+    return True
+
+
+def _stats(seconds):
+    return f'{np.median(seconds) * 1000:>7.1f}ms {np.percentile(seconds, 95) * 1000:>7.1f}ms'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare bitmap cohort queries with pandas masks.')
+    parser.add_argument('--patients', type=int, nargs='+', default=[1_000_000, 3_000_000])
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    print(f"{'patients':>10} {'build':>7} {'index MB':>9} {'masks p50/p95':>18} {'bitmap p50/p95':>18} {'speedup':>8} {'equal':>6}")
+    for count in args.patients:
+        patients, facts = _frames(count)
+        started = time.perf_counter()
+        index = cohort.CohortIndex(patients, facts)
+        build = time.perf_counter() - started
+
+        rng = np.random.default_rng(1)
+        mask_seconds, bitmap_seconds, equal = [], [], 0
+        for _ in range(args.queries):
+            filters = _random_filters(index, rng)
+            started = time.perf_counter()
+            expected = _masks(patients, facts, filters)
+            mask_seconds.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            summary = index.summary(filters)
+            bitmap_seconds.append(time.perf_counter() - started)
+            equal += _same(summary, expected)
+        print(f'{count:>10,} {build:>6.2f}s {index.nbytes / 2**20:>9.1f} {_stats(mask_seconds):>18} '
+              f'{_stats(bitmap_seconds):>18} {np.median(mask_seconds) / np.median(bitmap_seconds):>7.1f}x '
+              f'{equal:>3}/{args.queries}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+# Derived encounter columns computed at ingest (healthx/derived.py) vs per load.
+#
+#   python benchmarks/derived_columns.py                  # 1M encounters
+#   python benchmarks/derived_columns.py --size 100000
+#
+# Synthetic CSVs are generated into --work-dir (shared with the other benchmarks) and
+# converted to the Parquet cache once. Compared are the two ways of getting the city
+# cube from the cache: loading the raw START_x / START_y timestamps and deriving YEAR and
+# DIAGNOSIS_TO_TREATMENT on a copy after the load (what every process did before), and
+# loading the precomputed columns and only aggregating. Both cubes must agree. Also
+# reported: the one-off cost of the derived stage inside the cache build, and the
+# timestamp quality stored with the cache.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from healthx import config, cube, derived, ingest, schema, synthetic, tracing  # noqa: E402
+
+RAW_COLUMNS = [column for column in ingest.TABLE_COLUMNS['executive_summary']
+               if column not in derived.AGGREGATE_COLUMNS] + derived.TIMESTAMP_COLUMNS
+
+
+def _timed(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the precomputed derived-column stage.')
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'healthx-benchmark'))
+    args = parser.parse_args(argv)
+
+    data_dir = os.path.join(args.work_dir, f'data-{args.size}')
+    if not os.path.exists(os.path.join(data_dir, config.SOURCE_FILES['executive_summary'])):
+        synthetic.generate(data_dir, args.size)
+    config.DATA_DIR = data_dir
+    config.CACHE_DIR = os.path.join(args.work_dir, f'cache-{args.size}')
+
+    with tracing.trace() as build:
+        ingest.build_cache('executive_summary')
+    stages = {name: seconds for name, _, seconds, _ in filter(None, build.spans)}
+
+    def per_load():
+        frame = ingest.load_table('executive_summary', columns=RAW_COLUMNS)
+        return cube.build_city_cube(frame), frame
+
+    def precomputed():
+        frame = ingest.load_table('executive_summary')
+        return cube.build_city_cube(frame), frame
+
+    (old_cube, old_frame), old_seconds = _timed(per_load, args.repeat)
+    (new_cube, new_frame), new_seconds = _timed(precomputed, args.repeat)
+    for city, summary in old_cube.items():
+        other = new_cube[city]
+        for field in cube.KPI_FIELDS:
+            assert np.isclose(getattr(summary, field), getattr(other, field), rtol=1e-6), (city, field)
+        assert summary.yearly['NUM_ENCOUNTERS'].tolist() == other.yearly['NUM_ENCOUNTERS'].tolist(), city
+
+    print(f'{args.size:,} encounters, {len(new_cube)} cities')
+    print(f"cache build {build.seconds:.2f}s, of which derived columns {stages.get('derive_columns', 0) * 1000:.0f}ms (once per data version)")
+    print(f"{'':<28} {'load + cube':>12} {'frame MB':>9}")
+    print(f"{'derive after every load':<28} {old_seconds * 1000:>10.0f}ms {schema.memory_footprint(old_frame) / 2**20:>9.1f}")
+    print(f"{'precomputed at ingest':<28} {new_seconds * 1000:>10.0f}ms {schema.memory_footprint(new_frame) / 2**20:>9.1f}")
+    print(f'{1 - new_seconds / old_seconds:.0%} less time per cube build')
+    print()
+    print(derived.quality_frame(derived.load_quality()).to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+# Exact ID sets vs HyperLogLog sketches for the provider / patient distinct counts
+# (healthx/incremental.py, healthx/sketch.py).
+#
+#   python benchmarks/distinct_sketches.py                      # 100k and 1M encounters
+#   python benchmarks/distinct_sketches.py --sizes 1000000 --precision 10 12 14
+#
+# For each size, synthetic CSVs are generated into --work-dir (shared with the other
+# benchmarks) and the aggregates are built in both modes. Reported per mode: build time,
+# size of the distinct state in memory and on disk, the relative error of every
+# (city, year) count and of roll-ups (all cities and years, each year over all cities,
+# random city groups over random year ranges) against the exact counts, and the time
+# to answer a roll-up.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from healthx import config, incremental, ingest, sketch, synthetic  # noqa: E402
+
+ROLLUPS = 50
+
+
+def _rollups(aggregates, seed=0):
+    # (cities, years) selections: everything, one year at a time, random groups and ranges
+    cities = sorted(aggregates.kpis.index)
+    years = sorted(aggregates.yearly.index.get_level_values('YEAR').unique())
+    selections = [(None, None)] + [(None, [year]) for year in years]
+    rng = random.Random(seed)
+    for _ in range(ROLLUPS):
+        start = rng.randrange(len(years))
+        selections.append((rng.sample(cities, rng.randint(2, max(2, len(cities) // 2))),
+                           years[start:start + rng.randint(1, 5)]))
+    return selections
+
+
+def _errors(estimates, exact):
+    estimates, exact = np.asarray(estimates, dtype=float), np.asarray(exact, dtype=float)
+    keep = exact > 0
+    return np.abs(estimates[keep] - exact[keep]) / exact[keep]
+
+
+def _state_bytes(aggregates):
+    return int(aggregates.distinct.memory_usage(index=True, deep=True).sum())
+
+
+def _disk_bytes(directory):
+    return sum(os.path.getsize(os.path.join(directory, name))
+               for name in os.listdir(directory) if name.startswith('distinct-'))
+
+
+def _summary(errors):
+    if not len(errors):
+        return '        -'
+    return f'{np.mean(errors):>6.2%} {np.percentile(errors, 95):>6.2%} {np.max(errors):>6.2%}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare exact and sketched distinct counts.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--precision', type=int, nargs='+', default=[sketch.DEFAULT_PRECISION])
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'healthx-benchmark'))
+    args = parser.parse_args(argv)
+
+    print(f"{'encounters':>10} {'mode':>9} {'build':>7} {'state MB':>9} {'disk MB':>8} "
+          f"{'cell err mean/p95/max':>22} {'rollup err mean/p95/max':>24} {'rollup ms':>9}")
+    for size in args.sizes:
+        data_dir = os.path.join(args.work_dir, f'data-{size}')
+        if not os.path.exists(os.path.join(data_dir, config.SOURCE_FILES['executive_summary'])):
+            synthetic.generate(data_dir, size)
+        config.DATA_DIR = data_dir
+        config.CACHE_DIR = os.path.join(args.work_dir, f'cache-{size}')
+        os.environ['HEALTHX_DELTA_DIR'] = os.path.join(data_dir, 'deltas')
+        ingest.ensure_cache('executive_summary')
+
+        exact_cells = exact_rollups = None
+        for mode, precision in [('exact', None)] + [('approx', p) for p in args.precision]:
+            label = mode if precision is None else f'p={precision}'
+            directory = os.path.join(config.CACHE_DIR, f'aggregates-benchmark-{label}')
+            started = time.perf_counter()
+            frame = incremental.read_base()
+            aggregates = incremental.CityAggregates.from_frame(frame, mode, precision or sketch.DEFAULT_PRECISION)
+            build = time.perf_counter() - started
+            aggregates.save(directory, 1)
+
+            cells = aggregates._nunique()
+            selections = _rollups(aggregates)
+            started = time.perf_counter()
+            rollups = [aggregates.distinct_counts(cities, years) for cities, years in selections]
+            rollup_ms = (time.perf_counter() - started) / len(selections) * 1000
+            if mode == 'exact':
+                exact_cells, exact_rollups = cells, rollups
+                cell_errors = rollup_errors = []
+            else:
+                cell_errors = _errors(cells.reindex_like(exact_cells).to_numpy().ravel(), exact_cells.to_numpy().ravel())
+                rollup_errors = np.concatenate([
+                    _errors([r[column] for r in rollups], [r[column] for r in exact_rollups])
+                    for column in incremental.ID_COLUMNS])
+            print(f'{size:>10,} {label:>9} {build:>6.2f}s {_state_bytes(aggregates) / 2**20:>9.2f} '
+                  f'{_disk_bytes(directory) / 2**20:>8.2f} {_summary(cell_errors):>22} '
+                  f'{_summary(rollup_errors):>24} {rollup_ms:>9.2f}')
+        print(f'{"":>10} expected standard error: ' +
+              ', '.join(f'p={p}: {sketch.standard_error(p):.2%}' for p in args.precision))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
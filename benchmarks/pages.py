@@ -0,0 +1,189 @@
+# Time and peak memory of every page's data path on synthetic data.
+#
+#   python benchmarks/pages.py                                  # 10k, 100k and 1M encounters
+#   python benchmarks/pages.py --sizes 10000 10000000
+#   python benchmarks/pages.py --save-baseline benchmarks/baseline.json
+#   python benchmarks/pages.py --baseline benchmarks/baseline.json --threshold 0.25
+#
+# Source CSVs are written by healthx.synthetic into --work-dir (and reused on later
+# runs). Each step runs the same functions the pages call, without Streamlit or a
+# browser: ingestion, the shared data context (which also holds the Age Distribution
+# stats), the other demographics tabs, the General Insights cube, KPIs and charts for
+# the largest city, and all five Predictive Insights forecasts for that city.
+# Time is the best of --repeat runs; peak memory is the tracemalloc peak of one more
+# run (numpy and pandas buffers included). With --baseline the script exits with
+# status 1 when a step is slower or larger than the baseline by more than the threshold.
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from healthx import config, context, cube, forecast, income, ingest, query, synthetic  # noqa: E402
+from healthx.pages import demographics, general_insights  # noqa: E402
+
+# Imported up front so the first forecast step is not charged for loading statsmodels
+from statsmodels.tsa.arima.model import ARIMA  # noqa: E402,F401
+
+# Differences below these are treated as noise whatever the relative threshold
+MIN_SECONDS = 0.05
+MIN_MB = 2.0
+
+
+def _ingest_setup(state):
+    shutil.rmtree(config.CACHE_DIR, ignore_errors=True)
+
+
+def _ingest(state):
+    for table in config.SOURCE_FILES:
+        ingest.build_cache(table)
+
+
+def _context(state):
+    state['context'] = context.build_data_context()
+
+
+def _pandas_backend(state):
+    # Answers from the context and cube built by the earlier steps, like the dashboard
+    return query.PandasBackend(as_of=state['context'].as_of, load_context=lambda: state['context'],
+                               load_cube=lambda: state['cube'])
+
+
+def _gender(state):
+    demographics.gender_breakdown(state['context'], _pandas_backend(state))
+
+
+def _geographic(state):
+    demographics.geographic_breakdown(state['context'], _pandas_backend(state))
+
+
+def _income(state):
+    income.build_income_analytics(state['context'].patients)
+
+
+def _city_cube(state):
+    state['cube'] = cube.build_city_cube(ingest.load_table('executive_summary'))
+    state['city'] = max(state['cube'], key=lambda city: state['cube'][city].total_encounters)
+
+
+def _city_charts(state):
+    general_insights.city_figures(state['cube'][state['city']])
+
+
+def _forecasts(state):
+    city = state['city']
+    population_df = state['context'].population
+    for metric in forecast.METRICS:
+        series = forecast.metric_series(metric, city, state['cube'][city], population_df)
+        if len(series) > 2:
+            forecast.forecast_figure(metric, city, series, forecast.fit_arima(series))
+
+
+# (name, setup run before every repeat or None, step); later steps use state from earlier ones
+STEPS = [
+    ('ingest: CSV -> Parquet (cold)', _ingest_setup, _ingest),
+    ('data context (incl. age distribution)', None, _context),
+    ('demographics: gender analysis', None, _gender),
+    ('demographics: geographic distribution', None, _geographic),
+    ('demographics: income analysis', None, _income),
+    ('general insights: city cube', None, _city_cube),
+    ('general insights: KPIs + 6 charts', None, _city_charts),
+    ('predictive insights: 5 forecasts', None, _forecasts),
+]
+
+
+def _measure(setup, step, state, repeat):
+    seconds = []
+    for _ in range(repeat):
+        if setup:
+            setup(state)
+        gc.collect()
+        started = time.perf_counter()
+        step(state)
+        seconds.append(time.perf_counter() - started)
+    if setup:
+        setup(state)
+    gc.collect()
+    tracemalloc.start()
+    step(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': min(seconds), 'peak_mb': peak / 2**20}
+
+
+def run_size(encounters, work_dir, repeat):
+    data_dir = os.path.join(work_dir, f'data-{encounters}')
+    if not os.path.exists(os.path.join(data_dir, config.SOURCE_FILES['executive_summary'])):
+        started = time.perf_counter()
+        synthetic.generate(data_dir, encounters)
+        print(f'generated {encounters:,} encounters in {time.perf_counter() - started:.1f}s')
+    config.DATA_DIR = data_dir
+    config.CACHE_DIR = os.path.join(work_dir, f'cache-{encounters}')
+
+    state, results = {}, {}
+    for name, setup, step in STEPS:
+        results[name] = _measure(setup, step, state, repeat)
+        print(f"{encounters:>10,} {name:<40} {results[name]['seconds']:>9.3f}s {results[name]['peak_mb']:>9.1f} MB")
+    return results
+
+
+def regressions(results, baseline, threshold, memory_threshold):
+    # Messages for every step that got slower or bigger than the baseline allows
+    found = []
+    for size, steps in results.items():
+        for name, result in steps.items():
+            before = baseline.get(size, {}).get(name)
+            if not before:
+                continue
+            if (result['seconds'] > before['seconds'] * (1 + threshold)
+                    and result['seconds'] - before['seconds'] > MIN_SECONDS):
+                found.append(f"{size} encounters, {name}: {result['seconds']:.3f}s vs {before['seconds']:.3f}s")
+            if (result['peak_mb'] > before['peak_mb'] * (1 + memory_threshold)
+                    and result['peak_mb'] - before['peak_mb'] > MIN_MB):
+                found.append(f"{size} encounters, {name}: {result['peak_mb']:.1f} MB vs {before['peak_mb']:.1f} MB")
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the data path of every dashboard page.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='encounter counts to generate and benchmark (10k to 10M)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'healthx-benchmark'),
+                        help='folder for the synthetic CSVs and caches')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--save-baseline', help='write the results as a new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed relative slowdown per step')
+    parser.add_argument('--memory-threshold', type=float, default=0.25, help='allowed relative peak memory growth')
+    args = parser.parse_args(argv)
+
+    print(f"{'encounters':>10} {'step':<40} {'time':>10} {'peak':>12}")
+    results = {str(size): run_size(size, args.work_dir, args.repeat) for size in args.sizes}
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as handle:
+                json.dump(results, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            found = regressions(results, json.load(handle), args.threshold, args.memory_threshold)
+        if found:
+            print('\nRegressions against', args.baseline)
+            for message in found:
+                print('  ' + message)
+            return 1
+        print('\nNo regressions against', args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+# Bytes sent to the browser per rerun, with and without compact figures and paged tables
+# (healthx/payload.py).
+#
+#   python benchmarks/payloads.py                       # 100k encounters
+#   python benchmarks/payloads.py --size 1000000 --page-rows 10
+#
+# Drives dashboard.py with Streamlit's AppTest on synthetic data generated into
+# --work-dir (shared with the other benchmarks) through every page and section, once with
+# HEALTHX_COMPACT=0 and once with the default, each in a fresh process. After every
+# step the elements on the page are the payload of a full rerun: reported are the bytes
+# of the Plotly charts, of the tables and of everything, and the time spent in
+# st.plotly_chart (serializing the figures). --page-rows lowers the table page size so
+# the 40-city tables page as larger frames would.
+#
+# A second part times one long line chart (--points points) as it would be sent: JSON
+# size, serialization time and the number of points the browser has to draw.
+#
+# Browser render time is not measured here (no browser); the points drawn and WebGL vs
+# SVG traces are its proxy.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from healthx import config, payload, synthetic, tracing  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BUTTONS = ['Age Distribution', 'Gender Analysis', 'Geographic Distribution', 'Income Analysis']
+CHART_TYPES = {'plotly_chart'}
+TABLE_TYPES = {'arrow_data_frame', 'dataframe', 'table'}
+
+
+def _walk(node):
+    yield node
+    children = getattr(node, 'children', None) or {}
+    for child in children.values():
+        yield from _walk(child)
+
+
+def _sizes(app):
+    # {'charts': bytes, 'tables': bytes, 'total': bytes} of the elements on the page
+    sizes = {'charts': 0, 'tables': 0, 'total': 0}
+    for node in _walk(app._tree):
+        proto = getattr(node, 'proto', None)
+        if proto is None or not hasattr(proto, 'ByteSize'):
+            continue
+        size = proto.ByteSize()
+        kind = getattr(node, 'type', '')
+        sizes['total'] += size
+        if kind in CHART_TYPES:
+            sizes['charts'] += size
+        elif kind in TABLE_TYPES:
+            sizes['tables'] += size
+    return sizes
+
+
+def _steps(app):
+    def page(name):
+        return lambda: app.sidebar.radio[0].set_value(name).run()
+
+    def click(label):
+        return lambda: next(b for b in app.button if b.label == label).click().run()
+
+    def mode(key, value):
+        return lambda: next(r for r in app.radio if r.key == key).set_value(value).run()
+
+    def every_city(key):
+        return lambda: next(c for c in app.checkbox if c.key == f'{key}_all').check().run()
+
+    steps = [('Demographics: open', 'Patient Demographics Analysis', page('Patient Demographics Analysis'))]
+    steps += [(f'Demographics: {label}', 'Patient Demographics Analysis', click(label)) for label in BUTTONS]
+    steps += [
+        ('General Insights: city', 'General Insights', page('General Insights')),
+        ('General Insights: city change', 'General Insights', lambda: app.selectbox[0].select_index(1).run()),
+        ('General Insights: compare 3 cities', 'General Insights', mode('general_insights_mode', 'Compare cities')),
+        ('General Insights: compare all', 'General Insights', every_city('general_insights_compare')),
+        ('Predictive Insights: city', 'Predictive Insights', page('Predictive Insights')),
+        ('Predictive Insights: compare 3 cities', 'Predictive Insights',
+         mode('predictive_insights_mode', 'Compare cities')),
+        ('Predictive Insights: compare all', 'Predictive Insights', every_city('predictive_insights_compare')),
+        ('Predictive Insights: scenarios', 'Predictive Insights', mode('predictive_insights_mode', 'Scenarios')),
+        ('Predictive Insights: scenarios, all', 'Predictive Insights', every_city('scenario_cities')),
+    ]
+    return steps
+
+
+def run_session():
+    # Runs in a child process: [(step, sizes, serialization seconds)]
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, 'dashboard.py'), default_timeout=600)
+    app.run()
+    rows = []
+    for step, page, action in _steps(app):
+        before = tracing.histograms().get(('plotly_serialization', page), {'sum': 0.0})['sum']
+        action()
+        if app.exception:
+            raise RuntimeError(f'{step}: {app.exception[0].message}')
+        after = tracing.histograms().get(('plotly_serialization', page), {'sum': 0.0})['sum']
+        rows.append((step, _sizes(app), after - before))
+    return rows
+
+
+def _session(env):
+    output = subprocess.run([sys.executable, __file__, '--child'], env={**os.environ, **env},
+                            stdout=subprocess.PIPE, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def long_series(points):
+    # (label, JSON bytes, serialization seconds, points drawn, trace type) before / after
+    import plotly.express as px
+    import plotly.io as pio
+
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({'Time': pd.date_range('2010-01-01', periods=points, freq='min'),
+                          'Value': np.cumsum(rng.standard_normal(points))})
+    figure = px.line(frame, x='Time', y='Value')
+    started = time.perf_counter()
+    compact = payload.compact(figure)
+    compact_seconds = time.perf_counter() - started
+    rows = []
+    for label, candidate in (('raw', figure), ('compact', compact)):
+        started = time.perf_counter()
+        spec = pio.to_json(candidate.to_dict(), validate=False)
+        rows.append((label, len(spec), time.perf_counter() - started, len(candidate.data[0].y), candidate.data[0].type))
+    return rows, compact_seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure browser payloads with and without compaction.')
+    parser.add_argument('--size', type=int, default=100_000, help='synthetic encounters')
+    parser.add_argument('--page-rows', type=int, default=payload.PAGE_ROWS, help='table page size')
+    parser.add_argument('--points', type=int, default=500_000, help='points of the long line chart')
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'healthx-benchmark'))
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_session()))
+        return 0
+
+    data_dir = os.path.join(args.work_dir, f'data-{args.size}')
+    if not os.path.exists(os.path.join(data_dir, config.SOURCE_FILES['executive_summary'])):
+        synthetic.generate(data_dir, args.size)
+    env = {
+        'HEALTHX_DATA_DIR': data_dir,
+        'HEALTHX_CACHE_DIR': os.path.join(args.work_dir, f'cache-{args.size}'),
+        'HEALTHX_FORECAST_STORE': os.path.join(args.work_dir, f'payloads-forecasts-{args.size}.json'),
+        'HEALTHX_USAGE_LOG': os.path.join(args.work_dir, f'payloads-usage-{args.size}.json'),
+        'HEALTHX_WARMER': '0',
+        'HEALTHX_PAGE_ROWS': str(args.page_rows),
+    }
+    # First session fills the caches and the forecast store for both measured sessions
+    _session({**env, 'HEALTHX_COMPACT': '0'})
+    before = _session({**env, 'HEALTHX_COMPACT': '0'})
+    after = _session({**env, 'HEALTHX_COMPACT': '1'})
+
+    print(f"{'step':<36} {'charts KB':>15} {'tables KB':>15} {'total KB':>15} {'serialize ms':>13}")
+    totals = [0, 0]
+    for (step, old, old_seconds), (_, new, new_seconds) in zip(before, after):
+        totals[0] += old['total']
+        totals[1] += new['total']
+        print(f"{step:<36} {old['charts'] / 1024:>6.1f} → {new['charts'] / 1024:>6.1f} "
+              f"{old['tables'] / 1024:>6.1f} → {new['tables'] / 1024:>6.1f} "
+              f"{old['total'] / 1024:>6.1f} → {new['total'] / 1024:>6.1f} "
+              f"{old_seconds * 1000:>5.1f} → {new_seconds * 1000:>4.1f}")
+    print(f"{'all steps':<36} {'':>31} {totals[0] / 1024:>6.1f} → {totals[1] / 1024:>6.1f} "
+          f"({1 - totals[1] / totals[0]:.0%} less)")
+
+    rows, compact_seconds = long_series(args.points)
+    print(f"\nLong line chart, {args.points:,} points (compacted once in {compact_seconds * 1000:.0f}ms):")
+    for label, size, seconds, points, kind in rows:
+        print(f'  {label:<8} {size / 1024:>9.1f} KB  serialize {seconds * 1000:>7.1f}ms  {points:>9,} points drawn ({kind})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
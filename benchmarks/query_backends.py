@@ -0,0 +1,151 @@
+# Parity and out-of-core behaviour of the query backends (healthx/query.py).
+#
+#   python benchmarks/query_backends.py                         # 100k and 1M encounters
+#   python benchmarks/query_backends.py --sizes 10000000 --memory-limit 256MB --no-parity
+#   python benchmarks/query_backends.py --sizes 1000000 --memory-limit 300MB --enforce
+#
+# For each size, synthetic CSVs are generated into --work-dir (shared with
+# benchmarks/pages.py) and converted to the Parquet cache once. The parity check runs
+# every query on both backends and exits with status 1 on any mismatch. Each backend
+# then answers the full query set (city list, every city's KPIs and yearly series,
+# encounters by city, gender x age group, income by race and city) in a fresh
+# process, reporting time and peak RSS next to the in-memory size of the tables. DuckDB
+# gets --memory-limit and spills past it; with --enforce both processes also run under
+# an address-space limit of that size, which the pandas backend cannot stay within
+# once the tables are larger.
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from healthx import config, context, ingest, query, synthetic  # noqa: E402
+
+TABLES = ['patients', 'encounters', 'executive_summary']
+UNITS = {'KB': 2**10, 'MB': 2**20, 'GB': 2**30}
+
+
+def _bytes(size):
+    size = size.strip().upper()
+    for unit, factor in UNITS.items():
+        if size.endswith(unit):
+            return int(float(size[:-len(unit)]) * factor)
+    return int(size)
+
+
+def in_memory_mb():
+    # Uncompressed size of the cached tables, as recorded in the Parquet metadata
+    import pyarrow.parquet as pq
+
+    total = 0
+    for table in TABLES:
+        metadata = pq.ParquetFile(ingest.ensure_cache(table)).metadata
+        total += sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+    return total / 2**20
+
+
+def peak_rss_mb():
+    # VmHWM starts afresh at exec; ru_maxrss would also count the parent process image
+    try:
+        with open('/proc/self/status') as handle:
+            for line in handle:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_queries(backend):
+    for city in backend.cities():
+        backend.city_summary(city)
+    backend.encounters_by_city()
+    backend.gender_age_counts()
+    for column in query.INCOME_COLUMNS:
+        backend.income_by(column)
+
+
+def child(name, as_of, memory_limit, enforce):
+    if enforce and memory_limit:
+        limit = _bytes(memory_limit)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    started = time.perf_counter()
+    try:
+        kwargs = {'memory_limit': memory_limit} if name == 'duckdb' and memory_limit else {}
+        run_queries(query.create_backend(name, as_of=as_of, **kwargs))
+        status = 'ok'
+    except MemoryError:
+        status = 'MemoryError'
+    except Exception as error:  # DuckDB reports running out of memory as its own error types
+        status = f'{type(error).__name__}: {str(error).splitlines()[0][:60]}'
+    seconds = time.perf_counter() - started
+    peak_mb = peak_rss_mb()
+    print('RESULT' + json.dumps({'status': status, 'seconds': seconds, 'peak_mb': peak_mb}))
+
+
+def _run_child(name, as_of, args):
+    command = [sys.executable, os.path.abspath(__file__), '--child', name, '--as-of', str(as_of)]
+    if args.memory_limit:
+        command += ['--memory-limit', args.memory_limit]
+    if args.enforce:
+        command.append('--enforce')
+    env = {**os.environ, 'HEALTHX_DATA_DIR': config.DATA_DIR, 'HEALTHX_CACHE_DIR': config.CACHE_DIR}
+    completed = subprocess.run(command, capture_output=True, text=True, env=env)
+    lines = [line for line in completed.stdout.splitlines() if line.startswith('RESULT')]
+    if not lines:
+        # Killed before it could report, e.g. by the kernel OOM killer
+        return {'status': f'exit {completed.returncode}', 'seconds': float('nan'), 'peak_mb': float('nan')}
+    return json.loads(lines[-1][len('RESULT'):])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check query backend parity and out-of-core behaviour.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'healthx-benchmark'))
+    parser.add_argument('--memory-limit', help='DuckDB memory limit, e.g. 256MB (and the --enforce limit)')
+    parser.add_argument('--enforce', action='store_true', help='run both backends under an address-space limit')
+    parser.add_argument('--no-parity', action='store_true', help='skip the parity check (it loads the data in memory)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--as-of', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.child, args.as_of, args.memory_limit, args.enforce)
+        return 0
+
+    as_of = context.refresh_stamp()
+    mismatches = 0
+    print(f"{'encounters':>10} {'tables MB':>10} {'backend':>8} {'status':>12} {'time':>9} {'peak RSS':>10}")
+    for size in args.sizes:
+        data_dir = os.path.join(args.work_dir, f'data-{size}')
+        if not os.path.exists(os.path.join(data_dir, config.SOURCE_FILES['executive_summary'])):
+            synthetic.generate(data_dir, size)
+        config.DATA_DIR = data_dir
+        config.CACHE_DIR = os.path.join(args.work_dir, f'cache-{size}')
+        for table in config.SOURCE_FILES:
+            ingest.ensure_cache(table)
+
+        if not args.no_parity:
+            found = query.check_parity(query.create_backend('pandas', as_of=as_of),
+                                       query.create_backend('duckdb', as_of=as_of))
+            print(f"{size:>10,} parity: {'identical' if not found else f'{len(found)} mismatches'}")
+            for message in found:
+                print('    ' + message)
+            mismatches += len(found)
+
+        tables_mb = in_memory_mb()
+        for name in query.BACKENDS:
+            result = _run_child(name, as_of, args)
+            print(f"{size:>10,} {tables_mb:>10.0f} {name:>8} {result['status'][:12]:>12} "
+                  f"{result['seconds']:>8.2f}s {result['peak_mb']:>7.0f} MB")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
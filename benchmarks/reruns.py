@@ -0,0 +1,119 @@
+# Rerun latency of widget interactions, full-script reruns vs fragments.
+#
+#   python benchmarks/reruns.py                        # 100k encounters
+#   python benchmarks/reruns.py --size 1000000 --cities 8
+#
+# Drives dashboard.py with Streamlit's AppTest on synthetic data generated into
+# --work-dir (shared with the other benchmarks): a city change on General Insights and
+# on Predictive Insights for --cities cities, and each demographics button. Forecasts are
+# fitted into a scratch store up front so both modes read stored fits.
+#
+#   before  HEALTHX_FRAGMENTS=0: every interaction reruns dashboard.py and rebuilds
+#           every figure; the time is the dashboard's per-rerun trace
+#   after   the interaction reruns only its fragment; the time is the fragment's trace,
+#           on the first visit of a city or section and on a revisit (memoized figures)
+#
+# AppTest always executes the whole script, so the fragment time is what Streamlit
+# reruns for that interaction in a served app; both columns exclude widget transport.
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from healthx import config, ingest, synthetic, tracing  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BUTTONS = ['Age Distribution', 'Gender Analysis', 'Geographic Distribution', 'Income Analysis']
+
+
+def _last_seconds(stage, page, before):
+    # Seconds recorded for (stage, page) since the `before` histogram snapshot
+    after = tracing.histograms().get((stage, page), {'count': 0, 'sum': 0.0})
+    previous = before.get((stage, page), {'count': 0, 'sum': 0.0})
+    if after['count'] == previous['count']:
+        return float('nan')
+    return (after['sum'] - previous['sum']) / (after['count'] - previous['count'])
+
+
+def _timed(app, action, page, stage):
+    before = tracing.histograms()
+    action()
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return _last_seconds(stage, page, before)
+
+
+def _interactions(app, cities):
+    # (interaction, page, action) in the order they run
+    steps = []
+    for page in ('General Insights', 'Predictive Insights'):
+        steps.append((None, page, lambda page=page: app.sidebar.radio[0].set_value(page).run()))
+        for city in cities:
+            steps.append((f'{page}: city change', page, lambda city=city: app.selectbox[0].set_value(city).run()))
+    steps.append((None, 'Patient Demographics Analysis',
+                  lambda: app.sidebar.radio[0].set_value('Patient Demographics Analysis').run()))
+    for label in BUTTONS:
+        steps.append((f'Demographics: {label}', 'Patient Demographics Analysis',
+                      lambda label=label: next(b for b in app.button if b.label == label).click().run()))
+    return steps
+
+
+def run_mode(cities, fragments, rounds=2):
+    # {interaction: [seconds per round, each the median over its repetitions]}
+    from streamlit.testing.v1 import AppTest
+
+    os.environ['HEALTHX_FRAGMENTS'] = '1' if fragments else '0'
+    app = AppTest.from_file(os.path.join(ROOT, 'dashboard.py'), default_timeout=600)
+    app.run()
+    stage = 'fragment' if fragments else 'rerun'
+    results = {}
+    for _ in range(rounds):
+        samples = {}
+        for interaction, page, action in _interactions(app, cities):
+            seconds = _timed(app, action, page, stage)
+            if interaction:
+                samples.setdefault(interaction, []).append(seconds)
+        for interaction, values in samples.items():
+            results.setdefault(interaction, []).append(statistics.median(values))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure rerun latency with and without fragments.')
+    parser.add_argument('--size', type=int, default=100_000, help='synthetic encounters')
+    parser.add_argument('--cities', type=int, default=6, help='cities to switch between')
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'healthx-benchmark'))
+    args = parser.parse_args(argv)
+
+    data_dir = os.path.join(args.work_dir, f'data-{args.size}')
+    if not os.path.exists(os.path.join(data_dir, config.SOURCE_FILES['executive_summary'])):
+        synthetic.generate(data_dir, args.size)
+    os.environ.update({
+        'HEALTHX_DATA_DIR': data_dir,
+        'HEALTHX_CACHE_DIR': os.path.join(args.work_dir, f'cache-{args.size}'),
+        'HEALTHX_FORECAST_STORE': os.path.join(args.work_dir, f'reruns-forecasts-{args.size}.json'),
+        'HEALTHX_USAGE_LOG': os.path.join(args.work_dir, f'reruns-usage-{args.size}.json'),
+        'HEALTHX_WARMER': '0',
+    })
+    config.DATA_DIR, config.CACHE_DIR = os.environ['HEALTHX_DATA_DIR'], os.environ['HEALTHX_CACHE_DIR']
+    cities = sorted(ingest.load_table('executive_summary', columns=['CITY_x'])['CITY_x'].dropna().astype(str).unique())
+    cities = cities[:args.cities]
+
+    # First pass fills the forecast store and the data caches for both modes
+    run_mode(cities, fragments=False, rounds=1)
+    before = run_mode(cities, fragments=False, rounds=1)
+    after = run_mode(cities, fragments=True, rounds=2)
+
+    print(f"{'interaction':<42} {'before':>9} {'after':>9} {'revisit':>9}")
+    for interaction in before:
+        first, revisit = after[interaction]
+        print(f'{interaction:<42} {before[interaction][0] * 1000:>7.1f}ms {first * 1000:>7.1f}ms {revisit * 1000:>7.1f}ms')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# Monte Carlo scenario simulation over every city (healthx/scenarios.py).
+#
+#   python benchmarks/scenarios.py                            # 1M encounters, 1k/10k/50k paths
+#   python benchmarks/scenarios.py --paths 10000 --metric population claim_cost
+#
+# Synthetic CSVs are generated into --work-dir (shared with the other benchmarks). The
+# metric's forecasts for all cities are fitted into a scratch store (batched
+# estimator). For each path count it times the simulation and the band / exceedance
+# summaries, as the Scenarios view runs them on every change of a shock, and checks
+# the unshocked paths against the model: the simulated mean against the stored point
+# forecast, and the simulated spread against the analytic ARIMA forecast deviation.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from healthx import compare, config, forecast_store, ingest, query, scenarios, synthetic  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time and check the Monte Carlo scenario engine.')
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--paths', type=int, nargs='+', default=[1_000, 10_000, 50_000])
+    parser.add_argument('--metric', nargs='+', default=['population', 'claim_cost'])
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'healthx-benchmark'))
+    args = parser.parse_args(argv)
+
+    data_dir = os.path.join(args.work_dir, f'data-{args.size}')
+    if not os.path.exists(os.path.join(data_dir, config.SOURCE_FILES['executive_summary'])):
+        synthetic.generate(data_dir, args.size)
+    config.DATA_DIR = data_dir
+    config.CACHE_DIR = os.path.join(args.work_dir, f'cache-{args.size}')
+    backend = query.create_backend('pandas')
+    _, yearly = backend.city_comparison()
+    population_df = ingest.load_table('population')
+    store = forecast_store.ForecastStore(os.path.join(args.work_dir, f'scenarios-forecasts-{args.size}.json'))
+
+    print(f"{'metric':>11} {'cities':>6} {'paths':>7} {'simulate':>9} {'summaries':>10} {'total':>8} "
+          f"{'mean err':>9} {'std err':>8}")
+    for metric in args.metric:
+        series_by_city = compare.metric_series(metric, yearly, population_df, backend.cities())
+        results, _ = compare.forecast_many(store, metric, series_by_city)
+        inputs = scenarios.model_inputs(series_by_city, results)
+        point = np.array([results[city]['forecast'] for city in inputs.cities])
+        expected_std = scenarios.forecast_std(inputs)
+        thresholds = inputs.last * 1.1
+        for paths in args.paths:
+            started = time.perf_counter()
+            levels = scenarios.simulate(inputs, paths=paths)
+            simulated = time.perf_counter() - started
+            started = time.perf_counter()
+            scenarios.bands(inputs, levels)
+            scenarios.exceedance(inputs, levels, thresholds)
+            summaries = time.perf_counter() - started
+
+            # Errors relative to the forecast deviation, where clipping at zero does not apply
+            clear = (point - 4 * expected_std > 0) & (expected_std > 0)
+            mean_error = np.abs(levels.mean(axis=1) - point)[clear] / expected_std[clear]
+            std_error = np.abs(levels.std(axis=1) / expected_std - 1)[clear]
+            print(f'{metric:>11} {len(inputs.cities):>6} {paths:>7,} {simulated * 1000:>7.0f}ms '
+                  f'{summaries * 1000:>8.0f}ms {(simulated + summaries) * 1000:>6.0f}ms '
+                  f'{mean_error.max():>9.3f} {std_error.max():>8.2%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
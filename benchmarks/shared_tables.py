@@ -0,0 +1,104 @@
+# Memory of N server processes with private vs memory-mapped data contexts
+# (healthx/shared_tables.py).
+#
+#   python benchmarks/shared_tables.py                         # 1M encounters, 4 workers
+#   python benchmarks/shared_tables.py --sizes 100000 1000000 --workers 8
+#
+# For each size, synthetic CSVs are generated into --work-dir (shared with the other
+# benchmarks) and the context is published once. Then --workers processes each hold
+# the context, built privately or mapped from the published generation, and run the
+# demographics aggregations over it. Reported per mode: time to get the context, and
+# RSS and PSS per process and summed. PSS divides shared pages between the processes
+# mapping them, so the PSS sum is the memory the workers really take together.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from healthx import config, context, ingest, shared_tables, synthetic  # noqa: E402
+
+
+def _smaps_mb():
+    values = {}
+    with open('/proc/self/smaps_rollup') as handle:
+        for line in handle:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0][:-1].lower()] = int(parts[1]) / 1024
+    return values
+
+
+def child(mode, as_of):
+    started = time.perf_counter()
+    if mode == 'mapped':
+        ctx = shared_tables.load_context(shared_tables.read_manifest())
+    else:
+        ctx = context.build_data_context(as_of=as_of)
+    seconds = time.perf_counter() - started
+    # Touch every column the way the pages do
+    ctx.encounter_facts.groupby(['Age Group', 'GENDER'], observed=False).size()
+    ctx.encounter_facts.groupby('CITY', observed=True).size()
+    ctx.patients.groupby('RACE', observed=True)['INCOME'].mean()
+    print('RESULT' + json.dumps({'seconds': seconds, **_smaps_mb()}), flush=True)
+    sys.stdin.read()  # hold the context until every worker has reported
+
+
+def _run_workers(mode, as_of, workers):
+    env = {**os.environ, 'HEALTHX_DATA_DIR': config.DATA_DIR, 'HEALTHX_CACHE_DIR': config.CACHE_DIR}
+    command = [sys.executable, os.path.abspath(__file__), '--child', mode, '--as-of', as_of.isoformat()]
+    processes = [subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env)
+                 for _ in range(workers)]
+    results = []
+    for process in processes:
+        for line in process.stdout:
+            if line.startswith('RESULT'):
+                results.append(json.loads(line[len('RESULT'):]))
+                break
+    for process in processes:
+        process.communicate('')
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare private and memory-mapped data contexts across processes.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'healthx-benchmark'))
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--as-of', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.child, args.as_of)
+        return 0
+
+    as_of = context.refresh_stamp()
+    print(f"{'encounters':>10} {'mode':>8} {'load':>7} {'RSS/proc':>9} {'PSS/proc':>9} {'PSS total':>10}")
+    for size in args.sizes:
+        data_dir = os.path.join(args.work_dir, f'data-{size}')
+        if not os.path.exists(os.path.join(data_dir, config.SOURCE_FILES['executive_summary'])):
+            synthetic.generate(data_dir, size)
+        config.DATA_DIR = data_dir
+        config.CACHE_DIR = os.path.join(args.work_dir, f'cache-{size}')
+        os.environ['HEALTHX_SHARED_DIR'] = os.path.join(args.work_dir, f'shared-{size}')
+        for table in config.SOURCE_FILES:
+            ingest.ensure_cache(table)
+        shared_tables.publish(as_of=as_of)
+
+        for mode in ('private', 'mapped'):
+            results = _run_workers(mode, as_of, args.workers)
+            count = len(results)
+            print(f"{size:>10,} {mode:>8} {sum(r['seconds'] for r in results) / count:>6.2f}s "
+                  f"{sum(r['rss'] for r in results) / count:>6.0f} MB {sum(r['pss'] for r in results) / count:>6.0f} MB "
+                  f"{sum(r['pss'] for r in results):>7.0f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
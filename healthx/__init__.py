@@ -0,0 +1 @@
+# HealthX data and analytics layer used by dashboard.py
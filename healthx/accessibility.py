@@ -0,0 +1,204 @@
+# Provider accessibility: distance from every patient to the nearest providers.
+#
+# Patients and providers both carry LAT/LON. Provider coordinates go into a scipy
+# cKDTree over 3-D points on a sphere of the Earth's radius, where the straight-line
+# (chord) distance between two points maps one-to-one onto their great-circle distance.
+# Every patient is then answered by two bulk queries instead of a patients x providers
+# loop:
+#
+#   nearest provider        tree.query(points, k=1)
+#   providers within R km   tree.query_ball_point(points, chord(R), return_length=True)
+#
+# Both walk the tree in C on all cores (workers=-1), so millions of patients take
+# seconds (benchmarks/accessibility.py). The nearest-provider distances do not depend
+# on the radius and are computed once per data version; each radius costs one more
+# counting query. Results are aggregated by city, race and income bracket for the
+# Provider Accessibility page.
+#
+#   python -m healthx.accessibility --radius 5 10 20
+
+import argparse
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from healthx import income, ingest, tracing
+
+EARTH_RADIUS_KM = 6371.0088
+RADII_KM = (2, 5, 10, 20, 50)
+DEFAULT_RADIUS_KM = 10
+# Patient column -> label of the groups the page compares
+GROUPS = {'CITY': 'City', 'RACE': 'Race', 'Income Group': 'Income Group'}
+PATIENT_COLUMNS = ['CITY', 'RACE', 'INCOME', 'LAT', 'LON']
+# Bucket edges (km) of the nearest-provider distance histogram
+HISTOGRAM_BINS = (0, 1, 2, 5, 10, 20, 50, np.inf)
+
+
+def to_xyz(lat, lon):
+    # (n, 3) points on the Earth sphere for latitude / longitude in degrees
+    lat, lon = np.radians(np.asarray(lat, dtype=np.float64)), np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return EARTH_RADIUS_KM * np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def chord_km(distance_km):
+    # Straight-line distance through the sphere for a great-circle distance
+    return 2 * EARTH_RADIUS_KM * np.sin(np.minimum(distance_km, np.pi * EARTH_RADIUS_KM) / (2 * EARTH_RADIUS_KM))
+
+
+def arc_km(chord):
+    # Great-circle distance for a straight-line distance through the sphere
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / (2 * EARTH_RADIUS_KM), 1.0))
+
+
+def _located(frame):
+    return frame['LAT'].notna().to_numpy() & frame['LON'].notna().to_numpy()
+
+
+class ProviderIndex:
+    # Spatial index over the providers that have coordinates
+    def __init__(self, providers):
+        from scipy.spatial import cKDTree
+
+        self.providers = providers[_located(providers)].reset_index(drop=True)
+        with tracing.span('spatial_index', rows=len(self.providers)):
+            self.tree = cKDTree(to_xyz(self.providers['LAT'], self.providers['LON']))
+
+    def __len__(self):
+        return len(self.providers)
+
+    def nearest(self, points):
+        # (distance km, provider row) of the nearest provider for each point
+        chord, position = self.tree.query(points, k=1, workers=-1)
+        return arc_km(chord), position
+
+    def count_within(self, points, radius_km):
+        return self.tree.query_ball_point(points, chord_km(radius_km), return_length=True, workers=-1)
+
+
+@dataclass(frozen=True)
+class AccessibilityResults:
+    radius_km: float
+    patients: int  # patients with coordinates
+    unlocated: int  # patients without coordinates, left out
+    providers: int
+    median_km: float
+    share_within: float  # share of patients with at least one provider within radius_km
+    by_group: dict  # group label -> frame, one row per city / race / income bracket
+    histogram: pd.DataFrame  # Distance (km), Patients
+    busiest_providers: pd.DataFrame  # providers that are the nearest one for the most patients
+
+
+def _summarize(frame, column, label):
+    grouped = frame.groupby(column, observed=True)
+    table = pd.DataFrame({
+        'Patients': grouped.size(),
+        'Median km to Nearest Provider': grouped['NEAREST_KM'].median(),
+        'Mean km to Nearest Provider': grouped['NEAREST_KM'].mean(),
+        'Share Within Radius': grouped['REACHABLE'].mean(),
+        'Providers Within Radius': grouped['WITHIN'].mean(),
+    })
+    table.index = table.index.astype(str)
+    return table.rename_axis(label).reset_index()
+
+
+class AccessibilityEngine:
+    # Nearest-provider distance of every patient, computed once; results() adds the
+    # provider counts for one radius and the aggregates
+    def __init__(self, patients, providers):
+        self.unlocated = 0
+        self.index = None
+        if not {'LAT', 'LON'} <= set(providers.columns) or not {'LAT', 'LON'} <= set(patients.columns):
+            return
+        self.index = ProviderIndex(providers)
+        if not len(self.index):
+            self.index = None
+            return
+
+        located = _located(patients)
+        self.unlocated = int((~located).sum())
+        frame = patients.loc[located, [column for column in GROUPS if column in patients]].reset_index(drop=True)
+        self.points = to_xyz(patients.loc[located, 'LAT'], patients.loc[located, 'LON'])
+        with tracing.span('nearest_provider', rows=len(frame)):
+            distance, position = self.index.nearest(self.points)
+        frame['NEAREST_KM'] = distance.astype(np.float32)
+        frame['NEAREST_PROVIDER'] = position.astype(np.int32)
+        self.frame = frame
+
+    @property
+    def available(self):
+        return self.index is not None
+
+    def results(self, radius_km=DEFAULT_RADIUS_KM):
+        with tracing.span('providers_within', rows=len(self.frame), radius_km=radius_km):
+            within = self.index.count_within(self.points, radius_km)
+        frame = self.frame.assign(WITHIN=within.astype(np.int32), REACHABLE=within > 0)
+
+        with tracing.span('groupby', detail='accessibility', rows=len(frame)):
+            by_group = {label: _summarize(frame, column, label) for column, label in GROUPS.items() if column in frame}
+            if 'City' in by_group:
+                by_group['City'] = by_group['City'].sort_values(
+                    ['Median km to Nearest Provider', 'City'], ascending=[False, True], kind='stable').reset_index(drop=True)
+            counts, _ = np.histogram(frame['NEAREST_KM'], bins=HISTOGRAM_BINS)
+            labels = [f'{low:g}–{high:g}' if np.isfinite(high) else f'{low:g}+'
+                      for low, high in zip(HISTOGRAM_BINS, HISTOGRAM_BINS[1:])]
+            histogram = pd.DataFrame({'Distance (km)': labels, 'Patients': counts})
+            load = np.bincount(frame['NEAREST_PROVIDER'], minlength=len(self.index))
+            busiest = np.argsort(-load, kind='stable')[:10]
+            providers = self.index.providers
+            names = providers['NAME'] if 'NAME' in providers else providers['Id']
+            busiest_providers = pd.DataFrame({
+                'Provider': names.iloc[busiest].astype(str).to_numpy(),
+                'City': providers['CITY'].iloc[busiest].astype(str).to_numpy(),
+                'Patients Nearest': load[busiest],
+            })
+
+        return AccessibilityResults(
+            radius_km=radius_km,
+            patients=len(frame),
+            unlocated=self.unlocated,
+            providers=len(self.index),
+            median_km=float(frame['NEAREST_KM'].median()) if len(frame) else float('nan'),
+            share_within=float(frame['REACHABLE'].mean()) if len(frame) else float('nan'),
+            by_group=by_group,
+            histogram=histogram,
+            busiest_providers=busiest_providers,
+        )
+
+
+def load_patients():
+    # Patient attributes and coordinates, with the same income brackets as the data context
+    patients = ingest.load_table('patients', columns=PATIENT_COLUMNS)
+    if 'INCOME' in patients:
+        patients['Income Group'] = income.income_group(patients['INCOME'])
+    return patients
+
+
+def build_engine():
+    return AccessibilityEngine(load_patients(), ingest.load_table('providers'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Provider accessibility summary per radius.')
+    parser.add_argument('--radius', type=float, nargs='+', default=[DEFAULT_RADIUS_KM], help='radius in km')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    engine = build_engine()
+    if not engine.available:
+        print('Patients or providers have no LAT/LON coordinates')
+        return 1
+    print(f'{len(engine.frame):,} patients, {len(engine.index):,} providers: '
+          f'nearest provider in {time.perf_counter() - started:.1f}s')
+    for radius in args.radius:
+        started = time.perf_counter()
+        results = engine.results(radius)
+        print(f'Within {radius:g} km: {results.share_within:.1%} of patients, median nearest '
+              f'{results.median_km:.2f} km ({time.perf_counter() - started:.2f}s)')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
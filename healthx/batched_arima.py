@@ -0,0 +1,202 @@
+# Vectorized ARIMA(1,1,1) estimator for many short annual series at once.
+#
+# Every forecast in the dashboard is an ARIMA(1,1,1) without trend on ~14 yearly
+# points. Instead of paying statsmodels' per-model state-space setup for every city
+# and metric, this module fits a whole (series x years) matrix in one go:
+#
+# - the series are differenced and modelled as a zero-mean ARMA(1,1);
+# - the exact Gaussian likelihood is evaluated with the ARMA(1,1) Kalman filter,
+#   which for this model collapses to a scalar recursion per series, so one pass
+#   over the years handles every series with NumPy vector ops;
+# - sigma2 is concentrated out, and (ar, ma) are found by a coarse grid search
+#   followed by damped Newton steps on the stationary/invertible transform that
+#   statsmodels uses, only iterating on series that have not converged yet.
+#
+# statsmodels (forecast.fit_arima) stays the reference backend; see
+# benchmarks/batched_arima.py for the accuracy comparison and timings.
+
+import numpy as np
+
+from healthx import forecast
+
+GRID_POINTS = 9
+MAX_ITERATIONS = 40
+TOLERANCE = 1e-7
+_STEP = 1e-4
+_LINE_SEARCH = np.array([1.0, 0.5, 0.25, 0.1, 0.02])
+
+
+def _constrain(u):
+    # Maps the real line onto (-1, 1), as statsmodels does for a single AR/MA lag
+    return u / np.sqrt(1 + u * u)
+
+
+def _unconstrain(r):
+    return r / np.sqrt(1 - r * r)
+
+
+def _filter(x, ar, ma):
+    # Kalman filter for a zero-mean ARMA(1,1) with unit innovation variance.
+    # x: (n, T) differenced series (NaN = missing). Returns the sum of squared
+    # standardized innovations, the sum of log innovation variances, the count of
+    # observations and the one-step prediction for period T+1.
+    n, steps = x.shape
+    pred = np.zeros(n)
+    var = (1 + 2 * ar * ma + ma * ma) / (1 - ar * ar)  # stationary initial variance
+    ssq = np.zeros(n)
+    logdet = np.zeros(n)
+    nobs = np.zeros(n)
+    for t in range(steps):
+        obs = x[:, t]
+        seen = ~np.isnan(obs)
+        innovation = np.where(seen, obs - pred, 0.0)
+        gain = np.where(seen, (ar * var + ma) / var, 0.0)
+        ssq += np.where(seen, innovation * innovation / var, 0.0)
+        logdet += np.where(seen, np.log(var), 0.0)
+        nobs += seen
+        pred = ar * pred + gain * innovation
+        var = ar * ar * var + 2 * ar * ma + ma * ma + 1 - np.where(seen, (ar * var + ma) ** 2 / var, 0.0)
+        var = np.maximum(var, 1.0)  # innovation variance never drops below sigma2
+    return ssq, logdet, nobs, pred
+
+
+def _loglike(x, u_ar, u_ma):
+    # Concentrated (sigma2 profiled out) log-likelihood per series
+    ssq, logdet, nobs, _ = _filter(x, _constrain(u_ar), _constrain(u_ma))
+    sigma2 = ssq / np.maximum(nobs, 1)
+    with np.errstate(divide='ignore'):
+        return -0.5 * nobs * (np.log(2 * np.pi) + 1 + np.log(sigma2)) - 0.5 * logdet
+
+
+def _grid_start(x):
+    grid = _unconstrain(np.linspace(-0.9, 0.9, GRID_POINTS))
+    best_ll = np.full(len(x), -np.inf)
+    best_ar = np.zeros(len(x))
+    best_ma = np.zeros(len(x))
+    for u_ar in grid:
+        for u_ma in grid:
+            ll = _loglike(x, np.full(len(x), u_ar), np.full(len(x), u_ma))
+            better = ll > best_ll
+            best_ll = np.where(better, ll, best_ll)
+            best_ar = np.where(better, u_ar, best_ar)
+            best_ma = np.where(better, u_ma, best_ma)
+    return best_ar, best_ma, best_ll
+
+
+def _newton(x, u_ar, u_ma, ll):
+    # Damped Newton ascent with finite-difference derivatives, vectorized over series
+    converged = np.zeros(len(x), dtype=bool)
+    h = _STEP
+    for _ in range(MAX_ITERATIONS):
+        active = np.flatnonzero(~converged)
+        if active.size == 0:
+            break
+        xa, a, m, f0 = x[active], u_ar[active], u_ma[active], ll[active]
+        f_pa, f_ma_ = _loglike(xa, a + h, m), _loglike(xa, a - h, m)
+        f_pm, f_mm = _loglike(xa, a, m + h), _loglike(xa, a, m - h)
+        f_pp, f_nn = _loglike(xa, a + h, m + h), _loglike(xa, a - h, m - h)
+
+        g = np.stack([(f_pa - f_ma_) / (2 * h), (f_pm - f_mm) / (2 * h)], axis=1)
+        h11 = (f_pa - 2 * f0 + f_ma_) / (h * h)
+        h22 = (f_pm - 2 * f0 + f_mm) / (h * h)
+        h12 = (f_pp - f_pa - f_pm + 2 * f0 - f_ma_ - f_mm + f_nn) / (2 * h * h)
+
+        # Newton direction where the Hessian is negative definite, gradient ascent otherwise
+        det = h11 * h22 - h12 * h12
+        concave = (h11 < 0) & (det > 0)
+        safe_det = np.where(concave, det, 1.0)
+        newton = np.stack([-(h22 * g[:, 0] - h12 * g[:, 1]) / safe_det,
+                           -(-h12 * g[:, 0] + h11 * g[:, 1]) / safe_det], axis=1)
+        scale = 1.0 / np.maximum(1.0, np.abs(g).max(axis=1, keepdims=True))
+        direction = np.where(concave[:, None], newton, g * scale)
+        direction = np.clip(direction, -2.0, 2.0)
+
+        best_ll, best_step = f0.copy(), np.zeros(len(active))
+        for step in _LINE_SEARCH:
+            trial = _loglike(xa, a + step * direction[:, 0], m + step * direction[:, 1])
+            better = np.isfinite(trial) & (trial > best_ll + 1e-12)
+            best_ll = np.where(better, trial, best_ll)
+            best_step = np.where(better & (best_step == 0), step, best_step)
+        moved = best_step[:, None] * direction
+
+        u_ar[active] = a + moved[:, 0]
+        u_ma[active] = m + moved[:, 1]
+        ll[active] = best_ll
+        done = (np.abs(moved).max(axis=1) < TOLERANCE) | (np.abs(g).max(axis=1) < TOLERANCE)
+        converged[active] = done
+    return u_ar, u_ma, ll, converged
+
+
+def fit(y):
+    # Fit ARIMA(1,1,1) to every row of y (series x years). Leading NaNs are allowed
+    # for series that start later; rows with fewer than three values are not fitted.
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    x = np.diff(y, axis=1)
+    enough = (~np.isnan(x)).sum(axis=1) >= 2
+    x = np.where(enough[:, None], x, 0.0)
+
+    u_ar, u_ma, ll = _grid_start(x)
+    u_ar, u_ma, ll, converged = _newton(x, u_ar, u_ma, ll)
+
+    ar, ma = _constrain(u_ar), _constrain(u_ma)
+    ssq, _, nobs, next_diff = _filter(x, ar, ma)
+    sigma2 = ssq / np.maximum(nobs, 1)
+
+    # Last observed level of each row
+    observed = ~np.isnan(y)
+    last_index = y.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)
+    last = np.where(observed.any(axis=1), y[np.arange(len(y)), last_index], np.nan)
+    invalid = ~enough
+    for values in (ar, ma, sigma2, ll, next_diff):
+        values[invalid] = np.nan
+    return {
+        'ar': ar,
+        'ma': ma,
+        'sigma2': sigma2,
+        'loglike': ll,
+        'converged': converged & enough,
+        'last': last,
+        'next_diff': next_diff,
+    }
+
+
+def forecast_fitted(fitted, steps=forecast.FORECAST_STEPS):
+    # Point forecasts (series x steps) in levels from a fit() result
+    diffs = np.empty((len(fitted['ar']), steps))
+    diffs[:, 0] = fitted['next_diff']
+    for h in range(1, steps):
+        diffs[:, h] = fitted['ar'] * diffs[:, h - 1]
+    return fitted['last'][:, None] + np.cumsum(diffs, axis=1)
+
+
+def fit_forecast(y, steps=forecast.FORECAST_STEPS):
+    fitted = fit(y)
+    return fitted, forecast_fitted(fitted, steps)
+
+
+def fit_series_many(series_list, forecast_steps=forecast.FORECAST_STEPS):
+    # Batched counterpart of forecast.fit_arima for a list of pd.Series (index = year).
+    # Series covering the same years are fitted together as one matrix; returns one
+    # result dict per series in the same format (None where it could not be fitted).
+    groups = {}
+    for row, series in enumerate(series_list):
+        groups.setdefault(tuple(series.index), []).append(row)
+
+    forecast_years = list(range(forecast.FORECAST_START, forecast.FORECAST_START + forecast_steps))
+    results = [None] * len(series_list)
+    for rows in groups.values():
+        matrix = np.vstack([np.asarray(series_list[row], dtype=float) for row in rows])
+        fitted, predictions = fit_forecast(matrix, forecast_steps)
+        for i, row in enumerate(rows):
+            if not np.all(np.isfinite(predictions[i])):
+                continue
+            results[row] = {
+                'series_hash': forecast.series_hash(series_list[row]),
+                'forecast_years': forecast_years,
+                'forecast': [float(value) for value in predictions[i]],
+                'params': {'ar.L1': float(fitted['ar'][i]), 'ma.L1': float(fitted['ma'][i]),
+                           'sigma2': float(fitted['sigma2'][i])},
+                'converged': bool(fitted['converged'][i]),
+                'backend': 'batched',
+            }
+    return results
@@ -0,0 +1,118 @@
+# Multi-city comparison for General Insights and Predictive Insights.
+#
+# The four KPIs and the yearly series of N selected cities (or all of them) come from
+# one grouped query on the query backend (city_comparison): the city x year cube for
+# pandas, two grouped scans for duckdb. Nothing filters the full frame once per city.
+# Forecasts for the selected cities are read from the forecast store and the misses are
+# fitted together in one vectorized batched_arima call. Results render as one overlaid
+# chart, or as small multiples past OVERLAY_MAX cities, plus a ranked table.
+
+import numpy as np
+import pandas as pd
+
+from healthx import forecast, tracing
+
+# KPI column -> label, in the order the single-city page shows them
+KPIS = {
+    'total_encounters': 'Total Encounters',
+    'avg_coverage': 'Average Healthcare Coverage',
+    'adherence_rate': 'Adherence Rate',
+    'avg_diagnosis_to_treatment': 'Avg Diagnosis to Treatment Time (hours)',
+}
+# Yearly column -> chart title, the line charts of the single-city page
+YEARLY_CHARTS = {
+    'NUM_ENCOUNTERS': 'Encounters Over Years',
+    'RATIO': 'Provider to Patient Ratio Over Years',
+    'TOTAL_CLAIM_COST': 'Claim Cost Over Years',
+    'HEALTHCARE_EXPENSES': 'Healthcare Expenses Over Years',
+}
+# More cities than this get one small panel each instead of one crowded chart
+OVERLAY_MAX = 8
+FACET_COLUMNS = 4
+
+
+def ranked(kpis, by, ascending=False):
+    # KPI table sorted by one KPI with a Rank column and readable headers
+    table = kpis.sort_values([by, 'City'], ascending=[ascending, True], kind='stable').reset_index(drop=True)
+    table.insert(0, 'Rank', np.arange(1, len(table) + 1))
+    return table.rename(columns=KPIS)
+
+
+def line_figure(frame, x, y, title, cities, **kwargs):
+    # One line per city on shared axes, or one panel per city when there are many
+    import plotly.express as px
+
+    count = len(cities)
+    if count <= OVERLAY_MAX:
+        return px.line(frame, x=x, y=y, color='City', title=title, category_orders={'City': cities}, **kwargs)
+    rows = -(-count // FACET_COLUMNS)
+    figure = px.line(frame, x=x, y=y, facet_col='City', facet_col_wrap=FACET_COLUMNS, title=title,
+                     category_orders={'City': cities}, height=max(400, 180 * rows),
+                     facet_row_spacing=min(0.04, 0.5 / rows), **kwargs)
+    figure.for_each_annotation(lambda annotation: annotation.update(text=annotation.text.split('=', 1)[-1]))
+    return figure
+
+
+def yearly_figure(yearly, column, cities):
+    with tracing.span('figure_build', figure=f'compare_{column}', rows=len(yearly)):
+        return line_figure(yearly, 'YEAR', column, YEARLY_CHARTS[column], cities)
+
+
+def metric_series(metric, yearly, population_df, cities):
+    # {city: annual series} for one forecast metric, the same series forecast.metric_series
+    # gives the single-city page (so both share stored forecasts)
+    if metric == 'population':
+        return {city: forecast.metric_series(metric, city, population_df=population_df) for city in cities}
+    column = forecast.YEARLY_COLUMNS[metric]
+    series = {city: pd.Series(group[column].to_numpy(dtype=float), index=group['YEAR'].to_numpy(), name=city)
+              for city, group in yearly.groupby('City', sort=False)}
+    return {city: series.get(city, pd.Series(dtype=float, name=city)) for city in cities}
+
+
+def forecast_many(store, metric, series_by_city):
+    # Stored forecasts for every city with enough history; the misses in one batched fit
+    items = [(city, metric, series) for city, series in series_by_city.items() if len(series) > 2]
+    with tracing.span('arima_fit', series=len(items), estimator='batched'):
+        results, failures = store.get_or_fit_many(items, estimator='batched')
+    return {city: results[(city, metric)] for city, _, _ in items if (city, metric) in results}, failures
+
+
+def forecast_frame(series_by_city, results):
+    # Long frame (City, Year, Value, Kind) of the actual and forecast points per city
+    frames = []
+    for city, result in results.items():
+        series = series_by_city[city]
+        frames.append(pd.DataFrame({'City': city, 'Year': series.index.astype(int),
+                                    'Value': series.to_numpy(dtype=float), 'Kind': 'Actual'}))
+        # The forecast line starts at the last actual point so the two connect
+        frames.append(pd.DataFrame({'City': city, 'Year': [int(series.index[-1])] + list(result['forecast_years']),
+                                    'Value': [float(series.iloc[-1])] + list(result['forecast']), 'Kind': 'Forecast'}))
+    if not frames:
+        return pd.DataFrame(columns=['City', 'Year', 'Value', 'Kind'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def forecast_figure(metric, series_by_city, results):
+    labels = forecast.METRICS[metric]
+    frame = forecast_frame(series_by_city, results)
+    cities = list(results)
+    with tracing.span('figure_build', figure=f'compare_{metric}', rows=len(frame)):
+        return line_figure(frame, 'Year', 'Value', f"{labels['title']} by City", cities,
+                           line_dash='Kind', labels={'Value': labels['yaxis']})
+
+
+def forecast_growth(series_by_city, results):
+    # Cities ranked by forecast growth: last actual value vs the final forecast
+    rows = []
+    for city, result in results.items():
+        series = series_by_city[city]
+        last, final = float(series.iloc[-1]), float(result['forecast'][-1])
+        rows.append({'City': city, 'Last Year': int(series.index[-1]), 'Last Actual': last,
+                     f"Forecast {result['forecast_years'][-1]}": final,
+                     'Growth': final / last - 1 if last else np.nan})
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    table = table.sort_values(['Growth', 'City'], ascending=[False, True], kind='stable', na_position='last')
+    table.insert(0, 'Rank', np.arange(1, len(table) + 1))
+    return table.reset_index(drop=True)
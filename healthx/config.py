@@ -0,0 +1,20 @@
+import os
+
+# Folder holding the Synthea / Census CSV exports (override with HEALTHX_DATA_DIR)
+DATA_DIR = os.environ.get('HEALTHX_DATA_DIR', '/Users/tulasi/Desktop/HealthX/data')
+
+# Folder for derived artifacts such as the columnar ingestion cache (override with HEALTHX_CACHE_DIR)
+CACHE_DIR = os.environ.get('HEALTHX_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'healthx'))
+
+# Source CSV file names, keyed by the table name used throughout the app
+SOURCE_FILES = {
+    'patients': 'patients.csv',
+    'encounters': 'encounters.csv',
+    'population': 'Population(2010-2023).csv',
+    'providers': 'providers.csv',
+    'executive_summary': 'executive summary data.csv',
+}
+
+
+def source_path(table):
+    return os.path.join(DATA_DIR, SOURCE_FILES[table])
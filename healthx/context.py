@@ -0,0 +1,96 @@
+# Shared, read-only data context for the dashboard.
+#
+# Everything the pages need that does not depend on widget state (source frames,
+# AGE, age groups, the denormalized encounter fact table and the age summary) is
+# computed once here. healthx.pages.shared caches the result per process with
+# st.cache_resource, keyed on the source data version and a refresh stamp, so all
+# sessions share one copy and a rerun only does page-specific work.
+
+from dataclasses import dataclass
+
+import pandas as pd
+
+from healthx import income, ingest, tracing
+
+# How often AGE (and everything derived from it) is recomputed against the clock
+AGE_REFRESH_HOURS = 24
+
+AGE_BINS = [0, 20, 40, 60, 80, 100]
+AGE_LABELS = ["0-20", "21-40", "41-60", "61-80", "81+"]
+
+# Patient attributes copied onto every encounter row of the fact table
+FACT_ATTRIBUTES = ['AGE', 'Age Group', 'GENDER', 'RACE', 'CITY', 'Income Group']
+
+
+@dataclass(frozen=True)
+class DataContext:
+    data_version: str
+    as_of: pd.Timestamp
+    patients: pd.DataFrame  # one row per patient; PATIENT_KEY is the row position
+    encounter_facts: pd.DataFrame  # one row per encounter: PATIENT_KEY + FACT_ATTRIBUTES
+    population: pd.DataFrame
+    providers: pd.DataFrame
+    age_stats: pd.DataFrame
+    age_mean: float
+    age_median: float
+
+
+def refresh_stamp(now=None):
+    # Current time floored to the AGE refresh interval; a new stamp triggers a rebuild
+    now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+    return now.floor(f'{AGE_REFRESH_HOURS}h')
+
+
+def age_group(ages):
+    # Create Age Groups in 20-year intervals
+    return pd.cut(ages, bins=AGE_BINS, labels=AGE_LABELS, right=False)
+
+
+def build_encounter_facts(encounters_df, patients_df):
+    # Denormalized encounter table. Patient IDs are resolved once to the integer
+    # PATIENT_KEY (row position in patients_df); the attributes are then gathered by
+    # position, so no string hash join is needed afterwards.
+    keys = pd.Index(patients_df['Id']).get_indexer(encounters_df['PATIENT'])
+    facts = patients_df[FACT_ATTRIBUTES].reset_index(drop=True).reindex(keys).reset_index(drop=True)
+    facts.insert(0, 'PATIENT_KEY', keys.astype('int32'))  # -1 = patient not found
+    return facts
+
+
+def build_data_context(as_of=None, data_version=None):
+    as_of = refresh_stamp() if as_of is None else pd.Timestamp(as_of)
+    data_version = data_version or ingest.data_version()
+
+    patients_df = ingest.load_table('patients').reset_index(drop=True)
+    encounters_df = ingest.load_table('encounters')
+    population_df = ingest.load_table('population')
+    providers_df = ingest.load_table('providers')
+
+    # Preprocess data: Calculate AGE, age group and income bracket per patient
+    patients_df['PATIENT_KEY'] = patients_df.index.astype('int32')
+    with tracing.span('datetime_coercion', rows=len(patients_df)):
+        patients_df['BIRTHDATE'] = pd.to_datetime(patients_df['BIRTHDATE'], errors='coerce')
+    patients_df['AGE'] = (as_of - patients_df['BIRTHDATE']).dt.days // 365
+    patients_df['Age Group'] = age_group(patients_df['AGE'])
+    patients_df['Income Group'] = income.income_group(patients_df['INCOME'])
+
+    with tracing.span('fact_join', rows=len(encounters_df)):
+        encounter_facts = build_encounter_facts(encounters_df, patients_df)
+
+    # Age group statistics: patients and encounters per age group
+    with tracing.span('groupby', detail='age_stats', rows=len(encounter_facts)):
+        age_groups_df = patients_df['Age Group'].value_counts().reset_index()
+        age_groups_df.columns = ['Age Group', 'Patient Count']
+        encounter_count_by_age = encounter_facts.groupby('Age Group', observed=False).size().reset_index(name='Encounter Count')
+        age_stats_df = pd.merge(age_groups_df, encounter_count_by_age, on='Age Group')
+
+    return DataContext(
+        data_version=data_version,
+        as_of=as_of,
+        patients=patients_df,
+        encounter_facts=encounter_facts,
+        population=population_df,
+        providers=providers_df,
+        age_stats=age_stats_df,
+        age_mean=float(patients_df['AGE'].mean()),
+        age_median=float(patients_df['AGE'].median()),
+    )
@@ -0,0 +1,105 @@
+# Materialized city x year aggregate cube for the General Insights page.
+#
+# All per-city KPIs, per-year series and category counts are computed for every
+# city in a single grouped pass over the executive summary frame, so switching
+# cities on the page is a dictionary lookup instead of a mask + six groupbys.
+
+from dataclasses import dataclass
+
+import pandas as pd
+
+from healthx import derived, tracing
+
+
+@dataclass(frozen=True)
+class CitySummary:
+    city: str
+    total_encounters: int
+    avg_coverage: float
+    adherence_rate: float
+    avg_diagnosis_to_treatment: float
+    # One row per year: NUM_ENCOUNTERS, PROVIDER, PATIENT, RATIO, TOTAL_CLAIM_COST, HEALTHCARE_EXPENSES
+    yearly: pd.DataFrame
+    # ENCOUNTERCLASS counts (Category, Count) and CATEGORY counts (Medication, Count)
+    encounter_classes: pd.DataFrame
+    medications: pd.DataFrame
+
+
+def prepare_encounter_frame(data):
+    # YEAR / DIAGNOSIS_TO_TREATMENT come precomputed with the cached table (healthx/derived.py);
+    # other frames (e.g. raw CSV reads) get them derived on a copy
+    if all(column in data for column in derived.AGGREGATE_COLUMNS):
+        return data
+    return derived.derive_encounter_columns(data.copy())
+
+
+def _value_counts_by_city(df, column, label):
+    counts = df.groupby(['CITY_x', column], observed=True).size().rename('Count').reset_index()
+    # Most frequent first; ties in label order, so every query backend returns the same rows
+    counts[column] = counts[column].astype(str)
+    counts = counts.sort_values(['CITY_x', 'Count', column], ascending=[True, False, True], kind='stable')
+    return {city: group[[column, 'Count']].rename(columns={column: label}).reset_index(drop=True)
+            for city, group in counts.groupby('CITY_x', sort=False, observed=True)}
+
+
+def build_city_cube(data):
+    # Return {city: CitySummary} for every city in the executive summary frame
+    df = prepare_encounter_frame(data)
+
+    with tracing.span('groupby', detail='city_cube', rows=len(df)):
+        kpis = df.groupby('CITY_x', observed=True).agg(
+            total_encounters=('CITY_x', 'size'),
+            avg_coverage=('PAYER_COVERAGE_x', 'mean'),
+            dispenses=('DISPENSES', 'sum'),
+            encounters=('ENCOUNTERS', 'sum'),
+            avg_diagnosis_to_treatment=('DIAGNOSIS_TO_TREATMENT', 'mean'),
+        )
+
+        yearly = df.groupby(['CITY_x', 'YEAR'], observed=True).agg(  # rows without a YEAR drop out
+            NUM_ENCOUNTERS=('Id_x', 'count'),
+            PROVIDER=('PROVIDER', 'nunique'),
+            PATIENT=('PATIENT', 'nunique'),
+            TOTAL_CLAIM_COST=('TOTAL_CLAIM_COST', 'sum'),
+            HEALTHCARE_EXPENSES=('HEALTHCARE_EXPENSES', 'sum'),
+        )
+        yearly['RATIO'] = yearly['PROVIDER'] / yearly['PATIENT']
+        yearly_by_city = {city: group.droplevel('CITY_x').reset_index().astype({'YEAR': int})
+                          for city, group in yearly.groupby(level='CITY_x', sort=False, observed=True)}
+
+        encounter_classes = _value_counts_by_city(df, 'ENCOUNTERCLASS', 'Category')
+        medications = _value_counts_by_city(df, 'CATEGORY', 'Medication')
+
+    empty_yearly = pd.DataFrame(columns=['YEAR', 'NUM_ENCOUNTERS', 'PROVIDER', 'PATIENT',
+                                         'TOTAL_CLAIM_COST', 'HEALTHCARE_EXPENSES', 'RATIO'])
+    cube = {}
+    for city, row in kpis.iterrows():
+        cube[city] = CitySummary(
+            city=city,
+            total_encounters=int(row['total_encounters']),
+            avg_coverage=float(row['avg_coverage']),
+            adherence_rate=float(row['dispenses'] / row['encounters']) if row['encounters'] > 0 else 0,
+            avg_diagnosis_to_treatment=float(row['avg_diagnosis_to_treatment']),
+            yearly=yearly_by_city.get(city, empty_yearly),
+            encounter_classes=encounter_classes.get(city, pd.DataFrame(columns=['Category', 'Count'])),
+            medications=medications.get(city, pd.DataFrame(columns=['Medication', 'Count'])),
+        )
+    return cube
+
+
+KPI_FIELDS = ('total_encounters', 'avg_coverage', 'adherence_rate', 'avg_diagnosis_to_treatment')
+YEARLY_COLUMNS = ['YEAR', 'NUM_ENCOUNTERS', 'PROVIDER', 'PATIENT', 'TOTAL_CLAIM_COST', 'HEALTHCARE_EXPENSES', 'RATIO']
+
+
+def comparison_frames(summaries):
+    # (kpis, yearly) for several cities: one KPI row per city and the yearly rows of all
+    # of them in one long frame with a City column, both in city order
+    summaries = sorted(summaries, key=lambda summary: summary.city)
+    kpis = pd.DataFrame({'City': [summary.city for summary in summaries],
+                         **{field: [getattr(summary, field) for summary in summaries] for field in KPI_FIELDS}})
+    kpis = kpis.astype({'City': str, 'total_encounters': 'int64'})
+    frames = [summary.yearly[YEARLY_COLUMNS].assign(City=summary.city) for summary in summaries if len(summary.yearly)]
+    if frames:
+        yearly = pd.concat(frames, ignore_index=True)[['City'] + YEARLY_COLUMNS]
+    else:
+        yearly = pd.DataFrame(columns=['City'] + YEARLY_COLUMNS)
+    return kpis, yearly.astype({'City': str, 'YEAR': 'int64'})
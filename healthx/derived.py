@@ -0,0 +1,113 @@
+# Derived encounter columns, computed once per data version.
+#
+# When the executive summary CSV (or a delta CSV) is converted, the columns the insights
+# pages aggregate are derived on the full table and stored with it, so page code only
+# selects and aggregates:
+#
+#   START_x_EPOCH_US / START_y_EPOCH_US  int64 microseconds since the epoch (UTC), null if missing
+#   DIAGNOSIS_TO_TREATMENT               float32 hours from START_x to START_y
+#   YEAR                                 Int16 year bucket of START_x
+#   DISPENSES / ENCOUNTERS               adherence inputs as integer counts, missing as 0
+#                                        (their sums are the adherence rate's numerator and
+#                                        denominator, so this does not change any rate)
+#
+# Timestamps that are present in the CSV but cannot be parsed are coerced to null
+# (schema.read_csv_compact counts them). The counts are kept with the cache as the
+# table's timestamp quality and shown on General Insights and in the metrics export.
+#
+#   python -m healthx.derived   # timestamp quality of the executive summary
+
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from healthx import tracing
+
+TIMESTAMP_COLUMNS = ['START_x', 'START_y']
+ADHERENCE_COLUMNS = ['DISPENSES', 'ENCOUNTERS']
+EPOCH_COLUMNS = {column: f'{column}_EPOCH_US' for column in TIMESTAMP_COLUMNS}
+# Columns the aggregations read instead of the raw timestamps
+AGGREGATE_COLUMNS = ['YEAR', 'DIAGNOSIS_TO_TREATMENT']
+QUALITY_ATTR = 'timestamp_quality'
+QUALITY_COLUMNS = ['Column', 'Rows', 'Missing', 'Invalid']
+
+
+def _epoch_us(timestamps):
+    # (int64 microseconds, missing mask); naive timestamps are taken as UTC
+    timestamps = pd.to_datetime(timestamps, errors='coerce')
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
+    values = timestamps.to_numpy(dtype='datetime64[us]').view('int64')
+    return values, timestamps.isna().to_numpy()
+
+
+def derive_encounter_columns(df):
+    # Adds the derived columns to an executive summary frame in place and returns it
+    with tracing.span('derive_columns', rows=len(df)):
+        epochs = {}
+        for column in TIMESTAMP_COLUMNS:
+            if column in df:
+                epochs[column] = _epoch_us(df[column])
+                df[EPOCH_COLUMNS[column]] = pd.arrays.IntegerArray(*epochs[column])
+        if 'START_x' in epochs:
+            values, missing = epochs['START_x']
+            years = values.astype('datetime64[us]').astype('datetime64[Y]').astype('int64') + 1970
+            df['YEAR'] = pd.arrays.IntegerArray(years.astype('int16'), missing)
+        if len(epochs) == len(TIMESTAMP_COLUMNS):
+            (diagnosed, undiagnosed), (treated, untreated) = epochs['START_x'], epochs['START_y']
+            hours = (treated - diagnosed) / 3600e6
+            hours[undiagnosed | untreated] = np.nan
+            df['DIAGNOSIS_TO_TREATMENT'] = hours.astype('float32')
+        for column in ADHERENCE_COLUMNS:
+            if column in df:
+                df[column] = pd.to_numeric(df[column].fillna(0), downcast='integer')
+        df.attrs[QUALITY_ATTR] = timestamp_quality(df)
+    return df
+
+
+def timestamp_quality(df):
+    # {column: {'rows', 'missing', 'invalid'}}: invalid values were present but unparseable
+    # (counted by schema.read_csv_compact), missing ones were empty in the source
+    invalid = df.attrs.get('invalid_dates', {})
+    quality = {}
+    for column in TIMESTAMP_COLUMNS:
+        if EPOCH_COLUMNS[column] in df:
+            nulls = int(df[EPOCH_COLUMNS[column]].isna().sum())
+            bad = int(invalid.get(column, 0))
+            quality[column] = {'rows': len(df), 'missing': nulls - bad, 'invalid': bad}
+    return quality
+
+
+def read_quality(path):
+    # Timestamp quality stored with a Parquet cache file (None for files without it)
+    metadata = pq.read_schema(path).metadata or {}
+    attrs = json.loads(metadata.get(b'PANDAS_ATTRS', b'{}'))
+    return attrs.get(QUALITY_ATTR)
+
+
+def quality_frame(quality):
+    rows = [{'Column': column, 'Rows': counts['rows'], 'Missing': counts['missing'], 'Invalid': counts['invalid']}
+            for column, counts in (quality or {}).items()]
+    return pd.DataFrame(rows, columns=QUALITY_COLUMNS)
+
+
+def load_quality(table='executive_summary'):
+    from healthx import ingest
+    return read_quality(ingest.ensure_cache(table))
+
+
+def publish_quality(quality):
+    # Timestamp counts as gauges in the metrics export (healthx_metrics.prom / .json)
+    for column, counts in (quality or {}).items():
+        for kind in ('missing', 'invalid'):
+            tracing.set_gauge('healthx_timestamps', counts[kind], column=column, kind=kind)
+
+
+def main():
+    print(quality_frame(load_quality()).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
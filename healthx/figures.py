@@ -0,0 +1,20 @@
+# Plotly figures for one city's General Insights charts, shared by the page and the
+# headless reports (healthx.reports), so neither has to import the other.
+
+import plotly.express as px
+
+# The six charts for one city, keyed by their Streamlit element key
+CITY_FIGURES = {
+    # Graph 1: Encounters Over Years (Line)
+    'encounters_fig': lambda summary: px.line(summary.yearly, x='YEAR', y='NUM_ENCOUNTERS', title="Encounters Over Years"),
+    # Graph 2: Provider to Patient Ratio Over Years (Line)
+    'ratio_fig': lambda summary: px.line(summary.yearly, x='YEAR', y='RATIO', title="Provider to Patient Ratio Over Years"),
+    # Graph 3: Healthcare Expenses by Category (Pie Chart)
+    'expenses_pie': lambda summary: px.pie(summary.encounter_classes, names='Category', values='Count', title="Healthcare Expenses by Category"),
+    # Graph 4: Claim Cost Over Years (Bar Graph)
+    'claim_cost_fig': lambda summary: px.bar(summary.yearly, x='YEAR', y='TOTAL_CLAIM_COST', title="Claim Cost Over Years"),
+    # Graph 5: Medication Distribution by Type (Pie Chart)
+    'medication_pie': lambda summary: px.pie(summary.medications, names='Medication', values='Count', title="Medication Distribution by Type"),
+    # Graph 6: Healthcare Expenses Forecasting (Line)
+    'expenses_fig': lambda summary: px.line(summary.yearly, x='YEAR', y='HEALTHCARE_EXPENSES', title="Healthcare Expenses Over Years"),
+}
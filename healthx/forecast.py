@@ -0,0 +1,123 @@
+# ARIMA forecasting used by the Predictive Insights page and the batch job.
+#
+# Each metric is an annual series per city. Fitting is kept separate from figure
+# building so fitted results can be stored and reused (see forecast_store).
+
+import hashlib
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from healthx import tracing
+
+ARIMA_ORDER = (1, 1, 1)
+FORECAST_START = 2025  # Predicting from 2025 to 2029
+FORECAST_STEPS = 5
+
+# Metric name -> labels used on the forecast chart
+METRICS = {
+    'population': {'actual': 'Actual Population', 'forecast': 'Forecasted Population',
+                   'title': 'Population Forecast', 'yaxis': 'Population'},
+    'claim_cost': {'actual': 'Actual Claim Costs', 'forecast': 'Forecasted Claim Costs',
+                   'title': 'Claim Cost Forecast', 'yaxis': 'Claim Costs'},
+    'encounters': {'actual': 'Actual Encounters', 'forecast': 'Forecasted Encounters',
+                   'title': 'Encounters Forecast', 'yaxis': 'Encounters'},
+    'providers': {'actual': 'Actual Providers', 'forecast': 'Forecasted Providers',
+                  'title': 'Providers Forecast', 'yaxis': 'Providers'},
+    'expenses': {'actual': 'Actual Healthcare Expenses', 'forecast': 'Forecasted Expenses',
+                 'title': 'Healthcare Expenses Forecast', 'yaxis': 'Healthcare Expenses'},
+}
+
+# Column of CitySummary.yearly holding each executive-summary metric
+YEARLY_COLUMNS = {
+    'claim_cost': 'TOTAL_CLAIM_COST',
+    'encounters': 'NUM_ENCOUNTERS',
+    'providers': 'PROVIDER',
+    'expenses': 'HEALTHCARE_EXPENSES',
+}
+
+
+def metric_series(metric, city, city_summary=None, population_df=None):
+    # Annual series (index = year) for one city and metric
+    if metric == 'population':
+        row = population_df[population_df['CITY'] == city].drop(columns=['CITY'])
+        if row.empty:
+            return pd.Series(dtype=float, name=city)
+        series = row.iloc[0]
+        series.index = series.index.astype(int)
+        return series.astype(float).rename(city)
+    yearly = city_summary.yearly
+    return pd.Series(yearly[YEARLY_COLUMNS[metric]].to_numpy(dtype=float),
+                     index=yearly['YEAR'].to_numpy(), name=city)
+
+
+def series_hash(series):
+    # Stable hash of the series values and years plus the model order
+    values = np.ascontiguousarray(np.asarray(series, dtype=np.float64))
+    years = np.ascontiguousarray(np.asarray(series.index, dtype=np.int64))
+    digest = hashlib.sha1()
+    digest.update(repr(ARIMA_ORDER).encode('utf-8'))
+    digest.update(years.tobytes())
+    digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def fit_arima(series, forecast_steps=FORECAST_STEPS):
+    # Fit ARIMA(1,1,1) and return the point forecasts and model params
+    from statsmodels.tsa.arima.model import ARIMA
+
+    with tracing.span('arima_fit', rows=len(series)), warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model = ARIMA(np.asarray(series, dtype=float), order=ARIMA_ORDER)
+        model_fit = model.fit()
+        forecast = model_fit.forecast(steps=forecast_steps)
+    if not np.all(np.isfinite(forecast)):
+        raise ValueError('ARIMA fit produced non-finite forecasts')
+    return {
+        'series_hash': series_hash(series),
+        'forecast_years': list(range(FORECAST_START, FORECAST_START + forecast_steps)),
+        'forecast': [float(value) for value in forecast],
+        'params': {name: float(value) for name, value in zip(model_fit.param_names, model_fit.params)},
+        # False when the optimizer stopped without converging; the forecast is still usable
+        'converged': bool(model_fit.mle_retvals.get('converged', True)) if model_fit.mle_retvals else True,
+    }
+
+
+def forecast_figure(metric, city, series, result):
+    import plotly.graph_objs as go
+
+    labels = METRICS[metric]
+    forecast_years = result['forecast_years']
+
+    trace1 = go.Scatter(
+        x=series.index,
+        y=series.values,
+        mode='lines',  # Solid line for actual data
+        name=labels['actual'],
+        line=dict(color='white')  # White solid line for actual data
+    )
+
+    trace2 = go.Scatter(
+        x=forecast_years,
+        y=result['forecast'],
+        mode='markers+lines',
+        name=labels['forecast'],
+        marker=dict(color='red', symbol='circle'),
+        line=dict(dash='solid')  # Solid red line for forecasted data
+    )
+
+    xaxis = {'title': 'Year'}
+    if metric == 'population':
+        xaxis.update({'tickvals': list(range(2010, forecast_years[-1] + 1)), 'tickangle': 45})
+
+    figure = {
+        'data': [trace1, trace2],
+        'layout': go.Layout(
+            title=f"{city} - {labels['title']} ({forecast_years[0]}–{forecast_years[-1]})",
+            xaxis=xaxis,
+            yaxis={'title': labels['yaxis']},
+            hovermode='closest'
+        )
+    }
+    return figure
@@ -0,0 +1,97 @@
+# Offline batch job: fit every forecast metric for every city into the forecast store.
+#
+#   python -m healthx.forecast_batch                 # refit only series that changed
+#   python -m healthx.forecast_batch --force         # refit everything
+#   python -m healthx.forecast_batch --city Boston --metric population
+#   python -m healthx.forecast_batch --backend batched  # vectorized NumPy fit of all series
+#   python -m healthx.forecast_batch --stale         # refit only series marked stale by new data
+
+import argparse
+import time
+
+from healthx import batched_arima, forecast, incremental, ingest
+from healthx.forecast_pool import ForecastExecutor, ForecastTask
+from healthx.forecast_store import ForecastStore
+
+
+def iter_series(city_cube, population_df, cities=None, metrics=None):
+    # Yield (city, metric, series) for every requested combination with data to fit
+    for city in sorted(cities or city_cube):
+        if city not in city_cube:
+            continue
+        for metric in metrics or forecast.METRICS:
+            series = forecast.metric_series(metric, city, city_cube[city], population_df)
+            if len(series) > 2:
+                yield city, metric, series
+
+
+def run_batch(store, city_cube, population_df, cities=None, metrics=None, force=False, executor=None,
+              backend='statsmodels', log=print, stale_only=False):
+    items, skipped = [], 0
+    stale = set(store.stale_keys()) if stale_only else None
+    for city, metric, series in iter_series(city_cube, population_df, cities, metrics):
+        if stale is not None and (city, metric) not in stale:
+            skipped += 1
+            continue
+        if not force and store.get(city, metric, forecast.series_hash(series)) is not None:
+            skipped += 1
+            continue
+        items.append(ForecastTask(city, metric, series))
+
+    fitted, failed = 0, 0
+    if backend == 'batched':
+        # One vectorized fit over every changed series
+        for task, result in zip(items, batched_arima.fit_series_many([task.series for task in items])):
+            if result is not None:
+                store.put(task.city, task.metric, result)
+                fitted += 1
+            else:
+                failed += 1
+                log(f'{task.city} / {task.metric}: failed (non-finite batched forecast)')
+    else:
+        # Fit everything that changed on the process pool; a bad series must not stop the batch
+        executor = executor or ForecastExecutor()
+        for outcome in executor.fit_many(items):
+            if outcome.ok:
+                store.put(outcome.city, outcome.metric, outcome.result)
+                fitted += 1
+            else:
+                failed += 1
+                log(f'{outcome.city} / {outcome.metric}: {outcome.status} ({outcome.error})')
+    store.save()
+    return {'fitted': fitted, 'skipped': skipped, 'failed': failed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precompute HealthX ARIMA forecasts for every city.')
+    parser.add_argument('--city', action='append', help='limit to this city (repeatable)')
+    parser.add_argument('--metric', action='append', choices=sorted(forecast.METRICS), help='limit to this metric (repeatable)')
+    parser.add_argument('--force', action='store_true', help='refit even when the input series is unchanged')
+    parser.add_argument('--workers', type=int, help='worker processes (default: HEALTHX_FORECAST_WORKERS or CPU count)')
+    parser.add_argument('--timeout', type=float, help='per-series fit budget in seconds (default: HEALTHX_FORECAST_TIMEOUT or 30)')
+    parser.add_argument('--backend', choices=['statsmodels', 'batched'], default='statsmodels',
+                        help='statsmodels (reference, one fit per series) or the vectorized NumPy estimator; '
+                             'use with --force to replace entries fitted by the other backend')
+    parser.add_argument('--stale', action='store_true', help='only refit series marked stale by appended data')
+    parser.add_argument('--store', help='forecast store path (default: HEALTHX_FORECAST_STORE or the cache dir)')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    # Base executive summary plus any appended delta files (see healthx.incremental)
+    city_cube = incremental.load_city_cube()
+    population_df = ingest.load_table('population')
+    store = ForecastStore(args.store)
+
+    executor = ForecastExecutor(args.workers, args.timeout)
+    try:
+        counts = run_batch(store, city_cube, population_df, args.city, args.metric, args.force, executor,
+                           args.backend, stale_only=args.stale)
+    finally:
+        executor.shutdown()
+    print(f"Forecast store {store.path}: {counts['fitted']} fitted, {counts['skipped']} unchanged, "
+          f"{counts['failed']} failed in {time.perf_counter() - started:.1f}s")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,142 @@
+# Process-pool executor for fitting many (city, metric) forecast series at once.
+#
+# ARIMA fitting is CPU-bound, so series are spread over worker processes. Every
+# task gets a wall-clock budget; fits that raise, time out or return non-finite
+# forecasts come back as failed outcomes instead of aborting the whole batch, and
+# outcomes are always returned in the order the tasks were submitted.
+
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+from healthx import forecast
+
+# Pool size (0 or 1 fits inline in the calling process) and per-task budget in seconds
+DEFAULT_WORKERS = int(os.environ.get('HEALTHX_FORECAST_WORKERS', os.cpu_count() or 1))
+DEFAULT_TASK_TIMEOUT = float(os.environ.get('HEALTHX_FORECAST_TIMEOUT', 30))
+
+
+@dataclass(frozen=True)
+class ForecastTask:
+    city: str
+    metric: str
+    series: object  # pd.Series indexed by year
+
+
+@dataclass(frozen=True)
+class ForecastOutcome:
+    city: str
+    metric: str
+    status: str  # 'ok', 'failed' or 'timeout'
+    result: dict = None
+    error: str = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self):
+        return self.status == 'ok'
+
+
+class _TaskTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise _TaskTimeout()
+
+
+def _run_task(task, timeout):
+    # Runs inside a worker process; SIGALRM enforces the per-task budget where available
+    # (signals can only be installed from the main thread, so inline fits in a
+    # Streamlit script thread run without the alarm)
+    started = time.perf_counter()
+    use_alarm = (timeout and hasattr(signal, 'setitimer')
+                 and threading.current_thread() is threading.main_thread())
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        result = forecast.fit_arima(task.series)
+        return ForecastOutcome(task.city, task.metric, 'ok', result=result,
+                               seconds=time.perf_counter() - started)
+    except _TaskTimeout:
+        return ForecastOutcome(task.city, task.metric, 'timeout', error=f'fit exceeded {timeout:g}s',
+                               seconds=time.perf_counter() - started)
+    except Exception as error:
+        return ForecastOutcome(task.city, task.metric, 'failed', error=f'{type(error).__name__}: {error}',
+                               seconds=time.perf_counter() - started)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+class ForecastExecutor:
+    def __init__(self, max_workers=None, task_timeout=None):
+        self.max_workers = DEFAULT_WORKERS if max_workers is None else max_workers
+        self.task_timeout = DEFAULT_TASK_TIMEOUT if task_timeout is None else task_timeout
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a threaded Streamlit server is not safe
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def shutdown(self, kill=False):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            if kill:
+                # Running fits cannot be cancelled, so stop stuck workers outright
+                for process in list((pool._processes or {}).values()):
+                    process.terminate()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def fit_many(self, tasks):
+        # Fit every task and return one ForecastOutcome per task, in task order
+        tasks = list(tasks)
+        if not tasks:
+            return []
+        if self.max_workers <= 1 or len(tasks) == 1:
+            return [_run_task(task, self.task_timeout) for task in tasks]
+
+        pool = self._get_pool()
+        try:
+            futures = [pool.submit(_run_task, task, self.task_timeout) for task in tasks]
+        except BrokenProcessPool:
+            self.shutdown()
+            pool = self._get_pool()
+            futures = [pool.submit(_run_task, task, self.task_timeout) for task in tasks]
+
+        # Backstop for platforms without SIGALRM or a hung worker: the whole batch
+        # may take at most one task budget per wave of workers, plus some slack
+        waves = -(-len(tasks) // self.max_workers)
+        deadline = self.task_timeout * waves + 5 if self.task_timeout else None
+        wait(futures, timeout=deadline)
+
+        outcomes = []
+        broken = False
+        for task, future in zip(tasks, futures):
+            if not future.done():
+                future.cancel()
+                outcomes.append(ForecastOutcome(task.city, task.metric, 'timeout', error='batch deadline exceeded'))
+                broken = True
+                continue
+            try:
+                outcomes.append(future.result())
+            except Exception as error:  # worker crashed (BrokenProcessPool) or result not picklable
+                outcomes.append(ForecastOutcome(task.city, task.metric, 'failed', error=f'{type(error).__name__}: {error}'))
+                broken = broken or isinstance(error, BrokenProcessPool)
+        if broken:
+            # Drop a pool with stuck or dead workers; the next call starts a fresh one
+            self.shutdown(kill=True)
+        return outcomes
@@ -0,0 +1,150 @@
+# Persistent on-disk store of fitted forecasts.
+#
+# Entries are keyed by (city, metric) and keep the point forecasts, the ARIMA params
+# and a hash of the input series. A stored entry is reused as long as the hash of
+# the current series matches; otherwise the series is refit and the entry replaced.
+
+import json
+import os
+import threading
+import time
+
+from healthx import batched_arima, config, forecast
+from healthx.forecast_pool import ForecastExecutor, ForecastOutcome, ForecastTask
+
+
+def default_store_path():
+    return os.environ.get('HEALTHX_FORECAST_STORE', os.path.join(config.CACHE_DIR, 'forecasts.json'))
+
+
+def _fit_batched(tasks):
+    # ForecastOutcomes for tasks fitted together by the vectorized estimator
+    started = time.perf_counter()
+    results = batched_arima.fit_series_many([task.series for task in tasks])
+    seconds = (time.perf_counter() - started) / len(tasks)
+    return [ForecastOutcome(task.city, task.metric, 'ok', result, seconds=seconds) if result is not None
+            else ForecastOutcome(task.city, task.metric, 'failed', error='non-finite batched forecast', seconds=seconds)
+            for task, result in zip(tasks, results)]
+
+
+class ForecastStore:
+    def __init__(self, path=None):
+        self.path = path or default_store_path()
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._pending = {}  # entries put since the last save
+        self._mtime = None
+        self.reload()
+
+    @staticmethod
+    def _key(city, metric):
+        return f'{city}|{metric}'
+
+    def _read_disk(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None, {}
+        with open(self.path, encoding='utf-8') as handle:
+            return mtime, json.load(handle)
+
+    def reload(self):
+        # Pick up entries written by the batch job or another server process
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        mtime, entries = self._read_disk()
+        with self._lock:
+            self._entries = {**entries, **self._pending}
+            self._mtime = mtime
+
+    def __len__(self):
+        return len(self._entries)
+
+    def keys(self):
+        return [tuple(key.split('|', 1)) for key in self._entries]
+
+    def get(self, city, metric, series_hash=None):
+        # Stored entry, or None if missing or fitted on a different series
+        self.reload()
+        entry = self._entries.get(self._key(city, metric))
+        if entry is None or entry.get('stale') or (series_hash is not None and entry['series_hash'] != series_hash):
+            return None
+        return entry
+
+    def mark_stale(self, keys):
+        # Flag stored (city, metric) entries for refit, e.g. after new data was appended
+        self.reload()
+        with self._lock:
+            for city, metric in keys:
+                key = self._key(city, metric)
+                if key in self._entries:
+                    self._entries[key] = self._pending[key] = dict(self._entries[key], stale=True)
+        self.save()
+
+    def stale_keys(self):
+        self.reload()
+        return [tuple(key.split('|', 1)) for key, entry in self._entries.items() if entry.get('stale')]
+
+    def put(self, city, metric, entry):
+        entry = dict(entry, city=city, metric=metric, fitted_at=time.time())
+        with self._lock:
+            self._entries[self._key(city, metric)] = entry
+            self._pending[self._key(city, metric)] = entry
+        return entry
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            # Merge with whatever is on disk so entries from other writers are kept
+            _, entries = self._read_disk()
+            entries.update(self._pending)
+            tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as handle:
+                json.dump(entries, handle)
+            os.replace(tmp_path, self.path)  # atomic swap for concurrent readers
+            self._entries = entries
+            self._pending = {}
+            self._mtime = os.stat(self.path).st_mtime_ns
+
+    def get_or_fit(self, city, metric, series, save=True):
+        # Stored forecast for an unchanged series, otherwise a live fit that is stored
+        series_hash = forecast.series_hash(series)
+        entry = self.get(city, metric, series_hash)
+        if entry is None:
+            entry = self.put(city, metric, forecast.fit_arima(series))
+            if save:
+                self.save()
+        return entry
+
+    def get_or_fit_many(self, items, executor=None, estimator='statsmodels'):
+        # Batch version of get_or_fit for (city, metric, series) items. Misses are fitted
+        # together on the executor (inline when none is given), or with estimator='batched'
+        # in one vectorized batched_arima call. Returns
+        # ({(city, metric): entry}, [ForecastOutcome for every fit that failed]).
+        entries, misses = {}, []
+        for city, metric, series in items:
+            entry = self.get(city, metric, forecast.series_hash(series))
+            if entry is None:
+                misses.append(ForecastTask(city, metric, series))
+            else:
+                entries[(city, metric)] = entry
+
+        failures = []
+        if misses:
+            if estimator == 'batched':
+                outcomes = _fit_batched(misses)
+            else:
+                outcomes = (executor or ForecastExecutor(max_workers=0)).fit_many(misses)
+            for outcome in outcomes:
+                if outcome.ok:
+                    entries[(outcome.city, outcome.metric)] = self.put(outcome.city, outcome.metric, outcome.result)
+                else:
+                    failures.append(outcome)
+            self.save()
+        return entries, failures
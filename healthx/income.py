@@ -0,0 +1,75 @@
+# Income analytics for the Patient Demographics page.
+#
+# Quantile brackets, bracket counts, average income by race and by city and the
+# ten lowest-income cities are computed once per patients data version and
+# shared read-only by every session, so the Income Analysis tab only renders.
+
+from dataclasses import dataclass
+
+import pandas as pd
+
+from healthx import tracing
+
+INCOME_LABELS = ['Bottom 20%', 'Lower-Middle 20%', 'Middle 20%', 'Upper-Middle 20%', 'Top 20%']
+INCOME_QUANTILES = [0.2, 0.4, 0.6, 0.8]
+
+
+@dataclass(frozen=True)
+class IncomeAnalytics:
+    # Results are stored as tuples so the shared object cannot be modified in place;
+    # the *_frame() helpers build small DataFrames for charts and tables on demand.
+    mean_income: float
+    median_income: float
+    bins: tuple  # bracket edges: 0, the 20/40/60/80% quantiles and the maximum income
+    bracket_counts: tuple  # (income group, patient count)
+    income_by_race: tuple  # (race, average income)
+    income_by_city: tuple  # (city, average income)
+    lowest_income_cities: tuple  # the 10 cities with the least average income
+
+    def bracket_counts_frame(self):
+        return pd.DataFrame(self.bracket_counts, columns=['Income Group', 'Count'])
+
+    def income_by_race_frame(self):
+        return pd.DataFrame(self.income_by_race, columns=['Race', 'Average Income'])
+
+    def income_by_city_frame(self):
+        return pd.DataFrame(self.income_by_city, columns=['City', 'Average Income'])
+
+    def lowest_income_cities_frame(self):
+        return pd.DataFrame(self.lowest_income_cities, columns=['City', 'Average Income'])
+
+
+def income_bins(incomes):
+    quantiles = incomes.quantile(INCOME_QUANTILES)
+    return (0, *(float(value) for value in quantiles), float(incomes.max()))
+
+
+def income_group(incomes, bins=None):
+    # Categorize income into income brackets (Bottom 20%, Lower-Middle 20%, etc.)
+    bins = bins or income_bins(incomes)
+    return pd.cut(incomes, bins=list(bins), labels=INCOME_LABELS, right=False)
+
+
+def _pairs(series):
+    return tuple((label, value.item() if hasattr(value, 'item') else value) for label, value in series.items())
+
+
+def build_income_analytics(patients_df):
+    incomes = patients_df['INCOME']
+    bins = income_bins(incomes)
+    groups = patients_df['Income Group'] if 'Income Group' in patients_df else income_group(incomes, bins)
+
+    # Calculate the average income by race and by city (one groupby each)
+    with tracing.span('groupby', detail='income_analytics', rows=len(patients_df)):
+        income_by_race = patients_df.groupby('RACE', observed=True)['INCOME'].mean()
+        income_by_city = patients_df.groupby('CITY', observed=True)['INCOME'].mean()
+
+    return IncomeAnalytics(
+        mean_income=float(incomes.mean()),
+        median_income=float(incomes.median()),
+        bins=bins,
+        bracket_counts=_pairs(groups.value_counts()),
+        income_by_race=_pairs(income_by_race),
+        income_by_city=_pairs(income_by_city),
+        lowest_income_cities=_pairs(income_by_city.sort_values().head(10)),
+    )
@@ -0,0 +1,458 @@
+# Incremental maintenance of the city x year aggregates for append-only encounter feeds.
+#
+# New encounter/claim rows arrive as delta CSVs (same columns as the executive summary)
+# in HEALTHX_DELTA_DIR (default: <data dir>/deltas). Instead of rescanning history, the
+# aggregates are kept in mergeable form and persisted under CACHE_DIR/aggregates:
+#
+#   kpis     per city: row count, sums and non-null counts (means are sum / count)
+#   yearly   per (city, year): encounter count, claim cost and expense sums
+#   distinct per (city, year): the distinct PROVIDER and PATIENT IDs (for exact nunique),
+#            or with HEALTHX_DISTINCT_MODE=approx a HyperLogLog sketch of each instead
+#   counts   per city: ENCOUNTERCLASS and CATEGORY value counts
+#
+# Applying a delta aggregates only the delta rows and merges them in; forecast series
+# whose yearly values changed are marked stale in the forecast store. A full rebuild
+# from the base file plus every applied delta stays available as a consistency check.
+#
+# Approximate mode (healthx/sketch.py for the error bounds) stores a fixed-size sketch
+# per (city, year) instead of ID sets; sketches merge by register-wise max, so distinct
+# counts over any cities and years (distinct_counts()) need no rescan and constant memory.
+#
+#   python -m healthx.incremental            # apply new delta files
+#   python -m healthx.incremental check      # compare against a full rebuild
+#   python -m healthx.incremental rebuild    # discard the state and rebuild it
+#   python -m healthx.incremental ratio --city Boston --city Worcester --year 2020 --year 2021
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from healthx import config, cube, forecast, ingest, schema, sketch, tracing
+
+AGGREGATE_FORMAT = 2
+DISTINCT_MODES = ('exact', 'approx')
+ID_COLUMNS = ['PROVIDER', 'PATIENT']
+COUNT_COLUMNS = {'ENCOUNTERCLASS': 'Category', 'CATEGORY': 'Medication'}
+KPI_COLUMNS = ['total_encounters', 'coverage_sum', 'coverage_count', 'dispenses', 'encounters',
+               'dtt_sum', 'dtt_count']
+YEARLY_SUMS = ['NUM_ENCOUNTERS', 'TOTAL_CLAIM_COST', 'HEALTHCARE_EXPENSES']
+# Source columns summed into the aggregates, widened to float64 first
+SUM_COLUMNS = ['PAYER_COVERAGE_x', 'DISPENSES', 'ENCOUNTERS', 'DIAGNOSIS_TO_TREATMENT', 'TOTAL_CLAIM_COST',
+               'HEALTHCARE_EXPENSES']
+# Relative tolerance for the consistency check (float32 sources summed in a different order)
+CHECK_RTOL = 1e-6
+
+
+def delta_dir():
+    return os.environ.get('HEALTHX_DELTA_DIR', os.path.join(config.DATA_DIR, 'deltas'))
+
+
+def distinct_mode():
+    mode = os.environ.get('HEALTHX_DISTINCT_MODE', 'exact')
+    if mode not in DISTINCT_MODES:
+        raise ValueError(f'Unknown distinct mode {mode!r}; expected one of {", ".join(DISTINCT_MODES)}')
+    return mode
+
+
+def aggregates_dir(mode=None):
+    # Exact and approximate state live side by side, so switching modes does not rebuild
+    mode = mode or distinct_mode()
+    return os.path.join(config.CACHE_DIR, 'aggregates' if mode == 'exact' else f'aggregates-{mode}')
+
+
+def delta_files():
+    # Delta CSVs in name order, which is the order they are applied in
+    return sorted(glob.glob(os.path.join(delta_dir(), '*.csv')))
+
+
+def deltas_version(paths=None):
+    # Fingerprint of the delta files present, used as a cache key next to data_version
+    paths = delta_files() if paths is None else paths
+    digest = hashlib.sha1('|'.join(ingest.source_fingerprint(path) for path in paths).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _decode_ids(df, dictionaries):
+    # Dictionary codes -> original ID strings, so IDs from different files can be merged
+    for column in ID_COLUMNS:
+        if column in dictionaries and column in df:
+            codes = df[column].to_numpy(dtype='float64', na_value=-1).astype(np.int64)
+            vocabulary = np.append(dictionaries[column].to_numpy(dtype=object), None)
+            df[column] = vocabulary[codes]  # code -1 (missing) picks the trailing None
+    return df
+
+
+def read_base():
+    df = ingest.load_table('executive_summary')
+    return _decode_ids(df, ingest.load_dictionaries('executive_summary'))
+
+
+def read_delta(path):
+    with tracing.span('csv_load', table='executive_summary_delta') as attrs:
+        df, dictionaries = schema.read_csv_compact(path, schema.SCHEMAS['executive_summary'])
+        attrs['rows'] = len(df)
+    df = ingest.TABLE_DERIVE['executive_summary'](df)
+    return _decode_ids(df, dictionaries)
+
+
+def _sketch_rows(dated, precision):
+    # One sketch per (CITY_x, YEAR, column); each ID column is hashed once
+    rows = []
+    for column in ID_COLUMNS:
+        ids = dated.dropna(subset=['CITY_x', column])
+        hashes = sketch.hash_values(ids[column].astype(str))
+        for (city, year), positions in ids.groupby(['CITY_x', 'YEAR']).indices.items():
+            hll = sketch.HyperLogLog(precision).add_hashes(hashes[positions])
+            rows.append((city, year, column, hll.to_bytes()))
+    return pd.DataFrame(rows, columns=['CITY_x', 'YEAR', 'column', 'sketch'])
+
+
+def _merge_sketch_rows(frame):
+    # Sketch rows with the same (CITY_x, YEAR, column) combined by register-wise max
+    merged = {}
+    for city, year, column, data in frame.itertuples(index=False):
+        hll = sketch.HyperLogLog.from_bytes(data)
+        key = (city, year, column)
+        merged[key] = merged[key].merge(hll) if key in merged else hll
+    return pd.DataFrame([key + (hll.to_bytes(),) for key, hll in merged.items()],
+                        columns=['CITY_x', 'YEAR', 'column', 'sketch'])
+
+
+class CityAggregates:
+    # Mergeable per-city / per-year partial aggregates; see the module comment for the frames
+    def __init__(self, kpis, yearly, distinct, counts):
+        self.kpis = kpis          # index CITY_x; KPI_COLUMNS
+        self.yearly = yearly      # index (CITY_x, YEAR); YEARLY_SUMS
+        self.distinct = distinct  # columns CITY_x, YEAR, column, id (unique rows) or sketch (bytes)
+        self.counts = counts      # index (CITY_x, column, value); Count
+
+    @property
+    def approximate(self):
+        return 'sketch' in self.distinct
+
+    @classmethod
+    def from_frame(cls, data, mode='exact', precision=sketch.DEFAULT_PRECISION):
+        with tracing.span('groupby', detail='partial_aggregates', rows=len(data)):
+            df = cube.prepare_encounter_frame(data).astype(
+                {'CITY_x': object, **{column: 'float64' for column in SUM_COLUMNS}})
+
+            kpis = df.groupby('CITY_x').agg(
+                total_encounters=('CITY_x', 'size'),
+                coverage_sum=('PAYER_COVERAGE_x', 'sum'),
+                coverage_count=('PAYER_COVERAGE_x', 'count'),
+                dispenses=('DISPENSES', 'sum'),
+                encounters=('ENCOUNTERS', 'sum'),
+                dtt_sum=('DIAGNOSIS_TO_TREATMENT', 'sum'),
+                dtt_count=('DIAGNOSIS_TO_TREATMENT', 'count'),
+            ).astype('float64')
+
+            dated = df.dropna(subset=['YEAR']).astype({'YEAR': 'int64'})
+            yearly = dated.groupby(['CITY_x', 'YEAR']).agg(
+                NUM_ENCOUNTERS=('Id_x', 'count'),
+                TOTAL_CLAIM_COST=('TOTAL_CLAIM_COST', 'sum'),
+                HEALTHCARE_EXPENSES=('HEALTHCARE_EXPENSES', 'sum'),
+            ).astype('float64')
+
+            if mode == 'approx':
+                distinct = _sketch_rows(dated, precision)
+            else:
+                distinct = pd.concat(
+                    [dated.dropna(subset=['CITY_x', column])[['CITY_x', 'YEAR', column]]
+                     .drop_duplicates().rename(columns={column: 'id'}).assign(column=column)
+                     for column in ID_COLUMNS], ignore_index=True)[['CITY_x', 'YEAR', 'column', 'id']]
+                distinct['id'] = distinct['id'].astype(str)
+
+            counts = pd.concat(
+                [df.groupby(['CITY_x', column], observed=True).size().rename('Count').reset_index()
+                 .rename(columns={column: 'value'}).assign(column=column)
+                 for column in COUNT_COLUMNS], ignore_index=True)
+            counts['value'] = counts['value'].astype(str)
+            counts = counts.set_index(['CITY_x', 'column', 'value'])[['Count']].astype('float64')
+        return cls(kpis, yearly, distinct, counts)
+
+    def merge(self, other):
+        if self.approximate != other.approximate:
+            raise ValueError('cannot merge exact and approximate distinct aggregates')
+        distinct = pd.concat([self.distinct, other.distinct], ignore_index=True)
+        return CityAggregates(
+            kpis=self.kpis.add(other.kpis, fill_value=0),
+            yearly=self.yearly.add(other.yearly, fill_value=0),
+            distinct=_merge_sketch_rows(distinct) if self.approximate else distinct.drop_duplicates(ignore_index=True),
+            counts=self.counts.add(other.counts, fill_value=0),
+        )
+
+    def _nunique(self):
+        # Distinct IDs per (CITY_x, YEAR) and column; sketch estimates are rounded
+        if self.approximate:
+            estimates = self.distinct['sketch'].map(lambda data: len(sketch.HyperLogLog.from_bytes(data)))
+            nunique = self.distinct.assign(n=estimates).set_index(['CITY_x', 'YEAR', 'column'])['n']
+        else:
+            nunique = self.distinct.groupby(['CITY_x', 'YEAR', 'column']).size()
+        return nunique.unstack('column').reindex(columns=ID_COLUMNS).fillna(0).astype('int64')
+
+    def distinct_counts(self, cities=None, years=None):
+        # Distinct PROVIDER and PATIENT IDs over any set of cities and years (all by default)
+        # and their ratio. Exact mode unions the ID sets; approximate mode merges sketches.
+        rows = self.distinct
+        if cities is not None:
+            rows = rows[rows['CITY_x'].isin(list(cities))]
+        if years is not None:
+            rows = rows[rows['YEAR'].isin([int(year) for year in years])]
+        counts = {}
+        for column in ID_COLUMNS:
+            selected = rows[rows['column'] == column]
+            if self.approximate:
+                sketches = [sketch.HyperLogLog.from_bytes(data) for data in selected['sketch']]
+                counts[column] = len(sketch.merge_all(sketches, sketches[0].precision)) if sketches else 0
+            else:
+                counts[column] = int(selected['id'].nunique())
+        counts['RATIO'] = counts['PROVIDER'] / counts['PATIENT'] if counts['PATIENT'] else float('nan')
+        return counts
+
+    def to_cube(self):
+        # {city: CitySummary}, the same values cube.build_city_cube gives on all rows
+        # (distinct counts within the sketch error bounds in approximate mode)
+        nunique = self._nunique()
+        yearly = self.yearly.join(nunique, how='left').fillna({column: 0 for column in ID_COLUMNS})
+        yearly = yearly.astype({'NUM_ENCOUNTERS': 'int64', 'PROVIDER': 'int64', 'PATIENT': 'int64'})
+        yearly = yearly[['NUM_ENCOUNTERS', 'PROVIDER', 'PATIENT', 'TOTAL_CLAIM_COST', 'HEALTHCARE_EXPENSES']]
+        yearly['RATIO'] = yearly['PROVIDER'] / yearly['PATIENT']
+        yearly_by_city = {city: group.droplevel('CITY_x').reset_index()
+                          for city, group in yearly.sort_index().groupby(level='CITY_x', sort=False)}
+
+        counts_by_city = {}
+        counts = self.counts.reset_index().astype({'Count': 'int64'})
+        counts = counts.sort_values(['CITY_x', 'column', 'Count', 'value'], ascending=[True, True, False, True])
+        for (city, column), group in counts.groupby(['CITY_x', 'column'], sort=False):
+            counts_by_city[(city, column)] = (group[['value', 'Count']]
+                                              .rename(columns={'value': COUNT_COLUMNS[column]}).reset_index(drop=True))
+
+        empty_yearly = pd.DataFrame(columns=['YEAR', 'NUM_ENCOUNTERS', 'PROVIDER', 'PATIENT',
+                                             'TOTAL_CLAIM_COST', 'HEALTHCARE_EXPENSES', 'RATIO'])
+        result = {}
+        for city, row in self.kpis.sort_index().iterrows():
+            empty = {column: pd.DataFrame(columns=[label, 'Count']) for column, label in COUNT_COLUMNS.items()}
+            result[city] = cube.CitySummary(
+                city=city,
+                total_encounters=int(row['total_encounters']),
+                avg_coverage=row['coverage_sum'] / row['coverage_count'] if row['coverage_count'] else float('nan'),
+                adherence_rate=float(row['dispenses'] / row['encounters']) if row['encounters'] > 0 else 0,
+                avg_diagnosis_to_treatment=row['dtt_sum'] / row['dtt_count'] if row['dtt_count'] else float('nan'),
+                yearly=yearly_by_city.get(city, empty_yearly),
+                encounter_classes=counts_by_city.get((city, 'ENCOUNTERCLASS'), empty['ENCOUNTERCLASS']),
+                medications=counts_by_city.get((city, 'CATEGORY'), empty['CATEGORY']),
+            )
+        return result
+
+    def save(self, directory, generation):
+        os.makedirs(directory, exist_ok=True)
+        for name, frame in self._frames().items():
+            ingest._write_atomic(frame, os.path.join(directory, f'{name}-{generation}.parquet'))
+
+    @classmethod
+    def load(cls, directory, generation):
+        frames = {name: pd.read_parquet(os.path.join(directory, f'{name}-{generation}.parquet'))
+                  for name in ('kpis', 'yearly', 'distinct', 'counts')}
+        return cls(
+            kpis=frames['kpis'].set_index('CITY_x'),
+            yearly=frames['yearly'].set_index(['CITY_x', 'YEAR']),
+            distinct=frames['distinct'],
+            counts=frames['counts'].set_index(['CITY_x', 'column', 'value']),
+        )
+
+    def _frames(self):
+        return {'kpis': self.kpis.reset_index(), 'yearly': self.yearly.reset_index(),
+                'distinct': self.distinct, 'counts': self.counts.reset_index()}
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def _write_manifest(directory, manifest):
+    tmp_path = os.path.join(directory, f'manifest.json.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, indent=2)
+    os.replace(tmp_path, os.path.join(directory, 'manifest.json'))  # the new generation becomes visible at once
+
+
+def _commit(directory, aggregates, manifest):
+    # Write a new generation of the state files, then point the manifest at it
+    previous = manifest.get('generation', 0)
+    manifest = dict(manifest, generation=previous + 1)
+    aggregates.save(directory, manifest['generation'])
+    _write_manifest(directory, manifest)
+    for stale in glob.glob(os.path.join(directory, f'*-{previous}.parquet')):
+        os.remove(stale)
+    return manifest
+
+
+def _distinct_settings(mode):
+    return {'mode': mode, 'precision': sketch.DEFAULT_PRECISION if mode == 'approx' else None}
+
+
+def rebuild(deltas=None, directory=None, mode=None):
+    # Full rebuild: aggregate the base file and every delta, replacing the stored state
+    mode = mode or distinct_mode()
+    directory = directory or aggregates_dir(mode)
+    deltas = delta_files() if deltas is None else deltas
+    settings = _distinct_settings(mode)
+    aggregates = CityAggregates.from_frame(pd.concat([read_base()] + [read_delta(path) for path in deltas],
+                                                     ignore_index=True), mode, settings['precision'])
+    manifest = _read_manifest(directory) or {}
+    manifest = {'format': AGGREGATE_FORMAT, 'base': ingest.data_version(['executive_summary']),
+                'distinct': settings,
+                'deltas': [{'path': os.path.abspath(path), 'fingerprint': ingest.source_fingerprint(path)}
+                           for path in deltas], 'generation': manifest.get('generation', 0)}
+    _commit(directory, aggregates, manifest)
+    return aggregates
+
+
+def changed_series(before, after):
+    # (city, metric) forecast series whose yearly values differ between two cubes
+    changed = []
+    for city, summary in after.items():
+        old = before.get(city)
+        for metric, column in forecast.YEARLY_COLUMNS.items():
+            new_series = summary.yearly.set_index('YEAR')[column]
+            if old is None or not new_series.equals(old.yearly.set_index('YEAR')[column]):
+                changed.append((city, metric))
+    return changed
+
+
+def refresh(directory=None, store=None, mode=None):
+    # Stored aggregates with every new delta applied. Rebuilds when there is no state yet,
+    # the base file or the sketch precision changed or a delta that was applied earlier
+    # changed or disappeared. Returns (aggregates, applied delta paths, stale (city, metric) keys).
+    mode = mode or distinct_mode()
+    directory = directory or aggregates_dir(mode)
+    settings = _distinct_settings(mode)
+    manifest = _read_manifest(directory)
+    base = ingest.data_version(['executive_summary'])
+    present = {os.path.abspath(path): ingest.source_fingerprint(path) for path in delta_files()}
+    applied = {entry['path']: entry['fingerprint'] for entry in (manifest or {}).get('deltas', [])}
+    if (manifest is None or manifest.get('format') != AGGREGATE_FORMAT or manifest.get('base') != base
+            or manifest.get('distinct') != settings
+            or any(present.get(path) != fingerprint for path, fingerprint in applied.items())):
+        return rebuild(directory=directory, mode=mode), list(present), []
+
+    aggregates = CityAggregates.load(directory, manifest['generation'])
+    new = [path for path in present if path not in applied]
+    if not new:
+        return aggregates, [], []
+
+    before = aggregates.to_cube()
+    for path in new:
+        aggregates = aggregates.merge(CityAggregates.from_frame(read_delta(path), mode, settings['precision']))
+    manifest['deltas'] = manifest['deltas'] + [{'path': path, 'fingerprint': present[path]} for path in new]
+    _commit(directory, aggregates, manifest)
+
+    stale = changed_series(before, aggregates.to_cube())
+    if stale:
+        from healthx.forecast_store import ForecastStore
+
+        store = store or ForecastStore()
+        store.mark_stale(stale)
+    return aggregates, new, stale
+
+
+def load_city_cube():
+    # {city: CitySummary} over the base file plus every delta, updated incrementally
+    return refresh()[0].to_cube()
+
+
+def distinct_rtol(precision=sketch.DEFAULT_PRECISION):
+    # Tolerance for sketch estimates in the consistency check: 4 standard errors
+    return 4 * sketch.standard_error(precision)
+
+
+def _compare_distinct(city, a, b, rtol, found):
+    # PROVIDER / PATIENT within rtol (plus one ID for rounding); RATIO compounds both errors
+    for column, tolerance in (('PROVIDER', rtol), ('PATIENT', rtol), ('RATIO', 2 * rtol)):
+        left, right = a[column].to_numpy(dtype=float), b[column].to_numpy(dtype=float)
+        atol = 1 if column != 'RATIO' else 0
+        if len(left) != len(right) or not np.allclose(left, right, rtol=tolerance, atol=atol, equal_nan=True):
+            found.append(f'{city} yearly {column}: estimates outside {tolerance:.1%} of the exact counts')
+
+
+def compare_cubes(left, right, rtol=CHECK_RTOL, distinct_rtol=None):
+    # Mismatch messages between two {city: CitySummary} cubes (empty = consistent).
+    # With distinct_rtol the distinct-count columns of left are sketch estimates.
+    found = []
+    if sorted(left) != sorted(right):
+        found.append(f'cities differ: {sorted(set(left) ^ set(right))}')
+    for city in sorted(set(left) & set(right)):
+        a, b = left[city], right[city]
+        for field in ('total_encounters', 'avg_coverage', 'adherence_rate', 'avg_diagnosis_to_treatment'):
+            if not np.isclose(getattr(a, field), getattr(b, field), rtol=rtol, equal_nan=True):
+                found.append(f'{city} {field}: {getattr(a, field)} != {getattr(b, field)}')
+        for field in ('yearly', 'encounter_classes', 'medications'):
+            frames = [getattr(a, field).reset_index(drop=True), getattr(b, field).reset_index(drop=True)]
+            if field == 'yearly' and distinct_rtol is not None:
+                _compare_distinct(city, frames[0], frames[1], distinct_rtol, found)
+                frames = [frame.drop(columns=['PROVIDER', 'PATIENT', 'RATIO']) for frame in frames]
+            try:
+                pd.testing.assert_frame_equal(frames[0], frames[1],
+                                              check_dtype=False, check_categorical=False, rtol=rtol)
+            except AssertionError as error:
+                found.append(f'{city} {field}: {str(error).splitlines()[0]}')
+    return found
+
+
+def check(directory=None):
+    # Incrementally maintained cube vs a from-scratch cube.build_city_cube over all rows;
+    # sketch estimates must fall within distinct_rtol() of the exact counts
+    directory = directory or aggregates_dir()
+    manifest = _read_manifest(directory)
+    if manifest is None:
+        return ['no incremental state; run `python -m healthx.incremental` first']
+    stored = CityAggregates.load(directory, manifest['generation']).to_cube()
+    data = pd.concat([read_base()] + [read_delta(entry['path']) for entry in manifest['deltas']], ignore_index=True)
+    settings = manifest.get('distinct') or {}
+    tolerance = distinct_rtol(settings['precision']) if settings.get('mode') == 'approx' else None
+    return compare_cubes(stored, cube.build_city_cube(data), distinct_rtol=tolerance)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Maintain the city x year aggregates incrementally.')
+    parser.add_argument('action', nargs='?', default='apply', choices=['apply', 'check', 'rebuild', 'ratio'])
+    parser.add_argument('--mode', choices=DISTINCT_MODES,
+                        help='exact ID sets or HyperLogLog sketches for distinct counts (default: HEALTHX_DISTINCT_MODE or exact)')
+    parser.add_argument('--city', action='append', help='ratio: limit to this city (repeatable; default all)')
+    parser.add_argument('--year', action='append', type=int, help='ratio: limit to this year (repeatable; default all)')
+    args = parser.parse_args(argv)
+    if args.mode:
+        os.environ['HEALTHX_DISTINCT_MODE'] = args.mode
+
+    if args.action == 'ratio':
+        counts = refresh()[0].distinct_counts(args.city, args.year)
+        print(f"{counts['PROVIDER']:,} providers / {counts['PATIENT']:,} patients = {counts['RATIO']:.4f} "
+              f'({distinct_mode()} distinct counts)')
+    elif args.action == 'rebuild':
+        aggregates = rebuild()
+        print(f'Rebuilt aggregates for {len(aggregates.kpis)} cities from the base file and {len(delta_files())} deltas')
+    elif args.action == 'apply':
+        _, applied, stale = refresh()
+        print(f'Applied {len(applied)} delta file(s); {len(stale)} forecast series marked stale')
+        for city, metric in stale:
+            print(f'  stale: {city} / {metric}')
+    else:
+        found = check()
+        print('Incremental aggregates match a full rebuild' if not found else f'{len(found)} mismatches:')
+        for message in found:
+            print('  ' + message)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+# Columnar ingestion cache for the source CSVs.
+#
+# Each CSV is parsed once into a typed Parquet file stored under CACHE_DIR. The cache
+# file name carries a fingerprint of the source path, mtime and size, so editing or
+# replacing a CSV automatically produces a new cache entry on the next load. Later
+# loads read only the requested columns straight from Parquet. Tables in TABLE_DERIVE get
+# their derived columns (healthx/derived.py) added once, while the cache is built.
+
+import glob
+import hashlib
+import logging
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from healthx import config, derived, schema, tracing
+
+logger = logging.getLogger(__name__)
+
+# Bump when the cached representation changes so existing caches are rebuilt
+CACHE_FORMAT = 5
+
+# Cached tables stored sorted by these columns, in row groups of ROW_GROUP_ROWS rows, so
+# engines scanning the Parquet files (see healthx.query) can skip row groups by city
+TABLE_SORT = {
+    'executive_summary': ['CITY_x'],
+}
+ROW_GROUP_ROWS = 128_000
+
+# Derived-column stage per table, run on the full table before it is written
+TABLE_DERIVE = {
+    'executive_summary': derived.derive_encounter_columns,
+}
+
+# Typing hints applied when a CSV without a compact schema (see schema.SCHEMAS) is first converted
+TABLE_DTYPES = {
+    'encounters': {
+        'dtype': {'Id': 'string', 'PATIENT': 'string', 'PROVIDER': 'string', 'ENCOUNTERCLASS': 'string'},
+        'dates': ['START', 'STOP'],
+    },
+    'population': {
+        'dtype': {'CITY': 'string'},
+        'dates': [],
+    },
+    'providers': {
+        'dtype': {'Id': 'string', 'CITY': 'string'},
+        'dates': [],
+    },
+}
+
+# Columns the dashboard pages actually use (None means every column)
+TABLE_COLUMNS = {
+    'patients': ['Id', 'BIRTHDATE', 'GENDER', 'RACE', 'CITY', 'INCOME'],
+    'encounters': ['PATIENT'],
+    'population': None,
+    'providers': ['Id', 'NAME', 'CITY', 'LAT', 'LON'],
+    'executive_summary': ['Id_x', 'PATIENT', 'PROVIDER', 'CITY_x', 'YEAR', 'DIAGNOSIS_TO_TREATMENT',
+                          'ENCOUNTERCLASS', 'CATEGORY', 'PAYER_COVERAGE_x', 'DISPENSES', 'ENCOUNTERS',
+                          'TOTAL_CLAIM_COST', 'HEALTHCARE_EXPENSES'],
+}
+
+
+def source_fingerprint(path):
+    # Short hash of path + mtime + size; changes whenever the CSV is rewritten
+    stat = os.stat(path)
+    key = f'{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{CACHE_FORMAT}'
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def data_version(tables=None):
+    # Combined fingerprint of the given source tables, used as a cache key for derived data
+    tables = tables or sorted(config.SOURCE_FILES)
+    parts = [f'{table}={source_fingerprint(config.source_path(table))}' for table in tables]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def cache_path(table, path=None):
+    path = path or config.source_path(table)
+    return os.path.join(config.CACHE_DIR, f'{table}-{source_fingerprint(path)}.parquet')
+
+
+def dictionaries_path(table, path=None):
+    # Sidecar file holding the vocabularies of dictionary-encoded ID columns
+    return cache_path(table, path).replace('.parquet', '.dictionaries.parquet')
+
+
+def _read_source_csv(table, path):
+    if table in schema.SCHEMAS:
+        return schema.read_csv_compact(path, schema.SCHEMAS[table])
+    hints = TABLE_DTYPES.get(table, {'dtype': {}, 'dates': []})
+    df = pd.read_csv(path, dtype=hints['dtype'], low_memory=False)
+    for column in hints['dates']:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+    return df, {}
+
+
+def _write_atomic(df, target):
+    tmp_target = f'{target}.{os.getpid()}.tmp'
+    df.to_parquet(tmp_target, index=False, row_group_size=ROW_GROUP_ROWS)
+    os.replace(tmp_target, target)  # atomic, so concurrent readers never see a partial file
+
+
+def build_cache(table, path=None):
+    # Convert one source CSV to Parquet and drop stale cache files for the same table
+    path = path or config.source_path(table)
+    target = cache_path(table, path)
+    os.makedirs(config.CACHE_DIR, exist_ok=True)
+
+    with tracing.span('csv_load', table=table) as attrs:
+        df, dictionaries = _read_source_csv(table, path)
+        attrs['rows'] = len(df)
+    if table in TABLE_DERIVE:
+        df = TABLE_DERIVE[table](df)
+    if table in TABLE_SORT:
+        df = df.sort_values(TABLE_SORT[table], kind='stable', ignore_index=True)
+    if dictionaries:
+        vocabularies = pd.concat(
+            [pd.DataFrame({'column': column, 'code': range(len(values)), 'value': values.astype(str)})
+             for column, values in dictionaries.items()], ignore_index=True)
+        _write_atomic(vocabularies, dictionaries_path(table, path))
+    _write_atomic(df, target)
+
+    keep = {target, dictionaries_path(table, path)}
+    for stale in glob.glob(os.path.join(config.CACHE_DIR, f'{table}-*.parquet')):
+        if stale not in keep:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return target
+
+
+def load_dictionaries(table, path=None):
+    # {column: Index of original values} for the dictionary-encoded ID columns of a table
+    ensure_cache(table, path)
+    sidecar = dictionaries_path(table, path)
+    if not os.path.exists(sidecar):
+        return {}
+    vocabularies = pd.read_parquet(sidecar)
+    return {column: pd.Index(group.sort_values('code')['value'].to_numpy(), name=column)
+            for column, group in vocabularies.groupby('column')}
+
+
+def ensure_cache(table, path=None):
+    # Path of the up-to-date Parquet cache of a table, converting the CSV first if needed
+    path = path or config.source_path(table)
+    target = cache_path(table, path)
+    if not os.path.exists(target):
+        build_cache(table, path)
+    return target
+
+
+def load_table(table, columns='default', path=None):
+    # Load a source table through the Parquet cache, rebuilding it if the CSV changed.
+    # columns='default' reads TABLE_COLUMNS[table]; None reads every column.
+    if columns == 'default':
+        columns = TABLE_COLUMNS.get(table)
+
+    target = ensure_cache(table, path)
+
+    if columns is not None:
+        # Only ask Parquet for columns that exist in this export
+        available = set(pq.read_schema(target).names)
+        columns = [column for column in columns if column in available]
+    with tracing.span('parquet_load', table=table) as attrs:
+        df = pd.read_parquet(target, columns=columns)
+        attrs['rows'] = len(df)
+    logger.info('Loaded %s: %d rows x %d columns, %.1f MB in memory',
+                table, len(df), df.shape[1], schema.memory_footprint(df) / 2**20)
+    return df
@@ -0,0 +1,13 @@
+# Dashboard pages. Each page lives in its own module with a render() function and is
+# only imported the first time it is shown, so heavy dependencies (plotly,
+# statsmodels) and page-specific datasets load on demand.
+
+# Sidebar label -> module under healthx.pages
+PAGES = {
+    "Home": "home",
+    "Patient Demographics Analysis": "demographics",
+    "General Insights": "general_insights",
+    "Predictive Insights": "predictive_insights",
+    "Provider Accessibility": "accessibility",
+    "About": "about",
+}
@@ -0,0 +1,59 @@
+import streamlit as st
+
+
+def load():
+    return None
+
+
+def render():
+    st.header("ℹ️ About This Project")
+    st.write("""
+        This section will explain the purpose, data, and team behind HealthX.
+    """)
+    
+    st.subheader("About the Project")
+    st.write("""
+        HealthX is a data-powered healthcare analytics platform dedicated to uncovering and addressing disparities in healthcare access across diverse communities. 
+        Built on the principles of the 5 A’s of Healthcare—Accessibility, Affordability, Availability, Accommodation, and Acceptability—HealthX transforms complex datasets 
+        into actionable insights using advanced analytics and predictive modeling.
+        
+        By leveraging AI and machine learning, HealthX forecasts key healthcare trends such as encounter rates, provider availability, and chronic disease patterns to help public health administrators, 
+        policymakers, and stakeholders make informed, equitable decisions.
+        
+        Our mission is simple but powerful:
+        To bridge the gap in healthcare access by turning real-time data into smarter solutions for a healthier, more inclusive future.
+    """)
+
+    st.subheader("About the Data")
+    st.write("""
+        The data used in **HealthX** includes a combination of **synthetic health data** from **Synthea-generated health records** and **US Census population data**. 
+        These datasets allow us to generate real-time insights and predictive analytics that address healthcare disparities. Below is a breakdown of the key data used in the project:
+        
+        1. **Synthea-Generated Health Data**:
+            - **Conditions**: Contains information about the medical conditions diagnosed in patients. This dataset helps identify the most prevalent health issues in different regions and demographic groups, assisting in understanding healthcare needs and utilization patterns.
+            - **Claims**: Provides data on healthcare costs, total claim amounts, insurance coverage, and reimbursements. This dataset is vital for analyzing healthcare affordability, the financial burden on patients, and understanding claim patterns across various healthcare services.
+            - **Encounters**: Tracks healthcare visits, procedures, and treatments. It provides insights into healthcare access and utilization, including the frequency of medical interactions and the types of services provided.
+            - **Medication**: Includes data on medication refills, dispensations, and adherence rates. This dataset is used to track patient compliance with prescribed medications and evaluate the effectiveness of treatment regimens.
+            - **Patient**: Contains demographic information about patients, such as age, gender, race, income, and other personal details. This data is crucial for understanding disparities in healthcare access across different population groups.
+        
+        2. **US Census Population Data (2010-2023)**:
+            This dataset provides population data, which is crucial for understanding demographic shifts and regional disparities in healthcare access. The **US Census population data** is used in HealthX for forecasting population trends in various cities, allowing us to project future healthcare needs.
+        
+        3. **Provider**: Includes information on healthcare providers, such as availability, specialties, and patient-to-provider ratios. This dataset helps assess the distribution and accessibility of healthcare services in different regions, aiding in the analysis of healthcare supply and demand.
+    """)
+
+    st.subheader("About Synthea")
+    st.write("""
+        Synthea is an open-source project that generates synthetic healthcare data for modeling and testing purposes. It produces comprehensive, realistic datasets for 
+        health systems, including demographic data, health encounters, conditions, medications, and treatments. HealthX uses these datasets to simulate real-world healthcare scenarios, 
+        ensuring that our insights are grounded in data-driven predictions.
+    """)
+
+    st.subheader("Team Members")
+    st.write("""
+        - Udaya Lakshmi Boddu
+        - Meer Anas Ali
+        - Naga Tulasi Velamakanni
+        - Harsha Vardhan Nallamothu
+        - Renusri Darukumalli
+    """)
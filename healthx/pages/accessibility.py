@@ -0,0 +1,82 @@
+import plotly.express as px
+import streamlit as st
+
+from healthx import accessibility, ingest
+from healthx.pages import shared
+
+
+def load():
+    return shared.get_accessibility_engine()
+
+
+def render():
+    st.title("🏥 Provider Accessibility")
+    st.write("""
+        How far patients live from the nearest healthcare provider, and how many providers they can reach
+        within a travel radius, by city, race and income bracket.
+    """)
+
+    # Every patient's nearest provider comes from a KD-tree over provider locations, built once per data version
+    engine = load()
+    if not engine.available:
+        st.info("Patient and provider locations (LAT/LON) are needed for this page.")
+        return
+    radius_section(engine)
+
+
+# Changing the radius reruns only this fragment: one providers-within-radius query over
+# all patients, memoized per (radius, data version)
+@shared.fragment("Provider Accessibility")
+def radius_section(engine):
+    radius_km = st.select_slider("Travel radius (km)", options=list(accessibility.RADII_KM),
+                                 value=accessibility.DEFAULT_RADIUS_KM, key="accessibility_radius")
+    version = ingest.data_version(['patients', 'providers'])
+    results = shared.memoize('accessibility.results', (radius_km, version), lambda: engine.results(radius_km))
+
+    # KPI Layout
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Patients", f"{results.patients:,}")
+
+    with col2:
+        st.metric("Providers", f"{results.providers:,}")
+
+    with col3:
+        st.metric("Median Distance to Nearest Provider", f"{results.median_km:.2f} km")
+
+    with col4:
+        st.metric(f"Patients with a Provider within {radius_km} km", f"{results.share_within:.1%}")
+
+    if results.unlocated:
+        st.caption(f"{results.unlocated:,} patients without coordinates are left out.")
+
+    # Distance distribution
+    histogram_fig = shared.figure('accessibility.histogram', (radius_km, version), lambda: px.bar(
+        results.histogram, x='Distance (km)', y='Patients', title="Distance to the Nearest Provider"))
+    shared.plotly_chart(histogram_fig, key="accessibility_histogram", use_container_width=True)
+
+    # Cities, least accessible first
+    by_city = results.by_group['City']
+    city_fig = shared.figure('accessibility.city', (radius_km, version), lambda: px.bar(
+        by_city, x='City', y='Median km to Nearest Provider', title="Median Distance to the Nearest Provider by City"))
+    shared.plotly_chart(city_fig, key="accessibility_city", use_container_width=True)
+
+    # Race and income bracket side by side
+    col1, col2 = st.columns(2)
+    for column, label in zip((col1, col2), ('Race', 'Income Group')):
+        if label not in results.by_group:
+            continue
+        with column:
+            group_fig = shared.figure(f'accessibility.{label}', (radius_km, version), lambda label=label: px.bar(
+                results.by_group[label], x=label, y='Share Within Radius', range_y=[0, 1],
+                title=f"Share with a Provider within {radius_km} km by {label}"))
+            shared.plotly_chart(group_fig, key=f"accessibility_{label}", use_container_width=True)
+
+    # Tables
+    for label, table in results.by_group.items():
+        st.markdown(f"<h3>Accessibility by {label}</h3>", unsafe_allow_html=True)
+        shared.table(table, f"accessibility_{label}", hide_index=True, use_container_width=True)
+
+    st.markdown("<h3>Providers Nearest to the Most Patients</h3>", unsafe_allow_html=True)
+    shared.table(results.busiest_providers, "accessibility_providers", hide_index=True, use_container_width=True)
@@ -0,0 +1,271 @@
+import functools
+
+import plotly.express as px
+import streamlit as st
+
+from healthx import cohort, payload, tracing
+from healthx.pages import shared
+
+
+def load():
+    return shared.get_data_context()
+
+
+# Aggregates behind the Gender Analysis and Geographic Distribution tabs (also timed by
+# benchmarks/pages.py). Encounter-level counts come from the query backend.
+def gender_breakdown(ctx, backend):
+    with tracing.span('groupby', detail='gender_breakdown', backend=backend.name):
+        gender_dist = ctx.patients['GENDER'].value_counts().reset_index()
+        gender_dist.columns = ['Gender', 'Count']
+        # Males and Females by Age Group
+        gender_age_group_counts = backend.gender_age_counts()
+    return gender_dist, gender_age_group_counts
+
+
+def geographic_breakdown(ctx, backend):
+    with tracing.span('groupby', detail='geographic_breakdown', backend=backend.name):
+        race_dist = ctx.patients['RACE'].value_counts().reset_index()
+        race_dist.columns = ['Race', 'Count']
+        encounters_by_city = backend.encounters_by_city()
+    return race_dist, encounters_by_city.head(10)
+
+
+def render():
+    ctx = load()
+    st.title("Patient Demographics Analysis")
+    sections(ctx)
+    cohort_section()
+
+
+# The four buttons and the section they open. A click reruns only this fragment; the
+# aggregates and figures are memoized per data version, so sections do not rebuild them.
+@shared.fragment("Patient Demographics Analysis")
+def sections(ctx):
+    population_df = ctx.population
+    age_stats_df = ctx.age_stats
+    age_mean = ctx.age_mean
+    age_median = ctx.age_median
+    version = (ctx.data_version, ctx.as_of)
+
+    # Display sub-tabs for age distribution, gender analysis, etc., in a row using columns for buttons
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        age_distribution_button = st.button("Age Distribution")
+    with col2:
+        gender_analysis_button = st.button("Gender Analysis")
+    with col3:
+        geographic_distribution_button = st.button("Geographic Distribution")
+    with col4:
+        income_analysis_button = st.button("Income Analysis")
+
+    # The open section stays open on the next rerun, so widgets inside it (table pages) work
+    clicked = [age_distribution_button, gender_analysis_button, geographic_distribution_button, income_analysis_button]
+    if any(clicked):
+        st.session_state["demographics_section"] = clicked.index(True)
+    open_section = st.session_state.get("demographics_section")
+    age_distribution_button, gender_analysis_button, geographic_distribution_button, income_analysis_button = (
+        open_section == position for position in range(4))
+    
+    if age_distribution_button:
+        st.subheader("Age Distribution Analysis")
+        # Display the KPI boxes for Mean and Median Age in the same row with some gap between them using st.columns
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown(
+                f"""
+                <div style="border: 2px solid #E6E6E6; padding: 20px; text-align: center;">
+                    <h3>Mean Age</h3>
+                    <p style="font-size: 36px; font-weight: bold;">{age_mean:.2f} years</p>
+                </div>
+                """, unsafe_allow_html=True)
+
+        with col2:
+            st.markdown(
+                f"""
+                <div style="border: 2px solid #E6E6E6; padding: 20px; text-align: center;">
+                    <h3>Median Age</h3>
+                    <p style="font-size: 36px; font-weight: bold;">{age_median:.2f} years</p>
+                </div>
+                """, unsafe_allow_html=True)
+        
+        # Display the Age Group Distribution with encounter count inside a bordered box
+        st.markdown(
+            """
+            <div style="border: 2px solid #E6E6E6; padding: 20px; margin-top: 20px;">
+            """, unsafe_allow_html=True)
+        
+        age_group_dist_fig = shared.figure('demographics.age_group_dist', version, lambda: px.bar(
+            age_stats_df, x='Age Group', y='Patient Count', title="Age Group Distribution with Number of Patients"))
+        shared.plotly_chart(age_group_dist_fig)
+
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    elif gender_analysis_button:
+        st.subheader("Gender Analysis")
+        backend = shared.get_query_backend()
+        gender_dist, gender_age_group_counts = shared.memoize(
+            'demographics.gender_breakdown', (backend.name,) + version, functools.partial(gender_breakdown, ctx, backend))
+        
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown(
+                f"""
+                <div style="border: 2px solid #E6E6E6; padding: 20px; text-align: center;">
+                    <h3>Male Patients</h3>
+                    <p style="font-size: 36px; font-weight: bold;">{gender_dist[gender_dist['Gender'] == 'M']['Count'].values[0]}</p>
+                </div>
+                """, unsafe_allow_html=True)
+
+        with col2:
+            st.markdown(
+                f"""
+                <div style="border: 2px solid #E6E6E6; padding: 20px; text-align: center;">
+                    <h3>Female Patients</h3>
+                    <p style="font-size: 36px; font-weight: bold;">{gender_dist[gender_dist['Gender'] == 'F']['Count'].values[0]}</p>
+                </div>
+                """, unsafe_allow_html=True)
+        
+        # Gender Distribution Pie chart inside a bordered box
+        st.markdown(
+            """
+            <div style="border: 2px solid #E6E6E6; padding: 20px; margin-top: 20px;">
+            """, unsafe_allow_html=True)
+        
+        gender_pie_fig = shared.figure('demographics.gender_pie', (backend.name,) + version, lambda: px.pie(
+            gender_dist, names='Gender', values='Count', title="Gender Distribution"))
+        shared.plotly_chart(gender_pie_fig)
+        
+        st.markdown("</div>", unsafe_allow_html=True)
+        
+        # Males and Females by Age Group inside a bordered box
+        st.markdown(
+            """
+            <div style="border: 2px solid #E6E6E6; padding: 20px; margin-top: 20px;">
+            """, unsafe_allow_html=True)
+        
+        # Plot bar chart for Gender and Age Group
+        gender_age_group_fig = shared.figure('demographics.gender_age_group', (backend.name,) + version, lambda: px.bar(
+            gender_age_group_counts, x="Age Group", y="Encounter Count", color="GENDER", barmode='group', title="Encounters by Gender and Age Group"))
+        shared.plotly_chart(gender_age_group_fig)
+
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    elif geographic_distribution_button:
+        st.subheader("Geographic Distribution")
+        backend = shared.get_query_backend()
+        race_dist, top_10_cities_encounters = shared.memoize(
+            'demographics.geographic_breakdown', (backend.name,) + version, functools.partial(geographic_breakdown, ctx, backend))
+    
+        # Number of Patients in Different Races
+        st.markdown("<h3>Number of Patients in Different Races</h3>", unsafe_allow_html=True)
+        shared.table(race_dist, "race_dist")
+
+        # Pie chart of percentage of different races
+        st.markdown("<h3>Percentage of Different Races</h3>", unsafe_allow_html=True)
+        race_pie_fig = shared.figure('demographics.race_pie', (backend.name,) + version,
+                                     lambda: px.pie(race_dist, names='Race', values='Count'))
+        shared.plotly_chart(race_pie_fig)
+
+        # Population of each city (2010-2023)
+        st.markdown("<h3>Population of Each City (2010-2023)</h3>", unsafe_allow_html=True)
+        shared.table(population_df, "population")
+        
+        # Top 10 cities with more encounters
+        st.markdown("<h3>Top 10 Cities with More Encounters</h3>", unsafe_allow_html=True)
+        encounters_fig = shared.figure('demographics.top_cities', (backend.name,) + version,
+                                       lambda: px.bar(top_10_cities_encounters, x='City', y='Encounter Count'))
+        shared.plotly_chart(encounters_fig)
+
+        
+        # Income Analysis Page
+    elif income_analysis_button:
+        st.subheader("Income Analysis")
+
+        # Income analytics are computed once per data version and shared across sessions
+        incomes = shared.get_income_analytics()
+        mean_income = incomes.mean_income
+        median_income = incomes.median_income
+
+        # Display the KPI boxes for Mean and Median Income
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown(
+                f"""
+                <div style="border: 2px solid #E6E6E6; padding: 20px; text-align: center;">
+                    <h3>Mean Income</h3>
+                    <p style="font-size: 36px; font-weight: bold;">${mean_income:,.2f}</p>
+                </div>
+                """, unsafe_allow_html=True)
+
+        with col2:
+            st.markdown(
+                f"""
+                <div style="border: 2px solid #E6E6E6; padding: 20px; text-align: center;">
+                    <h3>Median Income</h3>
+                    <p style="font-size: 36px; font-weight: bold;">${median_income:,.2f}</p>
+                </div>
+                """, unsafe_allow_html=True)
+
+        # Income Distribution Pie chart
+        income_dist = incomes.bracket_counts_frame()
+        income_pie_fig = shared.figure('demographics.income_pie', version,
+                                       lambda: px.pie(income_dist, names='Income Group', values='Count'))
+        shared.plotly_chart(income_pie_fig)
+
+        # Income Distribution Table
+        st.markdown("<h3>Income Distribution by Group</h3>", unsafe_allow_html=True)
+        shared.table(income_dist, "income_dist")
+
+        # Income Distribution by Race (Bar Chart)
+        st.subheader("Income Distribution by Race")
+        income_by_race = incomes.income_by_race_frame()
+        race_income_bar_fig = shared.figure('demographics.race_income', version,
+                                            lambda: px.bar(income_by_race, x='Race', y='Average Income'))
+        shared.plotly_chart(race_income_bar_fig)
+
+        # Race with Income Percentages
+        st.markdown("<h3>Income Distribution by Race</h3>", unsafe_allow_html=True)
+        shared.table(income_by_race, "income_by_race")
+
+        # Cities with the Least Income Level
+        st.markdown("<h3>Cities with Least Average Income</h3>", unsafe_allow_html=True)
+        shared.table(incomes.lowest_income_cities_frame(), "lowest_income_cities")
+
+
+# Cross-filter patients by any combination of gender, age group, race, income bracket
+# and city. The filters resolve on precomputed bitmaps (healthx.cohort), and changing
+# one reruns only this fragment.
+@shared.fragment("Patient Demographics Analysis")
+def cohort_section():
+    st.subheader("Cohort Explorer")
+    index = shared.get_cohort_index()
+
+    filters = {}
+    for column, widget in zip(index.values, st.columns(len(index.values))):
+        with widget:
+            filters[column] = st.multiselect(cohort.DIMENSIONS[column], index.values[column], key=f"cohort_{column}")
+    summary = index.summary(filters)
+    tracing.annotate(cohort_filters=len(summary.filters))
+
+    # KPI Layout
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Patients", f"{summary.patients:,}", f"{summary.share:.1%} of all", delta_color="off")
+
+    with col2:
+        st.metric("Encounters", f"{summary.encounters:,}")
+
+    with col3:
+        st.metric("Mean Age", f"{summary.mean_age:.1f} years" if summary.patients else "–")
+
+    with col4:
+        st.metric("Mean Income", f"${summary.mean_income:,.0f}" if summary.patients else "–")
+
+    by = st.selectbox("Break down by", list(summary.breakdowns), key="cohort_breakdown")
+    breakdown = summary.breakdowns[by]
+    shared.plotly_chart(payload.compact(px.bar(breakdown, x=by, y='Patients', title=f"Cohort Patients by {by}")),
+                        key="cohort_fig")
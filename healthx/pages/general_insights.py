@@ -0,0 +1,97 @@
+import streamlit as st
+
+from healthx import compare, tracing
+from healthx.figures import CITY_FIGURES
+from healthx.pages import shared
+
+
+def load():
+    return shared.get_query_backend()
+
+
+def city_figure(key, city_summary):
+    with tracing.span('figure_build', figure=key, rows=len(city_summary.yearly)):
+        return CITY_FIGURES[key](city_summary)
+
+
+def city_figures(city_summary):
+    return {key: city_figure(key, city_summary) for key in CITY_FIGURES}
+
+
+def render():
+    st.title("📊 General Healthcare Overview")
+    
+    # Per-city KPIs and yearly series come from the query backend: a lookup in the city x
+    # year cube (pandas) or a city-filtered scan of the Parquet cache (duckdb)
+    backend = load()
+    city_section(backend)
+
+
+# Everything below the title depends only on the selected city, so changing it reruns
+# just this fragment. Each figure is memoized per (city, data version).
+@shared.fragment("General Insights")
+def city_section(backend):
+    # City filter above KPIs, only for General Insights and Predictive Insights
+    city_list = backend.cities()
+    if shared.view_mode("general_insights_mode") == "Compare cities":
+        return compare_section(backend, city_list)
+    selected_city = st.selectbox("Select a City", city_list, key="general_insights_city",  # Selecting the city here
+                                 on_change=shared.record_city_selection, args=("general_insights_city",))
+    tracing.annotate(city=selected_city)
+    with tracing.span('city_filter', backend=backend.name):
+        city_summary = backend.city_summary(selected_city)
+
+    # KPI Layout (using st.columns for separate boxes)
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("Total Encounters", city_summary.total_encounters)
+    
+    with col2:
+        st.metric("Average Healthcare Coverage", f"{city_summary.avg_coverage:.2f}")
+    
+    with col3:
+        st.metric("Adherence Rate", f"{city_summary.adherence_rate:.2f}")
+    
+    with col4:
+        st.metric("Avg Diagnosis to Treatment Time", f"{city_summary.avg_diagnosis_to_treatment:.2f} hours")
+    timestamp_caption()
+
+    # Graph Layout
+    version = (backend.name,) + shared.figure_version()
+    for key in CITY_FIGURES:
+        figure = shared.figure(f'general_insights.{key}', (selected_city, version), lambda key=key: city_figure(key, city_summary))
+        shared.plotly_chart(figure, key=key, use_container_width=True)
+
+
+def timestamp_caption():
+    # Encounters whose timestamps were missing or could not be parsed (all cities) are left
+    # out of the timing KPI and, without START_x, of the yearly charts
+    quality = shared.get_timestamp_quality() or {}
+    parts = [f"{counts['invalid']:,} invalid and {counts['missing']:,} missing {column}"
+             for column, counts in quality.items() if counts['invalid'] or counts['missing']]
+    if parts:
+        st.caption(f"Timestamp quality: {'; '.join(parts)} values across all encounters.")
+
+
+def compare_section(backend, city_list):
+    # KPIs and yearly series of every selected city from one grouped query
+    cities = shared.select_cities("general_insights_compare", city_list)
+    if cities == []:
+        st.info("Select at least one city to compare.")
+        return
+    tracing.annotate(cities=len(cities or city_list))
+    kpis, yearly = shared.city_comparison(backend, cities)
+    shown = kpis['City'].tolist()
+
+    # Ranked KPI table
+    by = st.selectbox("Rank by", list(compare.KPIS), format_func=compare.KPIS.get, key="general_insights_rank")
+    shared.table(compare.ranked(kpis, by), "compare_ranked", hide_index=True, use_container_width=True)
+    timestamp_caption()
+
+    # Yearly series overlaid per city (small multiples for many cities)
+    key = (tuple(shown), (backend.name,) + shared.figure_version())
+    for column in compare.YEARLY_CHARTS:
+        figure = shared.figure(f'general_insights.compare.{column}', key,
+                               lambda column=column: compare.yearly_figure(yearly, column, shown))
+        shared.plotly_chart(figure, key=f"compare_{column}", use_container_width=True)
@@ -0,0 +1,19 @@
+import streamlit as st
+
+
+def load():
+    # Home has no data to load
+    return None
+
+
+def render():
+    # Main Page Content (Title and Tagline for Home)
+    st.markdown(
+        """
+        <h1 style="font-size: 250px; text-align: center; font-weight: bold;">
+            HealthX
+        </h1>
+        <p style="font-size: 28px; text-align: center;">
+            Transforming complex healthcare data into actionable strategies to improve access, affordability, and availability for all communities.
+        </p>
+        """, unsafe_allow_html=True)
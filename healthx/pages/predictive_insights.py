@@ -0,0 +1,176 @@
+import functools
+
+import plotly.express as px
+import streamlit as st
+
+from healthx import compare, forecast, payload, scenarios, tracing
+from healthx.pages import shared
+
+
+def load():
+    return shared.get_query_backend(), shared.get_population()
+
+
+def render():
+    st.header("📈 Predictive Analytics")
+    st.write("""
+        This section will show forecast trends for healthcare metrics, including population, claim costs, encounters, and providers.
+    """)
+    
+    # Per-city yearly series come from the same query backend as General Insights
+    backend, population_df = load()
+    city_forecasts(backend, population_df)
+
+
+# The forecasts depend only on the selected city, so changing it reruns just this
+# fragment. Each figure is memoized per (city, metric, input series, stored fit).
+@shared.fragment("Predictive Insights")
+def city_forecasts(backend, population_df):
+    # City filter above KPIs, only for General Insights and Predictive Insights
+    city_list = backend.cities()
+    mode = shared.view_mode("predictive_insights_mode", ("Single city", "Compare cities", "Scenarios"))
+    if mode == "Compare cities":
+        return compare_forecasts(backend, population_df, city_list)
+    if mode == "Scenarios":
+        return scenario_section(backend, population_df, city_list)
+    selected_city = st.selectbox("Select a City", city_list, key="predictive_insights_city",  # Selecting the city here
+                                 on_change=shared.record_city_selection, args=("predictive_insights_city",))
+    tracing.annotate(city=selected_city)
+
+    # **Forecasting**
+    # ARIMA forecasts for the next 5 years of Population, Claim Cost, Encounters, Providers and
+    # Healthcare Expenses. Forecasts are read from the forecast store (filled by
+    # `python -m healthx.forecast_batch`); a series is only fitted live when it is missing or changed.
+    store = shared.get_forecast_store()
+    with tracing.span('city_filter', backend=backend.name):
+        city_summary = backend.city_summary(selected_city)
+        series_by_metric = {metric: forecast.metric_series(metric, selected_city, city_summary, population_df)
+                            for metric in forecast.METRICS}
+    # All five series are fitted together on the shared process pool (stored forecasts are reused)
+    with tracing.span('arima_fit', series=len(series_by_metric)):
+        results, failures = store.get_or_fit_many(
+            [(selected_city, metric, series) for metric, series in series_by_metric.items() if len(series) > 2],
+            executor=shared.get_forecast_executor())
+    for failure in failures:
+        st.warning(f"Could not forecast {failure.metric.replace('_', ' ')} for {selected_city}: {failure.error}")
+
+    for metric, series in series_by_metric.items():
+        if len(series) < 3:
+            st.info(f"Not enough {metric.replace('_', ' ')} history for {selected_city} to forecast.")
+            continue
+        if (selected_city, metric) not in results:
+            continue
+        result = results[(selected_city, metric)]
+        metric_fig = shared.figure(f'predictive_insights.{metric}',
+                                   (selected_city, result['series_hash'], result.get('fitted_at')),
+                                   functools.partial(_forecast_figure, metric, selected_city, series, result))
+        shared.plotly_chart(metric_fig, key=f"{metric}_fig", use_container_width=True)
+
+
+def _forecast_figure(metric, city, series, result):
+    with tracing.span('figure_build', metric=metric):
+        return forecast.forecast_figure(metric, city, series, result)
+
+
+def compare_forecasts(backend, population_df, city_list):
+    # One metric forecast for every selected city: the series come from one grouped query
+    # and the forecasts the store does not have yet are fitted in one batched job
+    cities = shared.select_cities("predictive_insights_compare", city_list)
+    if cities == []:
+        st.info("Select at least one city to compare.")
+        return
+    metric = st.selectbox("Metric", list(forecast.METRICS), format_func=lambda metric: forecast.METRICS[metric]['title'],
+                          key="predictive_insights_metric")
+    tracing.annotate(cities=len(cities or city_list), metric=metric)
+    _, yearly = shared.city_comparison(backend, cities)
+    series_by_city = compare.metric_series(metric, yearly, population_df, cities or city_list)
+    results, failures = compare.forecast_many(shared.get_forecast_store(), metric, series_by_city)
+    for failure in failures:
+        st.warning(f"Could not forecast {metric.replace('_', ' ')} for {failure.city}: {failure.error}")
+    short = sorted(city for city, series in series_by_city.items() if len(series) < 3)
+    if short:
+        st.info(f"Not enough {metric.replace('_', ' ')} history to forecast: {', '.join(short)}.")
+    if not results:
+        return
+
+    fits = tuple((city, result['series_hash'], result.get('fitted_at')) for city, result in results.items())
+    figure = shared.figure(f'predictive_insights.compare.{metric}', fits,
+                           lambda: compare.forecast_figure(metric, series_by_city, results))
+    shared.plotly_chart(figure, key=f"compare_{metric}_fig", use_container_width=True)
+    shared.table(compare.forecast_growth(series_by_city, results), "compare_growth", hide_index=True,
+                 use_container_width=True, column_config={'Growth': st.column_config.NumberColumn(format='percent')})
+
+
+# What-if shocks on simulated forecast paths: bands and exceedance probabilities per city
+SCENARIO_METRICS = ['population', 'claim_cost', 'expenses', 'encounters', 'providers']
+
+
+def scenario_section(backend, population_df, city_list):
+    cities = shared.select_cities("scenario_cities", city_list)
+    if cities == []:
+        st.info("Select at least one city.")
+        return
+    metric = st.selectbox("Metric", SCENARIO_METRICS, format_func=lambda metric: forecast.METRICS[metric]['title'],
+                          key="scenario_metric")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        growth = st.slider("Extra annual growth (%)", -10.0, 10.0, 0.0, 0.5, key="scenario_growth")
+    with col2:
+        level = st.slider("One-off change in 2025 (%)", -30.0, 30.0, 0.0, 1.0, key="scenario_level")
+    with col3:
+        volatility = st.slider("Volatility multiplier", 0.5, 3.0, 1.0, 0.1, key="scenario_volatility")
+    with col4:
+        threshold = st.slider("Threshold: growth over last actual (%)", 0, 100, 10, 5, key="scenario_threshold")
+    paths = st.select_slider("Simulated paths per city", [1_000, 10_000, 50_000], value=scenarios.PATHS,
+                             key="scenario_paths")
+    tracing.annotate(cities=len(cities or city_list), metric=metric, paths=paths)
+
+    # Inputs: series from one grouped query, fitted parameters from the forecast store
+    _, yearly = shared.city_comparison(backend, cities)
+    series_by_city = compare.metric_series(metric, yearly, population_df, cities or city_list)
+    results, failures = compare.forecast_many(shared.get_forecast_store(), metric, series_by_city)
+    for failure in failures:
+        st.warning(f"Could not forecast {metric.replace('_', ' ')} for {failure.city}: {failure.error}")
+    inputs = scenarios.model_inputs(series_by_city, results)
+    if inputs is None:
+        st.info(f"Not enough {metric.replace('_', ' ')} history to simulate.")
+        return
+
+    shock = scenarios.Shock(growth=growth / 100, level=level / 100, volatility=volatility)
+    levels = scenarios.simulate(inputs, paths=paths, shock=shock)
+    bands = scenarios.bands(inputs, levels)
+    odds = scenarios.exceedance(inputs, levels, inputs.last * (1 + threshold / 100))
+    del levels
+
+    focus = st.selectbox("City", inputs.cities, key="scenario_focus")
+    fan_fig = _fan_chart(metric, focus, series_by_city[focus], bands[bands['City'] == focus])
+    shared.plotly_chart(payload.compact(fan_fig), key="scenario_fan", use_container_width=True)
+
+    final = f'P(exceed in {inputs.years[-1]})'
+    odds = odds.sort_values([final, 'City'], ascending=[False, True], kind='stable')
+    odds_fig = px.bar(odds, x='City', y=final, range_y=[0, 1],
+                      title=f"Chance of more than {threshold}% above the last actual value by {inputs.years[-1]}")
+    shared.plotly_chart(payload.compact(odds_fig), key="scenario_exceedance", use_container_width=True)
+    last_year = bands[bands['Year'] == inputs.years[-1]].drop(columns='Year')
+    shared.table(odds.merge(last_year, on='City'), "scenario_odds", hide_index=True, use_container_width=True,
+                 column_config={column: st.column_config.NumberColumn(format='percent')
+                                for column in (final, 'P(exceed in any year)')})
+
+
+def _fan_chart(metric, city, series, bands):
+    import plotly.graph_objs as go
+
+    labels = forecast.METRICS[metric]
+    years = bands['Year'].tolist()
+    figure = go.Figure()
+    figure.add_trace(go.Scatter(x=series.index, y=series.values, mode='lines', name=labels['actual'],
+                                line=dict(color='white')))
+    for low, high, opacity, name in (('P5', 'P95', 0.2, '90% band'), ('P25', 'P75', 0.35, '50% band')):
+        figure.add_trace(go.Scatter(x=years + years[::-1], y=bands[high].tolist() + bands[low].tolist()[::-1],
+                                    fill='toself', fillcolor=f'rgba(255, 0, 0, {opacity})', line=dict(width=0),
+                                    hoverinfo='skip', name=name))
+    figure.add_trace(go.Scatter(x=years, y=bands['P50'], mode='markers+lines', name='Median scenario',
+                                marker=dict(color='red', symbol='circle')))
+    figure.update_layout(title=f"{city} - {labels['title']} scenarios ({years[0]}–{years[-1]})",
+                         xaxis={'title': 'Year'}, yaxis={'title': labels['yaxis']}, hovermode='closest')
+    return figure
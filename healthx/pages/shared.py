@@ -0,0 +1,248 @@
+# Process-wide cached data shared by the page modules. healthx modules are imported
+# inside the loaders so a page only pays for the data it asks for.
+
+import functools
+import os
+
+import streamlit as st
+
+from healthx import tracing
+
+
+def fragments_enabled():
+    # HEALTHX_FRAGMENTS=0 falls back to full-script reruns without figure memoization
+    return os.environ.get('HEALTHX_FRAGMENTS', '1') != '0'
+
+
+def fragment(page):
+    # st.fragment for a page section: a widget inside it reruns only that section. A
+    # fragment-only rerun does not go through dashboard.py, so it opens its own trace and
+    # counts as interactive for the cache warmer; inside a full rerun it is one span.
+    def decorate(function):
+        @functools.wraps(function)
+        def run(*args, **kwargs):
+            if tracing.current_trace() is not None:
+                with tracing.span('fragment', fragment=function.__name__):
+                    return function(*args, **kwargs)
+            from healthx import warmer
+            with warmer.interactive(), tracing.trace(page=page, fragment=function.__name__), \
+                    tracing.span('fragment', fragment=function.__name__):
+                return function(*args, **kwargs)
+        return st.fragment(run) if fragments_enabled() else run
+    return decorate
+
+
+# Memoized page values (mostly built Plotly figures), one per (name, key). The key holds
+# everything the value depends on, e.g. (city, metric, data version), so a rerun only
+# rebuilds what a changed input affects. Values are shared by all sessions: read-only.
+@st.cache_resource(max_entries=2048, show_spinner=False)
+def _memoized(name, key, _build):
+    return _build()
+
+
+def memoize(name, key, build):
+    if not fragments_enabled():
+        return build()
+    return _memoized(name, key, build)
+
+
+def figure(name, key, build):
+    # Memoized Plotly figure, compacted once for the browser (healthx.payload)
+    from healthx import payload
+    return memoize(name, key, lambda: payload.compact(build()))
+
+
+def figure_version():
+    # Version of the data behind the city figures: the executive summary plus appended deltas
+    from healthx import incremental, ingest
+    return ingest.data_version(['executive_summary']), incremental.deltas_version()
+
+
+# Shared data context: loaded and preprocessed once per server process and shared by all
+# sessions. It is rebuilt when a source CSV changes or the AGE refresh interval rolls over.
+@st.cache_resource(max_entries=1, show_spinner="Loading HealthX data...")
+def _data_context(data_version, as_of):
+    from healthx import context
+    return context.build_data_context(as_of=as_of, data_version=data_version)
+
+
+# With HEALTHX_SHARED_TABLES=1 the context is memory-mapped from the generation a loader
+# process published (healthx.shared_tables), so server processes share one copy
+@st.cache_resource(max_entries=1, show_spinner="Mapping HealthX data...")
+def _shared_context(manifest, directory):
+    from healthx import shared_tables
+    return shared_tables.load_context(manifest, directory)
+
+
+def get_data_context():
+    from healthx import context, ingest, shared_tables
+    if shared_tables.enabled():
+        manifest = shared_tables.read_manifest()
+        if manifest is not None:
+            return _shared_context(manifest, shared_tables.shared_dir())
+    return _data_context(ingest.data_version(), context.refresh_stamp())
+
+
+# Income analytics, computed once per patients data version and shared read-only
+@st.cache_resource(max_entries=1)
+def _income_analytics(data_version):
+    from healthx import income
+    return income.build_income_analytics(get_data_context().patients)
+
+
+def get_income_analytics():
+    from healthx import ingest
+    return _income_analytics(ingest.data_version(['patients']))
+
+
+# Cohort bitmaps over the context's patients (healthx.cohort), rebuilt with the context
+@st.cache_resource(max_entries=1, show_spinner="Indexing patient cohorts...")
+def _cohort_index(data_version, as_of):
+    from healthx import cohort
+    return cohort.build_cohort_index(get_data_context())
+
+
+def get_cohort_index():
+    ctx = get_data_context()
+    return _cohort_index(ctx.data_version, ctx.as_of)
+
+
+# City x year aggregate cube for General Insights, rebuilt when the executive summary
+# changes and updated incrementally when delta files are appended (healthx.incremental)
+@st.cache_resource(max_entries=1, show_spinner="Building city aggregates...")
+def _city_cube(data_version, deltas_version):
+    from healthx import incremental
+    return incremental.load_city_cube()
+
+
+def get_city_cube():
+    from healthx import incremental, ingest
+    return _city_cube(ingest.data_version(['executive_summary']), incremental.deltas_version())
+
+
+# Timestamp quality of the executive summary (healthx.derived), read once per data
+# version from the cache file and published as gauges in the metrics export
+@st.cache_resource(max_entries=1)
+def _timestamp_quality(data_version):
+    from healthx import derived
+    quality = derived.load_quality()
+    derived.publish_quality(quality)
+    return quality
+
+
+def get_timestamp_quality():
+    from healthx import ingest
+    return _timestamp_quality(ingest.data_version(['executive_summary']))
+
+
+# Query backend for the aggregations (HEALTHX_QUERY_BACKEND: pandas or duckdb). The pandas
+# backend answers from the cached data context and city cube above.
+@st.cache_resource(max_entries=2)
+def _query_backend(name, data_version, as_of):
+    from healthx import query
+    if name == 'pandas':
+        return query.PandasBackend(as_of=as_of, load_context=get_data_context, load_cube=get_city_cube)
+    return query.create_backend(name, as_of=as_of)
+
+
+def get_query_backend():
+    from healthx import context, ingest, query
+    return _query_backend(query.default_backend(), ingest.data_version(), context.refresh_stamp())
+
+
+# Provider accessibility engine: provider KD-tree and every patient's nearest-provider
+# distance, built once per patients / providers version (healthx.accessibility)
+@st.cache_resource(max_entries=1, show_spinner="Indexing provider locations...")
+def _accessibility_engine(data_version):
+    from healthx import accessibility
+    return accessibility.build_engine()
+
+
+def get_accessibility_engine():
+    from healthx import ingest
+    return _accessibility_engine(ingest.data_version(['patients', 'providers']))
+
+
+# Population data (2010-2023) on its own, so Predictive Insights does not need the full context
+@st.cache_resource(max_entries=1)
+def _population(data_version):
+    from healthx import ingest
+    return ingest.load_table('population')
+
+
+def get_population():
+    from healthx import ingest
+    return _population(ingest.data_version(['population']))
+
+
+# Stored ARIMA forecasts shared by all sessions
+@st.cache_resource
+def get_forecast_store():
+    from healthx import forecast_store
+    return forecast_store.ForecastStore()
+
+
+# Process pool for live forecast fits (size from HEALTHX_FORECAST_WORKERS)
+@st.cache_resource
+def get_forecast_executor():
+    from healthx import forecast_pool
+    return forecast_pool.ForecastExecutor()
+
+
+# City selection counts (healthx.warmer.UsageLog), persisted across restarts
+@st.cache_resource
+def get_usage_log():
+    from healthx import warmer
+    return warmer.UsageLog()
+
+
+def record_city_selection(key):
+    # on_change callback of the city selectboxes: count cities users actually pick
+    get_usage_log().record(st.session_state[key])
+
+
+def view_mode(key, modes=("Single city", "Compare cities")):
+    # View switch at the top of General and Predictive Insights
+    return st.radio("View", list(modes), horizontal=True, key=key)
+
+
+def select_cities(key, city_list):
+    # Cities for comparison mode, or None for every city
+    if st.checkbox("All cities", key=f"{key}_all"):
+        return None
+    return st.multiselect("Cities to compare", city_list, default=city_list[:3], key=key)
+
+
+def city_comparison(backend, cities):
+    # (kpis, yearly) for the selected cities from one grouped query, memoized per selection
+    key = (None if cities is None else tuple(sorted(cities)), (backend.name,) + figure_version())
+    return memoize('compare.city_comparison', key, lambda: backend.city_comparison(cities))
+
+
+# Background thread warming city summaries and forecasts in order of popularity, one per
+# server process; started from the first rerun (Streamlit has no server start hook)
+@st.cache_resource
+def get_cache_warmer():
+    from healthx import warmer
+    return warmer.CacheWarmer(get_query_backend, get_population, get_forecast_store, get_forecast_executor,
+                              usage_log=get_usage_log()).start()
+
+
+# st.plotly_chart serializes the figure to JSON; the span times that per chart
+def plotly_chart(figure, **kwargs):
+    with tracing.span('plotly_serialization', chart=kwargs.get('key')):
+        st.plotly_chart(figure, **kwargs)
+
+
+# st.dataframe for frames that can grow with the data: past one page only the rows of the
+# selected page are sent to the browser
+def table(frame, key, **kwargs):
+    from healthx import payload
+    if not payload.enabled() or len(frame) <= payload.PAGE_ROWS:
+        return st.dataframe(frame, **kwargs)
+    pages = payload.page_count(len(frame))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+    with tracing.span('table_page', table=key, rows=len(frame)):
+        st.dataframe(payload.page_slice(frame, page), **kwargs)
+    start = (page - 1) * payload.PAGE_ROWS
+    st.caption(f"Rows {start + 1:,}–{min(start + payload.PAGE_ROWS, len(frame)):,} of {len(frame):,}")
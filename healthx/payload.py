@@ -0,0 +1,121 @@
+# What the pages send to the browser: compact Plotly figures and paged tables.
+#
+# Most of a chart's JSON is its template, not its data: the Streamlit theme template has
+# defaults for ten trace types (contour, heatmap, table, ...), about 2 KB of every ~4 KB
+# spec whatever the chart draws. compact() keeps only the template entries for the trace
+# types a figure uses, downsamples line traces longer than MAX_POINTS with LTTB
+# (largest-triangle-three-buckets, which keeps the shape of the line where a plain stride
+# would skip over spikes) and draws traces that still have more than GL_POINTS points with WebGL
+# (scattergl). The pages build their figures through shared.figure(), which memoizes the
+# compacted figure per (page, city, data version), so this runs once per figure and not on
+# every rerun. page_slice() cuts large frames into pages of PAGE_ROWS rows, so
+# shared.table() ships only the page on screen instead of the whole frame.
+# HEALTHX_COMPACT=0 turns all of it off, for comparing payloads (benchmarks/payloads.py).
+
+import base64
+import os
+
+import numpy as np
+
+MAX_POINTS = int(os.environ.get('HEALTHX_MAX_POINTS', 2_000))
+GL_POINTS = 1_000
+PAGE_ROWS = int(os.environ.get('HEALTHX_PAGE_ROWS', 50))
+# Per-point arrays that are cut down together with x / y
+POINT_ARRAYS = ('x', 'y', 'text', 'hovertext', 'customdata')
+
+
+def enabled():
+    return os.environ.get('HEALTHX_COMPACT', '1') != '0'
+
+
+def lttb(x, y, threshold):
+    # Indices of the points kept by largest-triangle-three-buckets downsampling: the first
+    # and last point, and from each of threshold - 2 buckets the point forming the largest
+    # triangle with the previous kept point and the mean of the next bucket
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        mean_x, mean_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        area = np.abs((x[a] - mean_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (mean_y - y[a]))
+        # Gaps (NaN) never win a bucket unless the whole bucket is a gap
+        a = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        keep[bucket + 1] = a
+    return keep
+
+
+def _values(values):
+    # Trace array as numpy: plotly keeps numpy arrays as {'dtype', 'bdata'[, 'shape']}
+    if isinstance(values, dict) and 'bdata' in values:
+        array = np.frombuffer(base64.b64decode(values['bdata']), dtype=values['dtype'])
+        shape = values.get('shape')
+        if shape:
+            array = array.reshape([int(size) for size in str(shape).split(',')])
+        return array
+    return np.asarray(values)
+
+
+def _positions(x):
+    # x as numbers for LTTB: numbers and dates as they are, anything else by position
+    if x.dtype.kind in 'iuf':
+        return x
+    try:
+        return np.asarray(x, dtype='datetime64[ns]').astype(np.int64)
+    except (TypeError, ValueError):
+        return np.arange(len(x))
+
+
+def compact_trace(trace, max_points=MAX_POINTS, gl_points=GL_POINTS):
+    # Downsampled / WebGL copy of a scatter trace dict; other traces are returned as is
+    if trace.get('type', 'scatter') not in ('scatter', 'scattergl') or trace.get('fill') not in (None, 'none'):
+        return trace
+    if trace.get('x') is None or trace.get('y') is None:
+        return trace
+    trace = dict(trace)
+    y = _values(trace['y'])
+    n = len(y)
+    if n > max_points and 'lines' in trace.get('mode', 'lines'):
+        keep = lttb(_positions(_values(trace['x'])), y, max_points)
+        for name in POINT_ARRAYS:
+            if trace.get(name) is not None and not isinstance(trace[name], str):
+                values = _values(trace[name])
+                if len(values) == n:
+                    trace[name] = values[keep]
+        n = len(keep)
+    if n > gl_points:
+        trace['type'] = 'scattergl'
+    return trace
+
+
+def compact(figure, max_points=MAX_POINTS, gl_points=GL_POINTS):
+    # Compacted go.Figure for st.plotly_chart (figure may be a go.Figure or a figure dict)
+    import plotly.graph_objs as go
+
+    figure = figure if isinstance(figure, go.Figure) else go.Figure(figure)
+    if not enabled():
+        return figure
+    spec = figure.to_dict()
+    spec['data'] = [compact_trace(trace, max_points, gl_points) for trace in spec['data']]
+    template = spec.get('layout', {}).get('template')
+    if template and 'data' in template:
+        used = {trace.get('type', 'scatter') for trace in spec['data']}
+        template['data'] = {kind: value for kind, value in template['data'].items() if kind in used}
+    return go.Figure(spec)
+
+
+def page_count(rows, page_rows=PAGE_ROWS):
+    return max(1, -(-rows // page_rows))
+
+
+def page_slice(frame, page, page_rows=PAGE_ROWS):
+    # Rows of a 1-based page
+    start = (page - 1) * page_rows
+    return frame.iloc[start:start + page_rows]
@@ -0,0 +1,293 @@
+# Query backends for the dashboard aggregations.
+#
+# The aggregations the pages show (encounters by city, encounters by age group and
+# gender, the per-city KPIs and per-year groupbys on YEAR, the same for several cities
+# at once, average income by race or city) are answered by a backend:
+#
+#   pandas  -> eager frames: the shared data context and the city x year cube
+#   duckdb  -> SQL over the Parquet cache files, scanned lazily; city queries filter
+#              on CITY_x inside the scan, so only matching row groups are read, and
+#              DuckDB spills to disk past its memory limit (HEALTHX_DUCKDB_MEMORY_LIMIT)
+#
+# HEALTHX_QUERY_BACKEND picks the backend the dashboard uses (pandas by default).
+# Both return the same frames: same columns, rows in the same order. check_parity()
+# compares two backends query by query.
+
+import functools
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from healthx import config, context, cube, ingest, tracing
+
+BACKENDS = ('pandas', 'duckdb')
+INCOME_COLUMNS = {'RACE': 'Race', 'CITY': 'City'}
+# Float results are compared with this relative tolerance: the source columns are float32
+# and the engines sum them in a different order
+PARITY_RTOL = 1e-6
+
+
+def default_backend():
+    return os.environ.get('HEALTHX_QUERY_BACKEND', 'pandas')
+
+
+def create_backend(name=None, as_of=None, **kwargs):
+    name = name or default_backend()
+    if name == 'pandas':
+        return PandasBackend(as_of=as_of, **kwargs)
+    if name == 'duckdb':
+        return DuckDBBackend(as_of=as_of, **kwargs)
+    raise ValueError(f'Unknown query backend {name!r}; expected one of {", ".join(BACKENDS)}')
+
+
+def _sort_gender_age(counts):
+    # Age groups in bin order, then gender
+    order = {label: position for position, label in enumerate(context.AGE_LABELS)}
+    counts = counts.assign(_order=counts['Age Group'].astype(str).map(order))
+    counts = counts.sort_values(['_order', 'GENDER'], kind='stable').drop(columns='_order')
+    counts['Age Group'] = pd.Categorical(counts['Age Group'].astype(str), categories=context.AGE_LABELS)
+    counts['GENDER'] = counts['GENDER'].astype(str)
+    counts['Encounter Count'] = counts['Encounter Count'].astype('int64')
+    return counts.reset_index(drop=True)
+
+
+def _sort_counts(counts, label, value):
+    # Largest first, ties by label
+    counts[label] = counts[label].astype(str)
+    counts[value] = counts[value].astype('int64')
+    return counts.sort_values([value, label], ascending=[False, True], kind='stable').reset_index(drop=True)
+
+
+class PandasBackend:
+    # Answers from in-memory frames. load_context / load_cube return the shared
+    # DataContext and city cube (the dashboard passes its cached loaders); by default
+    # they are built from the Parquet cache on first use.
+    name = 'pandas'
+
+    def __init__(self, as_of=None, load_context=None, load_cube=None):
+        self.as_of = context.refresh_stamp() if as_of is None else pd.Timestamp(as_of)
+        self._load_context = load_context or functools.partial(context.build_data_context, as_of=self.as_of)
+        self._load_cube = load_cube or (lambda: cube.build_city_cube(ingest.load_table('executive_summary')))
+
+    @functools.cached_property
+    def _context(self):
+        return self._load_context()
+
+    @functools.cached_property
+    def _cube(self):
+        return self._load_cube()
+
+    def cities(self):
+        return sorted(self._cube)
+
+    def city_summary(self, city):
+        return self._cube[city]
+
+    def city_comparison(self, cities=None):
+        # The cube already holds every city from one grouped pass; None = all cities
+        with tracing.span('groupby', detail='city_comparison', backend=self.name):
+            return cube.comparison_frames([self._cube[city] for city in (cities or self._cube) if city in self._cube])
+
+    def encounters_by_city(self):
+        counts = self._context.encounter_facts['CITY'].value_counts().reset_index()
+        counts.columns = ['City', 'Encounter Count']
+        return _sort_counts(counts, 'City', 'Encounter Count')
+
+    def gender_age_counts(self):
+        counts = self._context.encounter_facts.groupby(['Age Group', 'GENDER'], observed=False).size()
+        return _sort_gender_age(counts.reset_index(name='Encounter Count'))
+
+    def income_by(self, column):
+        income = self._context.patients.groupby(column, observed=True)['INCOME'].mean().reset_index()
+        income.columns = [INCOME_COLUMNS[column], 'Average Income']
+        income[INCOME_COLUMNS[column]] = income[INCOME_COLUMNS[column]].astype(str)
+        return income.sort_values(INCOME_COLUMNS[column], kind='stable').reset_index(drop=True)
+
+
+class DuckDBBackend:
+    # Answers with SQL over the Parquet cache files; nothing is loaded up front.
+    # Years and diagnosis-to-treatment hours are read from the derived columns stored
+    # with the cache (healthx/derived.py) instead of being computed from the timestamps.
+    name = 'duckdb'
+
+    def __init__(self, as_of=None, memory_limit=None, threads=None):
+        import duckdb
+
+        self.as_of = context.refresh_stamp() if as_of is None else pd.Timestamp(as_of)
+        settings = {'temp_directory': os.path.join(config.CACHE_DIR, 'duckdb-tmp')}
+        memory_limit = memory_limit or os.environ.get('HEALTHX_DUCKDB_MEMORY_LIMIT')
+        if memory_limit:
+            settings['memory_limit'] = memory_limit
+        if threads:
+            settings['threads'] = threads
+        self._connection = duckdb.connect(config=settings)
+        self._lock = threading.Lock()
+        self._paths = {}
+        # Per-city summaries are small; keep the most recently used ones
+        self.city_summary = functools.lru_cache(maxsize=256)(self._city_summary)
+
+    def _path(self, table):
+        if table not in self._paths:
+            self._paths[table] = ingest.ensure_cache(table)
+        return self._paths[table]
+
+    def _query(self, sql, parameters=()):
+        # One cursor per query; DuckDB cursors can be used from any Streamlit session thread
+        with self._lock:
+            cursor = self._connection.cursor()
+        try:
+            return cursor.execute(sql, list(parameters)).df()
+        finally:
+            cursor.close()
+
+    def _patients_sql(self):
+        # Patients with AGE and Age Group as of self.as_of, matching context.age_group
+        as_of = self.as_of.strftime('%Y-%m-%d %H:%M:%S.%f')
+        cases = ' '.join(f"WHEN age >= {low} AND age < {high} THEN '{label}'"
+                         for low, high, label in zip(context.AGE_BINS, context.AGE_BINS[1:], context.AGE_LABELS))
+        return f'''
+            SELECT *, CASE {cases} END AS age_group FROM (
+                SELECT Id, GENDER, CITY,
+                       floor(floor(date_diff('microsecond', BIRTHDATE, TIMESTAMP '{as_of}') / 86400e6) / 365) AS age
+                FROM read_parquet('{self._path('patients')}'))'''
+
+    def cities(self):
+        frame = self._query(f"SELECT DISTINCT CAST(CITY_x AS VARCHAR) AS city FROM read_parquet('{self._path('executive_summary')}') "
+                            'WHERE CITY_x IS NOT NULL ORDER BY city')
+        return frame['city'].tolist()
+
+    def _city_summary(self, city):
+        source = f"read_parquet('{self._path('executive_summary')}')"
+        with tracing.span('groupby', detail='city_summary', backend=self.name):
+            kpis = self._query(f'''
+                SELECT count(*) AS total_encounters,
+                       avg(PAYER_COVERAGE_x) AS avg_coverage,
+                       sum(DISPENSES) AS dispenses,
+                       sum(ENCOUNTERS) AS encounters,
+                       avg(DIAGNOSIS_TO_TREATMENT) AS avg_diagnosis_to_treatment
+                FROM {source} WHERE CITY_x = ?''', [city]).iloc[0]
+            yearly = self._query(f'''
+                SELECT YEAR,
+                       count(Id_x) AS NUM_ENCOUNTERS,
+                       count(DISTINCT PROVIDER) AS PROVIDER,
+                       count(DISTINCT PATIENT) AS PATIENT,
+                       coalesce(sum(TOTAL_CLAIM_COST), 0) AS TOTAL_CLAIM_COST,
+                       coalesce(sum(HEALTHCARE_EXPENSES), 0) AS HEALTHCARE_EXPENSES
+                FROM {source} WHERE CITY_x = ? AND YEAR IS NOT NULL
+                GROUP BY 1 ORDER BY 1''', [city])
+            counts = {}
+            for column, label in (('ENCOUNTERCLASS', 'Category'), ('CATEGORY', 'Medication')):
+                counts[column] = self._query(f'''
+                    SELECT CAST({column} AS VARCHAR) AS "{label}", count(*) AS "Count"
+                    FROM {source} WHERE CITY_x = ? AND {column} IS NOT NULL
+                    GROUP BY 1 ORDER BY 2 DESC, 1''', [city])
+        yearly = yearly.astype({'YEAR': int})
+        with np.errstate(divide='ignore', invalid='ignore'):
+            yearly['RATIO'] = yearly['PROVIDER'] / yearly['PATIENT']
+        dispenses, encounters = kpis['dispenses'], kpis['encounters']
+        return cube.CitySummary(
+            city=city,
+            total_encounters=int(kpis['total_encounters']),
+            avg_coverage=float(kpis['avg_coverage']),
+            adherence_rate=float(dispenses / encounters) if encounters and encounters > 0 else 0,
+            avg_diagnosis_to_treatment=float(kpis['avg_diagnosis_to_treatment']),
+            yearly=yearly,
+            encounter_classes=counts['ENCOUNTERCLASS'],
+            medications=counts['CATEGORY'],
+        )
+
+    def city_comparison(self, cities=None):
+        # KPIs and yearly series of several cities (None = all) in two grouped scans,
+        # however many cities are selected
+        source = f"read_parquet('{self._path('executive_summary')}')"
+        where, parameters = ('list_contains(?, CAST(CITY_x AS VARCHAR))', [list(cities)]) if cities else ('TRUE', [])
+        with tracing.span('groupby', detail='city_comparison', backend=self.name):
+            kpis = self._query(f'''
+                SELECT CAST(CITY_x AS VARCHAR) AS "City",
+                       count(*) AS total_encounters,
+                       avg(PAYER_COVERAGE_x) AS avg_coverage,
+                       CASE WHEN sum(ENCOUNTERS) > 0 THEN sum(DISPENSES) / sum(ENCOUNTERS) ELSE 0 END AS adherence_rate,
+                       avg(DIAGNOSIS_TO_TREATMENT) AS avg_diagnosis_to_treatment
+                FROM {source} WHERE CITY_x IS NOT NULL AND {where}
+                GROUP BY 1 ORDER BY 1''', parameters)
+            yearly = self._query(f'''
+                SELECT CAST(CITY_x AS VARCHAR) AS "City", YEAR,
+                       count(Id_x) AS NUM_ENCOUNTERS,
+                       count(DISTINCT PROVIDER) AS PROVIDER,
+                       count(DISTINCT PATIENT) AS PATIENT,
+                       coalesce(sum(TOTAL_CLAIM_COST), 0) AS TOTAL_CLAIM_COST,
+                       coalesce(sum(HEALTHCARE_EXPENSES), 0) AS HEALTHCARE_EXPENSES
+                FROM {source} WHERE CITY_x IS NOT NULL AND YEAR IS NOT NULL AND {where}
+                GROUP BY 1, 2 ORDER BY 1, 2''', parameters)
+        kpis = kpis.astype({'total_encounters': 'int64', 'adherence_rate': float})
+        yearly = yearly.astype({'YEAR': 'int64'})
+        with np.errstate(divide='ignore', invalid='ignore'):
+            yearly['RATIO'] = yearly['PROVIDER'] / yearly['PATIENT']
+        return kpis, yearly
+
+    def encounters_by_city(self):
+        with tracing.span('groupby', detail='encounters_by_city', backend=self.name):
+            counts = self._query(f'''
+                SELECT CAST(p.CITY AS VARCHAR) AS "City", count(*) AS "Encounter Count"
+                FROM read_parquet('{self._path('encounters')}') e
+                JOIN ({self._patients_sql()}) p ON e.PATIENT = p.Id
+                WHERE p.CITY IS NOT NULL
+                GROUP BY 1 ORDER BY 2 DESC, 1''')
+        return _sort_counts(counts, 'City', 'Encounter Count')
+
+    def gender_age_counts(self):
+        labels = ', '.join(f"('{label}')" for label in context.AGE_LABELS)
+        with tracing.span('groupby', detail='gender_age_counts', backend=self.name):
+            counts = self._query(f'''
+                WITH p AS ({self._patients_sql()}),
+                counts AS (
+                    SELECT p.age_group, CAST(p.GENDER AS VARCHAR) AS gender, count(*) AS n
+                    FROM read_parquet('{self._path('encounters')}') e JOIN p ON e.PATIENT = p.Id
+                    WHERE p.age_group IS NOT NULL AND p.GENDER IS NOT NULL
+                    GROUP BY 1, 2)
+                SELECT g.label AS "Age Group", s.gender AS "GENDER", coalesce(c.n, 0) AS "Encounter Count"
+                FROM (VALUES {labels}) g(label)
+                CROSS JOIN (SELECT DISTINCT CAST(GENDER AS VARCHAR) AS gender FROM p WHERE GENDER IS NOT NULL) s
+                LEFT JOIN counts c ON c.age_group = g.label AND c.gender = s.gender''')
+        return _sort_gender_age(counts)
+
+    def income_by(self, column):
+        label = INCOME_COLUMNS[column]
+        with tracing.span('groupby', detail=f'income_by_{column.lower()}', backend=self.name):
+            return self._query(f'''
+                SELECT CAST({column} AS VARCHAR) AS "{label}", avg(INCOME) AS "Average Income"
+                FROM read_parquet('{self._path('patients')}') WHERE {column} IS NOT NULL
+                GROUP BY 1 ORDER BY 1''')
+
+
+def _compare(name, left, right, found):
+    try:
+        pd.testing.assert_frame_equal(left.reset_index(drop=True), right.reset_index(drop=True),
+                                      check_dtype=False, check_categorical=False, rtol=PARITY_RTOL)
+    except AssertionError as error:
+        found.append(f'{name}: {str(error).splitlines()[0]}')
+
+
+def check_parity(left, right, cities=None):
+    # Run every query on both backends; returns a list of mismatch messages (empty = identical)
+    found = []
+    if left.cities() != right.cities():
+        found.append('cities: city lists differ')
+    _compare('encounters_by_city', left.encounters_by_city(), right.encounters_by_city(), found)
+    _compare('gender_age_counts', left.gender_age_counts(), right.gender_age_counts(), found)
+    for column in INCOME_COLUMNS:
+        _compare(f'income_by {column}', left.income_by(column), right.income_by(column), found)
+    for city in cities or left.cities():
+        a, b = left.city_summary(city), right.city_summary(city)
+        for field in ('total_encounters', 'avg_coverage', 'adherence_rate', 'avg_diagnosis_to_treatment'):
+            if not np.isclose(getattr(a, field), getattr(b, field), rtol=PARITY_RTOL, equal_nan=True):
+                found.append(f'{city} {field}: {getattr(a, field)} != {getattr(b, field)}')
+        for field in ('yearly', 'encounter_classes', 'medications'):
+            _compare(f'{city} {field}', getattr(a, field), getattr(b, field), found)
+    for selection in [None] + ([list(cities)] if cities else []):
+        label = 'all cities' if selection is None else f'{len(selection)} cities'
+        for name, a, b in zip(('kpis', 'yearly'), left.city_comparison(selection), right.city_comparison(selection)):
+            _compare(f'city_comparison {name} ({label})', a, b, found)
+    return found
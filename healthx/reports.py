@@ -0,0 +1,308 @@
+# Headless batch reports: one static HTML page per city with the General Insights KPIs
+# and six charts plus the five Predictive Insights forecasts, and an index of all cities.
+#
+#   python -m healthx.reports --out reports             # every city, resuming a partial run
+#   python -m healthx.reports --out reports --city Boston --force
+#   python -m healthx.reports --out reports --workers 4 --self-contained
+#
+# The numbers come from the same code as the dashboard: the city cube (base file plus
+# deltas), forecast.metric_series and the forecast store, and the charts are the page
+# figures (healthx.figures, forecast.forecast_figure). Cities are spread over a process
+# pool; each worker fits the forecasts the store does not have yet and writes its city's
+# page. As each city finishes, the parent stores the new fits, records the city in
+# reports.json and rewrites index.html, so an interrupted run leaves finished pages and a
+# usable index behind. A rerun skips every city whose inputs (KPIs, charts data and
+# forecast series) are unchanged since its page was written and none of whose forecasts
+# failed. By default the pages share one plotly.min.js next to them; --self-contained
+# inlines it into every page instead.
+
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import pandas as pd
+
+from healthx import forecast, incremental, ingest
+from healthx.forecast_pool import DEFAULT_TASK_TIMEOUT, DEFAULT_WORKERS, ForecastExecutor, ForecastTask
+from healthx.forecast_store import ForecastStore
+
+# Bump when the page layout changes so resumed runs rewrite every page
+REPORT_FORMAT = 1
+MANIFEST = 'reports.json'
+PLOTLY_JS = 'plotly.min.js'
+TEMPLATE = 'plotly_dark'
+KPI_LABELS = ("Total Encounters", "Average Healthcare Coverage", "Adherence Rate", "Avg Diagnosis to Treatment Time")
+
+STYLE = """
+body { background: #0e1117; color: #fafafa; font-family: sans-serif; margin: 2rem; }
+a { color: #60b4ff; }
+.kpis { display: flex; gap: 1rem; margin: 1rem 0 2rem; }
+.kpi { flex: 1; background: #1a1d24; border-radius: 0.5rem; padding: 1rem; }
+.kpi .label { font-size: 0.85rem; color: #a3a8b8; }
+.kpi .value { font-size: 1.8rem; }
+.note { color: #f5c26b; }
+table { border-collapse: collapse; }
+th, td { padding: 0.35rem 0.8rem; border-bottom: 1px solid #333; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+"""
+
+
+@dataclass(frozen=True)
+class CityJob:
+    city: str
+    path: str  # page to write
+    summary: object  # cube.CitySummary
+    series: dict  # metric -> yearly series
+    stored: dict  # metric -> forecast store entry, for series the store already fitted
+    inline_js: bool
+    timeout: float
+
+
+@dataclass(frozen=True)
+class CityReport:
+    city: str
+    fitted: dict  # metric -> new forecast result for the store
+    forecasts: dict  # metric -> forecast for the last forecast year
+    failures: tuple  # messages for forecasts that could not be fitted
+    seconds: float
+
+
+def report_file(city):
+    return re.sub(r'[^A-Za-z0-9]+', '-', city).strip('-').lower() + '.html'
+
+
+def kpis(summary):
+    # (label, formatted value) as on General Insights
+    values = [f'{summary.total_encounters}', f'{summary.avg_coverage:.2f}', f'{summary.adherence_rate:.2f}',
+              f'{summary.avg_diagnosis_to_treatment:.2f} hours']
+    return list(zip(KPI_LABELS, values))
+
+
+def fingerprint(summary, series):
+    # Hash of everything a city's page shows, apart from the fitted forecasts (those are
+    # determined by their series, see forecast_store)
+    digest = hashlib.sha1(repr((REPORT_FORMAT, kpis(summary))).encode('utf-8'))
+    for frame in (summary.yearly, summary.encounter_classes, summary.medications):
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    for metric in sorted(series):
+        digest.update(f'{metric}:{forecast.series_hash(series[metric])}'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _figure_html(figure):
+    import plotly.graph_objs as go
+
+    return go.Figure(figure).to_html(full_html=False, include_plotlyjs=False, config={'displaylogo': False})
+
+
+def _write(path, text):
+    # Write through a temporary file so readers never see a half-written page
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        handle.write(text)
+    os.replace(tmp_path, path)
+
+
+def _page(title, body, inline_js):
+    if inline_js:
+        from plotly.offline import get_plotlyjs
+        script = f'<script type="text/javascript">{get_plotlyjs()}</script>'
+    else:
+        script = f'<script src="{PLOTLY_JS}"></script>'
+    return (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f'<style>{STYLE}</style>{script}</head>\n<body>\n{body}\n</body></html>\n')
+
+
+def render_city(job):
+    # Runs in a worker process: fit missing forecasts, build the figures, write the page
+    import plotly.io as pio
+
+    started = time.perf_counter()
+    results, fitted, failures = dict(job.stored), {}, []
+    tasks = [ForecastTask(job.city, metric, series) for metric, series in job.series.items()
+             if len(series) > 2 and metric not in results]
+    # Fits run inline, one city per worker, with the same per-fit budget as the dashboard pool
+    for outcome in ForecastExecutor(max_workers=0, task_timeout=job.timeout).fit_many(tasks):
+        if outcome.ok:
+            results[outcome.metric] = fitted[outcome.metric] = outcome.result
+        else:
+            failures.append(f"Could not forecast {outcome.metric.replace('_', ' ')}: {outcome.error}")
+    notes = [f"Not enough {metric.replace('_', ' ')} history to forecast."
+             for metric, series in job.series.items() if len(series) < 3]
+
+    # The dark template as the default is applied once per figure as it is built; setting
+    # it on each finished figure afterwards doubles the rendering time
+    previous, pio.templates.default = pio.templates.default, TEMPLATE
+    try:
+        body = _city_body(job, results, failures + notes)
+    finally:
+        pio.templates.default = previous
+    _write(job.path, _page(f'HealthX - {job.city}', body, job.inline_js))
+    return CityReport(
+        city=job.city,
+        fitted=fitted,
+        forecasts={metric: result['forecast'][-1] for metric, result in results.items()},
+        failures=tuple(failures),
+        seconds=time.perf_counter() - started,
+    )
+
+
+def _city_body(job, results, notes):
+    from healthx.figures import CITY_FIGURES
+
+    sections = [f'<p><a href="index.html">All cities</a></p><h1>{html.escape(job.city)}</h1>',
+                '<h2>General Healthcare Overview</h2><div class="kpis">']
+    for label, value in kpis(job.summary):
+        sections.append(f'<div class="kpi"><div class="label">{html.escape(label)}</div>'
+                        f'<div class="value">{html.escape(value)}</div></div>')
+    sections.append('</div>')
+    sections += [_figure_html(build(job.summary)) for build in CITY_FIGURES.values()]
+
+    sections.append('<h2>Predictive Analytics</h2>')
+    sections += [_figure_html(forecast.forecast_figure(metric, job.city, series, results[metric]))
+                 for metric, series in job.series.items() if metric in results]
+    sections += [f'<p class="note">{html.escape(note)}</p>' for note in notes]
+    return '\n'.join(sections)
+
+
+def read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding='utf-8') as handle:
+            return json.load(handle)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_index(out_dir, manifest):
+    header = ['City'] + list(KPI_LABELS) + \
+        [f"{forecast.METRICS[metric]['title']} {forecast.FORECAST_START + forecast.FORECAST_STEPS - 1}"
+         for metric in forecast.METRICS] + ['Notes']
+    rows = ['<tr>' + ''.join(f'<th>{html.escape(cell)}</th>' for cell in header) + '</tr>']
+    for city in sorted(manifest):
+        entry = manifest[city]
+        cells = [f'<a href="{html.escape(entry["file"])}">{html.escape(city)}</a>']
+        cells += [html.escape(value) for _, value in entry['kpis']]
+        cells += [f'{entry["forecasts"][metric]:,.0f}' if metric in entry['forecasts'] else '' for metric in forecast.METRICS]
+        cells.append(f'{len(entry["failures"])} failed forecast(s)' if entry['failures'] else '')
+        rows.append('<tr>' + ''.join(f'<td>{cell}</td>' for cell in cells) + '</tr>')
+    body = (f'<h1>HealthX city reports</h1><p>{len(manifest)} cities, updated '
+            f'{time.strftime("%Y-%m-%d %H:%M")}</p>\n<table>\n' + '\n'.join(rows) + '\n</table>')
+    _write(os.path.join(out_dir, 'index.html'), _page('HealthX city reports', body, inline_js=False))
+
+
+def _save_manifest(out_dir, manifest):
+    _write(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=1))
+
+
+def run_reports(store, city_cube, population_df, out_dir, cities=None, workers=None, timeout=None,
+                force=False, inline_js=False, log=print):
+    os.makedirs(out_dir, exist_ok=True)
+    workers = DEFAULT_WORKERS if workers is None else workers
+    timeout = DEFAULT_TASK_TIMEOUT if timeout is None else timeout
+    manifest = read_manifest(out_dir)
+
+    jobs, fingerprints, skipped = [], {}, 0
+    for city in sorted(cities or city_cube):
+        if city not in city_cube:
+            log(f'{city}: not in the data, skipped')
+            continue
+        summary = city_cube[city]
+        series = {metric: forecast.metric_series(metric, city, summary, population_df) for metric in forecast.METRICS}
+        fingerprints[city] = fingerprint(summary, series)
+        entry = manifest.get(city)
+        if (not force and entry and entry['fingerprint'] == fingerprints[city] and not entry['failures']
+                and os.path.exists(os.path.join(out_dir, entry['file']))):
+            skipped += 1
+            continue
+        stored = {metric: result for metric, values in series.items()
+                  for result in [store.get(city, metric, forecast.series_hash(values))] if result is not None}
+        jobs.append(CityJob(city, os.path.join(out_dir, report_file(city)), summary, series, stored, inline_js, timeout))
+
+    if jobs and not inline_js:
+        from plotly.offline import get_plotlyjs
+        _write(os.path.join(out_dir, PLOTLY_JS), get_plotlyjs())
+
+    rendered, failed = 0, 0
+
+    def finished(report):
+        # Stream each city to disk as it completes: new fits, manifest entry, index
+        nonlocal rendered
+        for metric, result in report.fitted.items():
+            store.put(report.city, metric, result)
+        if report.fitted:
+            store.save()
+        manifest[report.city] = {
+            'file': report_file(report.city),
+            'fingerprint': fingerprints[report.city],
+            'kpis': kpis(city_cube[report.city]),
+            'forecasts': report.forecasts,
+            'failures': list(report.failures),
+            'rendered_at': time.time(),
+        }
+        _save_manifest(out_dir, manifest)
+        write_index(out_dir, manifest)
+        rendered += 1
+        log(f'{report.city}: {report_file(report.city)} in {report.seconds:.1f}s'
+            + (f' ({len(report.failures)} failed forecast(s))' if report.failures else ''))
+
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            try:
+                finished(render_city(job))
+            except Exception as error:  # a bad city must not stop the run
+                failed += 1
+                log(f'{job.city}: failed ({type(error).__name__}: {error})')
+    elif jobs:
+        # spawn, like the forecast pool; each worker imports plotly / statsmodels once
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=multiprocessing.get_context('spawn'))
+        try:
+            futures = {pool.submit(render_city, job): job for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    finished(future.result())
+                except Exception as error:
+                    failed += 1
+                    log(f'{futures[future].city}: failed ({type(error).__name__}: {error})')
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    write_index(out_dir, manifest)
+    return {'rendered': rendered, 'skipped': skipped, 'failed': failed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a static HTML report for every HealthX city.')
+    parser.add_argument('--out', default='reports', help='output directory (default: ./reports)')
+    parser.add_argument('--city', action='append', help='limit to this city (repeatable)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: HEALTHX_FORECAST_WORKERS or CPU count)')
+    parser.add_argument('--timeout', type=float, help='per-series fit budget in seconds (default: HEALTHX_FORECAST_TIMEOUT or 30)')
+    parser.add_argument('--force', action='store_true', help='rewrite pages even when their inputs are unchanged')
+    parser.add_argument('--self-contained', action='store_true', help='inline plotly.js into every page')
+    parser.add_argument('--store', help='forecast store path (default: HEALTHX_FORECAST_STORE or the cache dir)')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    city_cube = incremental.load_city_cube()
+    population_df = ingest.load_table('population')
+    store = ForecastStore(args.store)
+    try:
+        counts = run_reports(store, city_cube, population_df, args.out, args.city, args.workers, args.timeout,
+                             args.force, args.self_contained)
+    except KeyboardInterrupt:
+        # Finished pages are already recorded in reports.json
+        print(f'Interrupted; run again to resume with the remaining cities in {os.path.abspath(args.out)}')
+        return 130
+    print(f"Reports in {os.path.abspath(args.out)}: {counts['rendered']} written, {counts['skipped']} unchanged, "
+          f"{counts['failed']} failed in {time.perf_counter() - started:.1f}s")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
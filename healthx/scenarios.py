@@ -0,0 +1,124 @@
+# Monte Carlo what-if scenarios on top of the stored ARIMA(1,1,1) forecasts.
+#
+# The forecast store keeps, per city and metric, the fitted ar / ma / sigma2 and the
+# point forecasts, and the last observed value comes from the input series. That fixes
+# the model's forecast distribution: with e_h ~ N(0, sigma2) the yearly changes are
+#
+#   d_1 = next_diff + e_1,     d_h = ar * d_(h-1) + e_h + ma * e_(h-1)
+#
+# where next_diff = forecast[0] - last, and levels are last + cumsum(d). simulate() draws
+# every path of every city at once as one (cities x paths x horizon) array; the loop is
+# only over the five forecast years. The mean path is the stored point forecast.
+#
+# A Shock bends the simulated levels for what-if questions: extra compounding annual
+# growth (population growth, cost inflation), a one-off level change from the first
+# forecast year, and a volatility multiplier on sigma. bands() and exceedance() turn the
+# paths into prediction bands and probabilities of exceeding a threshold per city.
+# All cities at 10k paths take well under a second (benchmarks/scenarios.py).
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from healthx import tracing
+
+PATHS = 10_000
+# Quantiles of the prediction bands: 90% and 50% intervals around the median
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+@dataclass(frozen=True)
+class Shock:
+    growth: float = 0.0  # extra annual growth, compounding (0.02 = +2% a year)
+    level: float = 0.0  # one-off change from the first forecast year (-0.1 = 10% lower)
+    volatility: float = 1.0  # multiplier on the innovation standard deviation
+
+
+@dataclass(frozen=True)
+class ScenarioInputs:
+    # Model state per city, aligned arrays (one entry per city)
+    cities: tuple
+    years: tuple  # forecast years
+    last: np.ndarray  # last observed value
+    next_diff: np.ndarray  # expected change into the first forecast year
+    ar: np.ndarray
+    ma: np.ndarray
+    sigma: np.ndarray
+
+
+def model_inputs(series_by_city, results):
+    # ScenarioInputs from {city: series} and stored forecast entries {city: entry}
+    cities = [city for city in results if len(series_by_city.get(city, ())) > 0]
+    if not cities:
+        return None
+    last = np.array([float(series_by_city[city].iloc[-1]) for city in cities])
+    params = [results[city]['params'] for city in cities]
+    return ScenarioInputs(
+        cities=tuple(cities),
+        years=tuple(results[cities[0]]['forecast_years']),
+        last=last,
+        next_diff=np.array([results[city]['forecast'][0] for city in cities]) - last,
+        ar=np.array([p.get('ar.L1', 0.0) for p in params]),
+        ma=np.array([p.get('ma.L1', 0.0) for p in params]),
+        sigma=np.sqrt(np.maximum([p.get('sigma2', 0.0) for p in params], 0.0)),
+    )
+
+
+def simulate(inputs, paths=PATHS, shock=Shock(), seed=0):
+    # (cities, paths, horizon) simulated levels
+    horizon = len(inputs.years)
+    rng = np.random.default_rng(seed)
+    with tracing.span('scenario_simulate', cities=len(inputs.cities), paths=paths):
+        shocks = rng.standard_normal((len(inputs.cities), paths, horizon))
+        shocks *= (inputs.sigma * shock.volatility)[:, None, None]
+        ar, ma = inputs.ar[:, None], inputs.ma[:, None]
+        diffs = np.empty_like(shocks)
+        diffs[:, :, 0] = inputs.next_diff[:, None] + shocks[:, :, 0]
+        for h in range(1, horizon):
+            diffs[:, :, h] = ar * diffs[:, :, h - 1] + shocks[:, :, h] + ma * shocks[:, :, h - 1]
+        levels = np.cumsum(diffs, axis=2, out=diffs)
+        levels += inputs.last[:, None, None]
+        factors = (1 + shock.level) * (1 + shock.growth) ** np.arange(1, horizon + 1)
+        levels *= factors
+        np.maximum(levels, 0, out=levels)  # counts and costs do not go negative
+    return levels
+
+
+def bands(inputs, levels, quantiles=QUANTILES):
+    # Long frame: City, Year, Mean and one column per quantile (P5, P25, ...)
+    with tracing.span('scenario_bands', cities=len(inputs.cities)):
+        values = np.quantile(levels, quantiles, axis=1)  # (quantiles, cities, horizon)
+        mean = levels.mean(axis=1)
+    cities, years = len(inputs.cities), len(inputs.years)
+    frame = pd.DataFrame({'City': np.repeat(inputs.cities, years), 'Year': np.tile(inputs.years, cities),
+                          'Mean': mean.ravel()})
+    for quantile, value in zip(quantiles, values):
+        frame[f'P{quantile * 100:g}'] = value.ravel()
+    return frame
+
+
+def exceedance(inputs, levels, thresholds):
+    # Probability per city that the value exceeds its threshold in the final forecast
+    # year and in any forecast year; thresholds holds one value per city
+    thresholds = np.asarray(thresholds, dtype=float)[:, None, None]
+    above = levels > thresholds
+    return pd.DataFrame({
+        'City': inputs.cities,
+        'Threshold': thresholds.ravel(),
+        f'P(exceed in {inputs.years[-1]})': above[:, :, -1].mean(axis=1),
+        'P(exceed in any year)': above.any(axis=2).mean(axis=1),
+    })
+
+
+def forecast_std(inputs, horizon=None):
+    # Analytic standard deviation of the ARIMA(1,1,1) level forecast per city and year,
+    # for checking the simulation: sigma * sqrt(sum of squared cumulative psi weights)
+    horizon = horizon or len(inputs.years)
+    psi = np.ones((len(inputs.cities), horizon))
+    if horizon > 1:
+        psi[:, 1] = inputs.ar + inputs.ma
+        for j in range(2, horizon):
+            psi[:, j] = inputs.ar * psi[:, j - 1]
+    cumulative = np.cumsum(psi, axis=1)
+    return inputs.sigma[:, None] * np.sqrt(np.cumsum(cumulative ** 2, axis=1))
@@ -0,0 +1,148 @@
+# Schema-driven compact loader for the larger source tables.
+#
+# Each schema lists the columns the pages use and how to store them:
+#   ids        -> dictionary-encoded integer codes (vocabulary returned separately)
+#   categories -> pandas categoricals
+#   strings    -> kept as strings (join keys)
+#   dates      -> datetime64, invalid values coerced to NaT (counted in df.attrs['invalid_dates'])
+#   integers   -> downcast to the smallest integer type that fits
+#   floats     -> downcast to float32
+# The CSV is read in chunks with only those columns, so peak memory during a
+# conversion stays close to the size of the compact result.
+#
+#   python -m healthx.schema   # memory footprint of default vs compact frames
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 250_000
+
+SCHEMAS = {
+    'executive_summary': {
+        'ids': ['Id_x', 'PATIENT', 'PROVIDER'],
+        'categories': ['CITY_x', 'ENCOUNTERCLASS', 'CATEGORY'],
+        'strings': [],
+        'dates': ['START_x', 'START_y'],
+        'integers': ['DISPENSES', 'ENCOUNTERS'],
+        'floats': ['PAYER_COVERAGE_x', 'TOTAL_CLAIM_COST', 'HEALTHCARE_EXPENSES'],
+    },
+    'patients': {
+        'ids': [],
+        'categories': ['GENDER', 'RACE', 'CITY'],
+        'strings': ['Id'],
+        'dates': ['BIRTHDATE'],
+        'integers': [],
+        'floats': ['INCOME', 'LAT', 'LON'],
+    },
+}
+
+
+def schema_columns(schema):
+    return [column for kind in ('ids', 'categories', 'strings', 'dates', 'integers', 'floats')
+            for column in schema[kind]]
+
+
+class _Encoder:
+    # Running value -> code dictionary shared by all chunks of one column
+    def __init__(self):
+        self.vocabulary = pd.Index([], dtype=object)
+
+    def encode(self, values):
+        values = values.astype(object).where(values.notna(), None)
+        codes = self.vocabulary.get_indexer(values)
+        new = (codes == -1) & values.notna().to_numpy()
+        if new.any():
+            self.vocabulary = self.vocabulary.append(pd.Index(pd.unique(values[new]), dtype=object))
+            codes = self.vocabulary.get_indexer(values)
+        return codes  # missing values stay -1
+
+
+def _smallest_int(codes, size):
+    # Smallest integer dtype for the codes; a nullable dtype when some IDs are missing (-1)
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        if size < np.iinfo(dtype).max:
+            break
+    missing = codes < 0
+    if missing.any():
+        return pd.arrays.IntegerArray(codes.astype(dtype), missing)
+    return codes.astype(dtype)
+
+
+def read_csv_compact(path, schema, chunksize=CHUNK_ROWS):
+    # Returns (frame, {id column: vocabulary Index}); code i in an id column means vocabulary[i]
+    wanted = set(schema_columns(schema))
+    encoders = {column: _Encoder() for column in schema['ids']}
+    string_columns = schema['ids'] + schema['categories'] + schema['strings']
+
+    chunks = []
+    invalid = {column: 0 for column in schema['dates']}
+    reader = pd.read_csv(path, usecols=lambda column: column in wanted, chunksize=chunksize,
+                         dtype={column: 'string' for column in string_columns}, low_memory=False)
+    for chunk in reader:
+        for column in schema['ids']:
+            if column in chunk:
+                chunk[column] = encoders[column].encode(chunk[column])
+        for column in schema['categories']:
+            if column in chunk:
+                chunk[column] = chunk[column].astype('category')
+        for column in schema['dates']:
+            if column in chunk:
+                parsed = pd.to_datetime(chunk[column], errors='coerce')
+                invalid[column] += int((parsed.isna() & chunk[column].notna()).sum())
+                chunk[column] = parsed
+        chunks.append(chunk)
+
+    if not chunks:
+        return pd.DataFrame(columns=[column for column in schema_columns(schema)]), {}
+    # Categories differ between chunks; union them so concat keeps the categorical dtype
+    for column in schema['categories']:
+        if column in chunks[0]:
+            union = pd.api.types.union_categoricals([chunk[column] for chunk in chunks]).categories
+            for chunk in chunks:
+                chunk[column] = chunk[column].cat.set_categories(union)
+    df = pd.concat(chunks, ignore_index=True)
+    del chunks
+
+    for column in schema['ids']:
+        if column in df:
+            df[column] = _smallest_int(df[column].to_numpy(), len(encoders[column].vocabulary))
+    for column in schema['integers']:
+        if column in df:
+            if df[column].isna().any():
+                df[column] = pd.to_numeric(df[column], downcast='float')
+            else:
+                df[column] = pd.to_numeric(df[column], downcast='integer')
+    for column in schema['floats']:
+        if column in df:
+            df[column] = pd.to_numeric(df[column], downcast='float')
+
+    df.attrs['invalid_dates'] = {column: count for column, count in invalid.items() if column in df}
+    dictionaries = {column: encoders[column].vocabulary for column in schema['ids'] if column in df}
+    return df, dictionaries
+
+
+def memory_footprint(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def memory_report(frames):
+    # One row per frame: rows, columns and deep memory usage in MB
+    rows = [{'Frame': name, 'Rows': len(df), 'Columns': df.shape[1],
+             'Memory (MB)': round(memory_footprint(df) / 2**20, 2)}
+            for name, df in frames.items()]
+    return pd.DataFrame(rows, columns=['Frame', 'Rows', 'Columns', 'Memory (MB)'])
+
+
+def main():
+    from healthx import config, ingest
+
+    frames = {}
+    for table in SCHEMAS:
+        path = config.source_path(table)
+        frames[f'{table} (read_csv defaults)'] = pd.read_csv(path, low_memory=False)
+        frames[f'{table} (compact)'] = ingest.load_table(table)
+    print(memory_report(frames).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+# Shared, memory-mapped data context for several Streamlit server processes.
+#
+# Without this every server process builds its own DataContext (healthx.context), so
+# memory grows with the number of workers. Instead one loader process publishes the
+# preprocessed frames as uncompressed Arrow IPC files into a new generation directory
+# under HEALTHX_SHARED_DIR (default /dev/shm/healthx, or CACHE_DIR/shared where there is
+# no /dev/shm) and then atomically replaces current.json to point at it. Workers
+# started with HEALTHX_SHARED_TABLES=1 memory-map the current generation read-only.
+#
+# Columns are stored so they convert to pandas without a copy: numbers as raw values
+# (NaN kept, no validity bitmap), datetimes as int64 nanoseconds (NaT included),
+# categoricals as their integer codes with the categories in the field metadata, and
+# strings as Arrow strings (pandas string[pyarrow]). The frames are therefore views on
+# the mapped pages, which all workers share through the page cache; they are read-only.
+#
+# Workers check current.json on every rerun and switch to a new generation through the
+# st.cache_resource key. Generations older than the previous one are deleted; a
+# process that still maps an unlinked file keeps reading it until it lets go.
+#
+#   python -m healthx.shared_tables publish              # publish once
+#   python -m healthx.shared_tables publish --watch 60   # republish when the data or AGE stamp changes
+#   python -m healthx.shared_tables status
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from healthx import config, context, ingest, tracing
+
+FRAMES = ('patients', 'encounter_facts', 'population', 'providers', 'age_stats')
+MANIFEST = 'current.json'
+
+
+def enabled():
+    return os.environ.get('HEALTHX_SHARED_TABLES', '').lower() in ('1', 'true', 'yes')
+
+
+def shared_dir():
+    default = '/dev/shm/healthx' if os.path.isdir('/dev/shm') else os.path.join(config.CACHE_DIR, 'shared')
+    return os.environ.get('HEALTHX_SHARED_DIR', default)
+
+
+def read_manifest(directory=None):
+    try:
+        with open(os.path.join(directory or shared_dir(), MANIFEST), encoding='utf-8') as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def _column_to_arrow(series):
+    # (array, field metadata) for one column, laid out for a zero-copy read back
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        meta = {'kind': 'category', 'ordered': bool(series.cat.ordered),
+                'categories': categories.tolist(), 'categories_dtype': str(categories.dtype)}
+        return pa.array(series.cat.codes.to_numpy()), meta
+    if pd.api.types.is_datetime64_dtype(series.dtype):
+        return pa.array(series.to_numpy(dtype='datetime64[ns]').view('int64')), {'kind': 'datetime'}
+    if pd.api.types.is_bool_dtype(series.dtype) and series.dtype == bool:
+        return pa.array(series.to_numpy().view('uint8')), {'kind': 'bool'}  # Arrow booleans are bit-packed
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'iuf':
+        return pa.array(series.to_numpy(), from_pandas=False), {'kind': 'numeric'}
+    if pd.api.types.is_string_dtype(series.dtype):
+        values = series.astype(object).where(series.notna(), None)
+        return pa.array(values.to_numpy(), type=pa.string()), {'kind': 'string'}
+    raise TypeError(f'Cannot share column {series.name!r} of dtype {series.dtype}')
+
+
+def _column_from_arrow(array, meta):
+    kind = meta['kind']
+    if kind == 'string':
+        return pd.arrays.ArrowStringArray(array)
+    values = array.to_numpy(zero_copy_only=True)
+    if kind == 'datetime':
+        return values.view('datetime64[ns]')
+    if kind == 'bool':
+        return values.view(bool)
+    if kind == 'category':
+        categories = pd.Index(meta['categories'], dtype=meta['categories_dtype'])
+        dtype = pd.CategoricalDtype(categories, ordered=meta['ordered'])
+        return pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+    return values
+
+
+def write_frame(frame, path):
+    arrays, fields = [], []
+    for column in frame.columns:
+        array, meta = _column_to_arrow(frame[column])
+        arrays.append(array)
+        fields.append(pa.field(str(column), array.type, metadata={'healthx': json.dumps(meta)}))
+    table = pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def map_frame(path):
+    # Frame whose columns are read-only views on the memory-mapped file
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all().combine_chunks()
+    columns = {}
+    for field, column in zip(table.schema, table.columns):
+        meta = json.loads(field.metadata[b'healthx'])
+        array = column.chunk(0) if column.num_chunks else pa.array([], type=field.type)
+        columns[field.name] = _column_from_arrow(array, meta)
+    return pd.DataFrame(columns, copy=False)
+
+
+def publish(directory=None, as_of=None):
+    # Build the data context and make it the current generation; returns the manifest
+    directory = directory or shared_dir()
+    os.makedirs(directory, exist_ok=True)
+    data_version = ingest.data_version()
+    ctx = context.build_data_context(as_of=as_of, data_version=data_version)
+
+    previous = read_manifest(directory) or {}
+    generation = previous.get('generation', 0) + 1
+    target = os.path.join(directory, f'gen-{generation}')
+    staging = f'{target}.{os.getpid()}.tmp'
+    os.makedirs(staging)
+    with tracing.span('shared_publish', generation=generation):
+        for name in FRAMES:
+            write_frame(getattr(ctx, name).reset_index(drop=True), os.path.join(staging, f'{name}.arrow'))
+    os.rename(staging, target)
+
+    manifest = {'generation': generation, 'data_version': data_version, 'as_of': ctx.as_of.isoformat(),
+                'age_mean': ctx.age_mean, 'age_median': ctx.age_median, 'published': time.time()}
+    tmp_path = os.path.join(directory, f'{MANIFEST}.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, indent=2)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST))  # workers see the new generation at once
+
+    # Keep the previous generation for workers that read the old manifest a moment ago
+    for name in os.listdir(directory):
+        if name.startswith('gen-') and name[4:].isdigit() and int(name[4:]) < generation - 1:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return manifest
+
+
+def load_context(manifest, directory=None):
+    # DataContext over the memory-mapped frames of a published generation
+    directory = os.path.join(directory or shared_dir(), f"gen-{manifest['generation']}")
+    with tracing.span('shared_map', generation=manifest['generation']):
+        frames = {name: map_frame(os.path.join(directory, f'{name}.arrow')) for name in FRAMES}
+    return context.DataContext(
+        data_version=manifest['data_version'],
+        as_of=pd.Timestamp(manifest['as_of']),
+        age_mean=manifest['age_mean'],
+        age_median=manifest['age_median'],
+        **frames,
+    )
+
+
+def is_current(manifest):
+    return (manifest is not None and manifest['data_version'] == ingest.data_version()
+            and pd.Timestamp(manifest['as_of']) == context.refresh_stamp())
+
+
+def shared_fraction(frame):
+    # Share of a frame's column bytes that are views on a mapped file rather than private copies
+    shared = total = 0
+    for column in frame.columns:
+        array = frame[column].array
+        values = array.codes if isinstance(array, pd.Categorical) else array
+        if isinstance(values, pd.arrays.ArrowStringArray):
+            size, readonly = values.nbytes, True
+        else:
+            values = np.asarray(values)
+            size, readonly = values.nbytes, not values.flags.writeable
+        total += size
+        shared += size if readonly else 0
+    return shared / total if total else 1.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Publish the HealthX data context for memory-mapped sharing.')
+    parser.add_argument('action', nargs='?', default='publish', choices=['publish', 'status'])
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help='keep running and republish when the source data or the AGE stamp changes')
+    args = parser.parse_args(argv)
+
+    if args.action == 'status':
+        manifest = read_manifest()
+        if manifest is None:
+            print(f'Nothing published in {shared_dir()}')
+            return 1
+        directory = os.path.join(shared_dir(), f"gen-{manifest['generation']}")
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"Generation {manifest['generation']} in {directory}: {size / 2**20:.1f} MB, data version "
+              f"{manifest['data_version']}, as of {manifest['as_of']} ({'current' if is_current(manifest) else 'stale'})")
+        return 0
+
+    while True:
+        manifest = read_manifest()
+        if not is_current(manifest) or args.watch is None:
+            started = time.perf_counter()
+            manifest = publish()
+            print(f"Published generation {manifest['generation']} to {shared_dir()} "
+                  f'in {time.perf_counter() - started:.1f}s')
+        if args.watch is None:
+            return 0
+        time.sleep(args.watch)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
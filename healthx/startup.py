@@ -0,0 +1,117 @@
+# Lazy page loading and cold-start timing.
+#
+# dashboard.py imports a page module (and therefore its heavy dependencies) only
+# when that page is first shown. Import and first data-load times are recorded per
+# page and logged; `python -m healthx.startup` measures them from a cold
+# interpreter for every page, next to the previous eager layout.
+
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+from healthx import tracing
+from healthx.pages import PAGES
+
+logger = logging.getLogger(__name__)
+
+# page -> {'import': seconds, 'load': seconds}, for this server process
+PAGE_TIMINGS = {}
+
+
+def _record(page, stage, seconds):
+    PAGE_TIMINGS.setdefault(page, {})[stage] = seconds
+    logger.info('%s: %s took %.3fs', page, stage, seconds)
+
+
+def import_page(page):
+    # Import the module behind a sidebar page, timing the first (cold) import
+    name = f'healthx.pages.{PAGES[page]}'
+    if name in sys.modules:
+        return sys.modules[name]
+    started = time.perf_counter()
+    with tracing.span('page_import'):
+        module = importlib.import_module(name)
+    _record(page, 'import', time.perf_counter() - started)
+    return module
+
+
+def render_page(page):
+    module = import_page(page)
+    if 'load' not in PAGE_TIMINGS.get(page, {}):
+        started = time.perf_counter()
+        with tracing.span('page_load'):
+            module.load()
+        _record(page, 'load', time.perf_counter() - started)
+    with tracing.span('page_render'):
+        module.render()
+
+
+# Code run in a fresh interpreter for each measurement
+_PAGE_PROBE = '''
+import json, logging, time
+logging.disable(logging.WARNING)
+started = time.perf_counter()
+import streamlit
+base = time.perf_counter() - started
+started = time.perf_counter()
+import importlib
+module = importlib.import_module("healthx.pages.{module}")
+imported = time.perf_counter() - started
+started = time.perf_counter()
+module.load()
+loaded = time.perf_counter() - started
+print("STARTUP" + json.dumps({{"streamlit": base, "import": imported, "load": loaded}}))
+'''
+
+# The layout before pages were split: every heavy import and dataset up front
+_EAGER_PROBE = '''
+import json, logging, time
+logging.disable(logging.WARNING)
+started = time.perf_counter()
+import streamlit
+base = time.perf_counter() - started
+started = time.perf_counter()
+import plotly.express, plotly.graph_objs
+from statsmodels.tsa.arima.model import ARIMA
+from healthx import context, cube, ingest
+imported = time.perf_counter() - started
+started = time.perf_counter()
+context.build_data_context()
+cube.build_city_cube(ingest.load_table("executive_summary"))
+loaded = time.perf_counter() - started
+print("STARTUP" + json.dumps({"streamlit": base, "import": imported, "load": loaded}))
+'''
+
+
+def _probe(code):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=root).stdout
+    line = next(line for line in output.splitlines() if line.startswith('STARTUP'))
+    return json.loads(line[len('STARTUP'):])
+
+
+def startup_report(repeat=3):
+    # Median cold-start seconds per page over `repeat` fresh interpreters
+    rows = [('All pages eagerly (previous layout)', _EAGER_PROBE)]
+    rows += [(page, _PAGE_PROBE.format(module=module)) for page, module in PAGES.items()]
+    report = []
+    for label, code in rows:
+        runs = [_probe(code) for _ in range(repeat)]
+        median = {key: sorted(run[key] for run in runs)[len(runs) // 2] for key in runs[0]}
+        report.append((label, median))
+    return report
+
+
+def main():
+    print(f"{'Page':<38} {'streamlit':>10} {'imports':>9} {'data load':>10} {'total':>8}")
+    for label, timing in startup_report():
+        total = timing['streamlit'] + timing['import'] + timing['load']
+        print(f"{label:<38} {timing['streamlit']:>9.2f}s {timing['import']:>8.2f}s {timing['load']:>9.2f}s {total:>7.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+# Synthetic HealthX inputs for benchmarks and local development.
+#
+# Writes the five source CSVs (patients, encounters, providers, population and the
+# executive summary) with the columns and value shapes of the Synthea / Census
+# exports the pages read. Encounter-sized files are written in chunks, so 10M
+# encounters can be generated without holding them in memory.
+#
+#   python -m healthx.synthetic /tmp/healthx-data --encounters 1000000
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from healthx import config
+
+CHUNK_ROWS = 500_000
+
+CITIES = [
+    'Boston', 'Worcester', 'Springfield', 'Cambridge', 'Lowell', 'Brockton', 'Quincy', 'Lynn',
+    'New Bedford', 'Fall River', 'Newton', 'Lawrence', 'Somerville', 'Framingham', 'Haverhill',
+    'Waltham', 'Malden', 'Brookline', 'Plymouth', 'Medford', 'Taunton', 'Chicopee', 'Weymouth',
+    'Revere', 'Peabody', 'Methuen', 'Barnstable', 'Pittsfield', 'Attleboro', 'Arlington',
+    'Everett', 'Salem', 'Westfield', 'Leominster', 'Fitchburg', 'Beverly', 'Holyoke', 'Marlborough',
+    'Woburn', 'Chelsea',
+]
+GENDERS = ['M', 'F']
+RACES = ['white', 'black', 'asian', 'hispanic', 'native', 'other']
+RACE_WEIGHTS = [0.7, 0.1, 0.07, 0.1, 0.01, 0.02]
+ENCOUNTER_CLASSES = ['wellness', 'ambulatory', 'outpatient', 'emergency', 'inpatient', 'urgentcare']
+CLASS_WEIGHTS = [0.35, 0.3, 0.15, 0.08, 0.04, 0.08]
+MEDICATION_CATEGORIES = ['Analgesic', 'Antibiotic', 'Antihypertensive', 'Statin', 'Vaccine', 'Inhaler']
+FIRST_YEAR, LAST_YEAR = 2010, 2023
+
+
+def table_sizes(encounters):
+    # Patient and provider counts that keep Synthea-like ratios as encounters grow
+    return {
+        'encounters': encounters,
+        'patients': max(1_000, encounters // 20),
+        'providers': max(100, encounters // 2_000),
+    }
+
+
+def _timestamps(seconds):
+    # ISO-8601 strings as exported by Synthea, e.g. 2015-03-02T14:05:00Z
+    return np.char.add(np.datetime_as_string(seconds.astype('datetime64[s]'), unit='s'), 'Z')
+
+
+def _ids(prefix, start, stop):
+    return np.char.add(prefix, np.arange(start, stop).astype(str))
+
+
+def _patients(rng, count, city_weights):
+    birthdates = np.datetime64('1930-01-01') + rng.integers(0, 92 * 365, count).astype('timedelta64[D]')
+    return pd.DataFrame({
+        'Id': _ids('patient-', 0, count),
+        'BIRTHDATE': np.datetime_as_string(birthdates, unit='D'),
+        'GENDER': rng.choice(GENDERS, count),
+        'RACE': rng.choice(RACES, count, p=RACE_WEIGHTS),
+        'CITY': rng.choice(CITIES, count, p=city_weights),
+        'LAT': 42.0 + rng.random(count),
+        'LON': -72.5 + 2 * rng.random(count),
+        'INCOME': np.round(rng.lognormal(10.8, 0.6, count)).astype(np.int64),
+        'HEALTHCARE_EXPENSES': np.round(rng.lognormal(11, 1, count), 2),
+    })
+
+
+def _providers(rng, count, city_weights):
+    return pd.DataFrame({
+        'Id': _ids('provider-', 0, count),
+        'NAME': np.char.add('Provider ', np.arange(count).astype(str)),
+        'GENDER': rng.choice(GENDERS, count),
+        'CITY': rng.choice(CITIES, count, p=city_weights),
+        'LAT': 42.0 + rng.random(count),
+        'LON': -72.5 + 2 * rng.random(count),
+        'ENCOUNTERS': rng.integers(10, 5_000, count),
+    })
+
+
+def _population(rng):
+    base = rng.integers(20_000, 650_000, len(CITIES))
+    growth = rng.normal(0.005, 0.01, len(CITIES))
+    years = np.arange(FIRST_YEAR, LAST_YEAR + 1)
+    values = base[:, None] * (1 + growth[:, None]) ** (years - FIRST_YEAR)
+    values = values * rng.normal(1, 0.01, values.shape)
+    frame = pd.DataFrame(np.round(values).astype(np.int64), columns=[str(year) for year in years])
+    frame.insert(0, 'CITY', CITIES)
+    return frame
+
+
+def _encounter_chunks(rng, sizes, provider_cities, chunk_rows):
+    # Yields (encounters, executive_summary) frames for consecutive encounter ID ranges
+    first = np.datetime64(f'{FIRST_YEAR}-01-01T00:00:00').astype(np.int64)
+    span = (np.datetime64(f'{LAST_YEAR + 1}-01-01T00:00:00').astype(np.int64) - first)
+    for start in range(0, sizes['encounters'], chunk_rows):
+        count = min(chunk_rows, sizes['encounters'] - start)
+        ids = _ids('encounter-', start, start + count)
+        patient = rng.integers(0, sizes['patients'], count)
+        provider = rng.integers(0, sizes['providers'], count)
+        started = first + rng.integers(0, span, count)
+        stopped = started + rng.integers(15 * 60, 4 * 3600, count)
+        treated = started + rng.exponential(48 * 3600, count).astype(np.int64)
+        # A small share of medication starts are missing, as in the real export
+        treated_text = np.where(rng.random(count) < 0.01, '', _timestamps(treated))
+        encounter_class = rng.choice(ENCOUNTER_CLASSES, count, p=CLASS_WEIGHTS)
+        claim_cost = np.round(rng.lognormal(5, 1, count), 2)
+
+        encounters = pd.DataFrame({
+            'Id': ids,
+            'START': _timestamps(started),
+            'STOP': _timestamps(stopped),
+            'PATIENT': np.char.add('patient-', patient.astype(str)),
+            'PROVIDER': np.char.add('provider-', provider.astype(str)),
+            'ENCOUNTERCLASS': encounter_class,
+            'TOTAL_CLAIM_COST': claim_cost,
+        })
+        executive_summary = pd.DataFrame({
+            'Id_x': ids,
+            'START_x': encounters['START'],
+            'STOP_x': encounters['STOP'],
+            'PATIENT': encounters['PATIENT'],
+            'PROVIDER': encounters['PROVIDER'],
+            'CITY_x': provider_cities[provider],
+            'ENCOUNTERCLASS': encounter_class,
+            'PAYER_COVERAGE_x': np.round(claim_cost * rng.random(count), 2),
+            'TOTAL_CLAIM_COST': claim_cost,
+            'START_y': treated_text,
+            'CATEGORY': rng.choice(MEDICATION_CATEGORIES, count),
+            'DISPENSES': rng.integers(0, 12, count),
+            'ENCOUNTERS': rng.integers(1, 12, count),
+            'HEALTHCARE_EXPENSES': np.round(rng.lognormal(8, 1, count), 2),
+        })
+        yield encounters, executive_summary
+
+
+def generate(out_dir, encounters=10_000, seed=0, chunk_rows=CHUNK_ROWS):
+    # Write all source CSVs for `encounters` encounters into out_dir; returns the table sizes
+    rng = np.random.default_rng(seed)
+    sizes = table_sizes(encounters)
+    os.makedirs(out_dir, exist_ok=True)
+
+    def path(table):
+        return os.path.join(out_dir, config.SOURCE_FILES[table])
+
+    # Larger cities get more patients, providers and encounters
+    city_weights = rng.lognormal(0, 1, len(CITIES))
+    city_weights /= city_weights.sum()
+
+    _patients(rng, sizes['patients'], city_weights).to_csv(path('patients'), index=False)
+    providers = _providers(rng, sizes['providers'], city_weights)
+    providers.to_csv(path('providers'), index=False)
+    _population(rng).to_csv(path('population'), index=False)
+
+    provider_cities = providers['CITY'].to_numpy()
+    with open(path('encounters'), 'w', newline='') as encounters_file, \
+            open(path('executive_summary'), 'w', newline='') as summary_file:
+        chunks = _encounter_chunks(rng, sizes, provider_cities, chunk_rows)
+        for number, (encounters_chunk, summary_chunk) in enumerate(chunks):
+            encounters_chunk.to_csv(encounters_file, index=False, header=number == 0)
+            summary_chunk.to_csv(summary_file, index=False, header=number == 0)
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write synthetic HealthX source CSVs.')
+    parser.add_argument('out_dir', help='folder to write the CSVs to (use it as HEALTHX_DATA_DIR)')
+    parser.add_argument('--encounters', type=int, default=10_000, help='number of encounters (10k to 10M)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    sizes = generate(args.out_dir, args.encounters, args.seed)
+    print(', '.join(f'{count:,} {table}' for table, count in sizes.items()) + f' written to {args.out_dir}')
+
+
+if __name__ == '__main__':
+    main()
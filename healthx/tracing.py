@@ -0,0 +1,202 @@
+# Lightweight stage tracing for dashboard reruns.
+#
+# Hot-path stages (CSV/Parquet load, city filter, datetime coercion, groupbys, ARIMA
+# fits, Plotly serialization) are wrapped in named spans:
+#
+#   with tracing.span('groupby', rows=len(df)) as attrs:
+#       ...
+#       attrs['groups'] = len(result)   # attributes can be added inside the span
+#
+# dashboard.py opens one trace per rerun; spans inside it carry the trace's page and
+# city and are listed in the sidebar debug panel. Every span, traced or not, also
+# feeds a rolling per-stage latency histogram that write_metrics() exports as a
+# Prometheus text file and a JSON file (HEALTHX_METRICS_DIR, default CACHE_DIR).
+# set_gauge() adds point-in-time values (e.g. data-quality counts) to the same files.
+
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from healthx import config
+
+# Histogram bucket upper bounds in seconds (Prometheus `le` labels)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Histograms cover the samples of the last WINDOW_SECONDS, at most MAX_SAMPLES per series
+WINDOW_SECONDS = 15 * 60
+MAX_SAMPLES = 10_000
+# Minimum seconds between two metric file writes from the dashboard
+WRITE_INTERVAL = 10
+
+_trace = contextvars.ContextVar('healthx_trace', default=None)
+_depth = contextvars.ContextVar('healthx_span_depth', default=0)
+
+_samples = {}  # (stage, page) -> deque of (monotonic time, seconds)
+_samples_lock = threading.Lock()
+_gauges = {}  # (name, sorted label items) -> value
+_last_write = 0.0
+
+
+class Trace:
+    # Spans recorded during one rerun, plus attributes (page, city) shared by all of them
+    def __init__(self, **attrs):
+        self.attrs = attrs
+        self.spans = []
+        self.started = time.perf_counter()
+        self.seconds = None
+
+    def annotate(self, **attrs):
+        self.attrs.update(attrs)
+
+    def rows(self):
+        # One dict per span in start order for the debug panel; nesting is shown by dots and
+        # span attributes other than the trace's own (page, city) are joined into `details`
+        return [{'stage': '· ' * depth + name, 'ms': round(seconds * 1000, 2),
+                 'details': ' '.join(f'{key}={value}' for key, value in attrs.items()
+                                     if value is not None and key not in self.attrs)}
+                for name, depth, seconds, attrs in filter(None, self.spans)]
+
+
+def metrics_dir():
+    return os.environ.get('HEALTHX_METRICS_DIR', config.CACHE_DIR)
+
+
+def current_trace():
+    return _trace.get()
+
+
+def annotate(**attrs):
+    # Add attributes (e.g. city) to the current trace, if any
+    trace = _trace.get()
+    if trace is not None:
+        trace.annotate(**attrs)
+
+
+@contextlib.contextmanager
+def trace(**attrs):
+    current = Trace(**attrs)
+    token = _trace.set(current)
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - current.started
+        _trace.reset(token)
+        _observe('rerun', current.attrs.get('page'), current.seconds)
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    depth = _depth.get()
+    token = _depth.set(depth + 1)
+    current = _trace.get()
+    if current is not None:
+        # Reserve the slot now so nested spans are listed after their parent
+        index = len(current.spans)
+        current.spans.append(None)
+    started = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        seconds = time.perf_counter() - started
+        _depth.reset(token)
+        page = attrs.get('page')
+        if current is not None:
+            page = page or current.attrs.get('page')
+            current.spans[index] = (name, depth, seconds, {**current.attrs, **attrs})
+        _observe(name, page, seconds)
+
+
+def _observe(stage, page, seconds):
+    now = time.monotonic()
+    with _samples_lock:
+        samples = _samples.setdefault((stage, page or ''), deque(maxlen=MAX_SAMPLES))
+        samples.append((now, seconds))
+
+
+def set_gauge(name, value, **labels):
+    with _samples_lock:
+        _gauges[(name, tuple(sorted(labels.items())))] = value
+
+
+def gauges():
+    # [(name, {label: value}, value)] in name and label order
+    with _samples_lock:
+        snapshot = sorted(_gauges.items())
+    return [(name, dict(labels), value) for (name, labels), value in snapshot]
+
+
+def histograms(window=WINDOW_SECONDS):
+    # {(stage, page): {'buckets': [cumulative counts per BUCKETS], 'count': n, 'sum': s}}
+    cutoff = time.monotonic() - window
+    with _samples_lock:
+        snapshot = {key: [seconds for at, seconds in samples if at >= cutoff] for key, samples in _samples.items()}
+    result = {}
+    for key, values in snapshot.items():
+        if values:
+            result[key] = {
+                'buckets': [sum(value <= bound for value in values) for bound in BUCKETS],
+                'count': len(values),
+                'sum': sum(values),
+            }
+    return result
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(window=WINDOW_SECONDS):
+    lines = [
+        f'# HELP healthx_stage_seconds Dashboard stage latency over the last {window} seconds.',
+        '# TYPE healthx_stage_seconds histogram',
+    ]
+    for (stage, page), histogram in sorted(histograms(window).items()):
+        labels = f'stage="{_label(stage)}",page="{_label(page)}"'
+        for bound, count in zip(BUCKETS, histogram['buckets']):
+            lines.append(f'healthx_stage_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'healthx_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+        lines.append(f'healthx_stage_seconds_sum{{{labels}}} {histogram["sum"]:.6f}')
+        lines.append(f'healthx_stage_seconds_count{{{labels}}} {histogram["count"]}')
+    previous = None
+    for name, labels, value in gauges():
+        if name != previous:
+            lines.append(f'# TYPE {name} gauge')
+            previous = name
+        labels = ','.join(f'{key}="{_label(label)}"' for key, label in labels.items())
+        lines.append(f'{name}{{{labels}}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def json_snapshot(window=WINDOW_SECONDS):
+    return {
+        'window_seconds': window,
+        'buckets': list(BUCKETS),
+        'stages': [{'stage': stage, 'page': page, **histogram}
+                   for (stage, page), histogram in sorted(histograms(window).items())],
+        'gauges': [{'name': name, 'labels': labels, 'value': value} for name, labels, value in gauges()],
+    }
+
+
+def _write_text(path, text):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        handle.write(text)
+    os.replace(tmp_path, path)  # scrapers never read a partial file
+
+
+def write_metrics(directory=None, force=False):
+    # Write healthx_metrics.prom and healthx_metrics.json; skipped if written less than
+    # WRITE_INTERVAL seconds ago unless force=True. Returns True when files were written.
+    global _last_write
+    now = time.monotonic()
+    if not force and now - _last_write < WRITE_INTERVAL:
+        return False
+    _last_write = now
+    directory = directory or metrics_dir()
+    os.makedirs(directory, exist_ok=True)
+    _write_text(os.path.join(directory, 'healthx_metrics.prom'), prometheus_text())
+    _write_text(os.path.join(directory, 'healthx_metrics.json'), json.dumps(json_snapshot(), indent=2))
+    return True
@@ -0,0 +1,181 @@
+# Background cache warming for General Insights and Predictive Insights.
+#
+# The first session to pick a city pays for its city summary and five ARIMA fits. A
+# CacheWarmer thread, started with the first rerun of a server process, does that work
+# ahead of time for every city: most selected first, by the counts in a usage log that
+# both pages append to (CACHE_DIR/city_usage.json, or HEALTHX_USAGE_LOG) and that
+# survives restarts. It yields to live sessions: every rerun runs inside
+# interactive(), and the warmer only starts its next city once no rerun has been active
+# for IDLE_SECONDS. One city is a small unit of work (a cube lookup or one SQL query,
+# plus fits on the forecast process pool), so a rerun never waits long behind it.
+# A new pass starts when the data version changes. HEALTHX_WARMER=0 turns it off.
+# Data modules are imported inside the functions, so importing this module stays cheap.
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+from healthx import config, tracing
+
+logger = logging.getLogger(__name__)
+
+# Quiet time after the last rerun before the warmer takes the next city
+IDLE_SECONDS = float(os.environ.get('HEALTHX_WARMER_IDLE', 1.0))
+# How often the warmer checks for a new data version once every city is warm
+POLL_SECONDS = 60
+
+
+def enabled():
+    return os.environ.get('HEALTHX_WARMER', '1') != '0'
+
+
+def usage_log_path():
+    return os.environ.get('HEALTHX_USAGE_LOG', os.path.join(config.CACHE_DIR, 'city_usage.json'))
+
+
+class UsageLog:
+    # Selection counts per city, persisted and merged with other server processes on save
+    def __init__(self, path=None):
+        self.path = path or usage_log_path()
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as handle:
+                return json.load(handle)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def counts(self):
+        return self._read()
+
+    def record(self, city):
+        with self._lock:
+            counts = self._read()
+            counts[city] = counts.get(city, 0) + 1
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as handle:
+                json.dump(counts, handle)
+            os.replace(tmp_path, self.path)
+
+    def ranked(self, cities):
+        # Most selected first, then the rest alphabetically
+        counts = self._read()
+        return sorted(cities, key=lambda city: (-counts.get(city, 0), city))
+
+
+class _Activity:
+    # Number of reruns in progress and when the last one ended
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.active = 0
+        self.last_end = 0.0
+
+    def wait_idle(self, stop):
+        with self.condition:
+            while not stop.is_set():
+                if self.active:
+                    self.condition.wait(IDLE_SECONDS)
+                    continue
+                remaining = self.last_end + IDLE_SECONDS - time.monotonic()
+                if remaining <= 0:
+                    return
+                self.condition.wait(remaining)
+
+
+_activity = _Activity()
+
+
+@contextlib.contextmanager
+def interactive():
+    # Wrap every rerun; the warmer stays out of the way while any is running
+    with _activity.condition:
+        _activity.active += 1
+    try:
+        yield
+    finally:
+        with _activity.condition:
+            _activity.active -= 1
+            _activity.last_end = time.monotonic()
+            _activity.condition.notify_all()
+
+
+def data_key():
+    from healthx import context, incremental, ingest
+    return ingest.data_version(), incremental.deltas_version(), context.refresh_stamp()
+
+
+class CacheWarmer:
+    # get_backend, get_population, get_store and get_executor are the shared loaders, so
+    # warmed entries land in the same caches the pages read
+    def __init__(self, get_backend, get_population, get_store, get_executor, usage_log=None):
+        self.get_backend = get_backend
+        self.get_population = get_population
+        self.get_store = get_store
+        self.get_executor = get_executor
+        self.usage_log = usage_log or UsageLog()
+        self.warmed = []
+        self.total = 0
+        self.current = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='healthx-cache-warmer', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        with _activity.condition:
+            _activity.condition.notify_all()
+        self._thread.join(timeout)
+
+    def status(self):
+        return {'warmed': len(self.warmed), 'total': self.total, 'current': self.current}
+
+    def warm_city(self, backend, population_df, city):
+        from healthx import forecast
+
+        with tracing.trace(page='warmer', city=city):
+            summary = backend.city_summary(city)
+            items = [(city, metric, series) for metric in forecast.METRICS
+                     for series in [forecast.metric_series(metric, city, summary, population_df)] if len(series) > 2]
+            self.get_store().get_or_fit_many(items, executor=self.get_executor())
+
+    def warm_pass(self):
+        backend, population_df = self.get_backend(), self.get_population()
+        cities = self.usage_log.ranked(backend.cities())
+        self.warmed, self.total = [], len(cities)
+        for city in cities:
+            _activity.wait_idle(self._stop)
+            if self._stop.is_set():
+                return
+            self.current = city
+            try:
+                self.warm_city(backend, population_df, city)
+            except Exception:  # a bad city must not stop the warmer
+                logger.exception('Cache warmer failed for %s', city)
+            self.warmed.append(city)
+        self.current = None
+
+    def _run(self):
+        done = None
+        while not self._stop.is_set():
+            try:
+                key = data_key()
+                if key != done:
+                    started = time.perf_counter()
+                    self.warm_pass()
+                    if not self._stop.is_set():
+                        done = key
+                        logger.info('Cache warmer: %d cities warm in %.1fs', len(self.warmed),
+                                    time.perf_counter() - started)
+            except Exception:
+                logger.exception('Cache warmer pass failed')
+            self._stop.wait(POLL_SECONDS)